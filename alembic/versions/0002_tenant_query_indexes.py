@@ -0,0 +1,34 @@
+"""Índices compostos para as consultas filtradas por tenant
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_cars_tenant_status", "cars", ["tenant_id", "status"]),
+    ("ix_cars_tenant_created", "cars", ["tenant_id", "created_at", "id"]),
+    ("ix_clients_tenant_status", "clients", ["tenant_id", "negotiation_status"]),
+    ("ix_clients_tenant_created", "clients", ["tenant_id", "created_at", "id"]),
+    ("ix_clients_car_status", "clients", ["car_id", "negotiation_status"]),
+    ("ix_documents_car_type", "documents", ["car_id", "document_type"]),
+    ("ix_documents_car_created", "documents", ["car_id", "created_at", "id"]),
+]
+
+
+def upgrade():
+    # if_not_exists: o create_all da aplicação pode já ter criado os índices
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, if_not_exists=True)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
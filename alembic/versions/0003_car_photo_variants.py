@@ -0,0 +1,25 @@
+"""Variantes redimensionadas da foto do carro
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    columns = [c["name"] for c in sa.inspect(op.get_bind()).get_columns("cars")]
+    if "photo_variants" not in columns:
+        op.add_column("cars", sa.Column("photo_variants", sa.JSON(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("cars") as batch_op:
+        batch_op.drop_column("photo_variants")
@@ -0,0 +1,28 @@
+"""Versão dos dados do tenant (ETag das listagens)
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    columns = [c["name"] for c in sa.inspect(op.get_bind()).get_columns("tenants")]
+    if "data_version" not in columns:
+        op.add_column("tenants", sa.Column("data_version", sa.Integer(), nullable=False, server_default="0"))
+    if "data_changed_at" not in columns:
+        op.add_column("tenants", sa.Column("data_changed_at", sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("tenants") as batch_op:
+        batch_op.drop_column("data_changed_at")
+        batch_op.drop_column("data_version")
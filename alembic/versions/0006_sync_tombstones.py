@@ -0,0 +1,44 @@
+"""Tombstones e índices por updated_at para a sincronização incremental
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_cars_tenant_updated", "cars", ["tenant_id", "updated_at"]),
+    ("ix_clients_tenant_updated", "clients", ["tenant_id", "updated_at"]),
+    ("ix_documents_car_updated", "documents", ["car_id", "updated_at"]),
+]
+
+
+def upgrade():
+    if not sa.inspect(op.get_bind()).has_table("deleted_records"):
+        op.create_table(
+            "deleted_records",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("tenant_id", sa.Integer(), sa.ForeignKey("tenants.id"), nullable=False),
+            sa.Column("entity", sa.String(20), nullable=False),
+            sa.Column("entity_id", sa.Integer(), nullable=False),
+            sa.Column("deleted_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        )
+        op.create_index("ix_deleted_records_id", "deleted_records", ["id"])
+        op.create_index("ix_deleted_records_tenant_deleted", "deleted_records", ["tenant_id", "deleted_at"])
+
+    # if_not_exists: o create_all da aplicação pode já ter criado os índices
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, if_not_exists=True)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
+    op.drop_table("deleted_records")
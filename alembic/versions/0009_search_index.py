@@ -0,0 +1,119 @@
+"""Busca textual de carros e clientes (FTS5 no SQLite, GIN no PostgreSQL)
+
+As tabelas cars_fts/clients_fts do SQLite são mantidas por triggers em
+cars e clients. Migrações futuras que recriem essas tabelas com
+batch_alter_table precisam recriar os triggers.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+
+def _sqlite_digits(expr):
+    for char in (" ", "-", "(", ")", ".", "+", "/"):
+        expr = f"replace({expr}, '{char}', '')"
+    return expr
+
+
+def _sqlite_client_values(row):
+    phone = _sqlite_digits(f"coalesce({row}.phone, '')")
+    cpf = _sqlite_digits(f"coalesce({row}.cpf, '')")
+    return f"{row}.id, {row}.name, {row}.notes, {phone} || ' ' || substr({phone}, 3), {cpf}"
+
+
+CAR_COLUMNS = "title, brand, model, year, observations"
+CAR_VALUES = "new.id, new.title, new.brand, new.model, new.year, new.observations"
+
+SQLITE_UPGRADE = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS cars_fts USING fts5({CAR_COLUMNS}, tokenize = 'unicode61 remove_diacritics 2')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS clients_fts USING fts5(name, notes, phone, cpf, tokenize = 'unicode61 remove_diacritics 2')",
+    f"CREATE TRIGGER IF NOT EXISTS cars_fts_insert AFTER INSERT ON cars BEGIN "
+    f"INSERT INTO cars_fts(rowid, {CAR_COLUMNS}) VALUES ({CAR_VALUES}); END",
+    "CREATE TRIGGER IF NOT EXISTS cars_fts_delete AFTER DELETE ON cars BEGIN "
+    "DELETE FROM cars_fts WHERE rowid = old.id; END",
+    f"CREATE TRIGGER IF NOT EXISTS cars_fts_update AFTER UPDATE OF {CAR_COLUMNS} ON cars BEGIN "
+    f"DELETE FROM cars_fts WHERE rowid = old.id; INSERT INTO cars_fts(rowid, {CAR_COLUMNS}) VALUES ({CAR_VALUES}); END",
+    "CREATE TRIGGER IF NOT EXISTS clients_fts_insert AFTER INSERT ON clients BEGIN "
+    f"INSERT INTO clients_fts(rowid, name, notes, phone, cpf) VALUES ({_sqlite_client_values('new')}); END",
+    "CREATE TRIGGER IF NOT EXISTS clients_fts_delete AFTER DELETE ON clients BEGIN "
+    "DELETE FROM clients_fts WHERE rowid = old.id; END",
+    "CREATE TRIGGER IF NOT EXISTS clients_fts_update AFTER UPDATE OF name, notes, phone, cpf ON clients BEGIN "
+    "DELETE FROM clients_fts WHERE rowid = old.id; "
+    f"INSERT INTO clients_fts(rowid, name, notes, phone, cpf) VALUES ({_sqlite_client_values('new')}); END",
+    # Reindexar do zero (o create_all pode já ter criado e preenchido as tabelas)
+    "DELETE FROM cars_fts",
+    f"INSERT INTO cars_fts(rowid, {CAR_COLUMNS}) SELECT id, {CAR_COLUMNS} FROM cars",
+    "DELETE FROM clients_fts",
+    f"INSERT INTO clients_fts(rowid, name, notes, phone, cpf) SELECT {_sqlite_client_values('clients')} FROM clients",
+]
+
+SQLITE_DOWNGRADE = [
+    "DROP TRIGGER IF EXISTS cars_fts_insert",
+    "DROP TRIGGER IF EXISTS cars_fts_delete",
+    "DROP TRIGGER IF EXISTS cars_fts_update",
+    "DROP TRIGGER IF EXISTS clients_fts_insert",
+    "DROP TRIGGER IF EXISTS clients_fts_delete",
+    "DROP TRIGGER IF EXISTS clients_fts_update",
+    "DROP TABLE IF EXISTS cars_fts",
+    "DROP TABLE IF EXISTS clients_fts",
+]
+
+
+def _pg_digits(column):
+    return f"regexp_replace(coalesce({column}, ''), '[^0-9]', '', 'g')"
+
+
+CAR_TSVECTOR = (
+    "to_tsvector('simple', vv_unaccent(coalesce(title, '') || ' ' || coalesce(brand, '') || ' ' || "
+    "coalesce(model, '') || ' ' || coalesce(year::text, '') || ' ' || coalesce(observations, '')))"
+)
+CLIENT_TSVECTOR = (
+    "to_tsvector('simple', vv_unaccent(coalesce(name, '') || ' ' || coalesce(notes, '')) || ' ' || "
+    f"{_pg_digits('phone')} || ' ' || substr({_pg_digits('phone')}, 3) || ' ' || {_pg_digits('cpf')})"
+)
+
+POSTGRES_UPGRADE = [
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    # unaccent() não é IMMUTABLE e não pode ser usada em índices diretamente
+    "CREATE OR REPLACE FUNCTION vv_unaccent(text) RETURNS text "
+    "LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT "
+    "AS $$ SELECT public.unaccent('public.unaccent', $1) $$",
+    f"CREATE INDEX IF NOT EXISTS ix_cars_search ON cars USING GIN (({CAR_TSVECTOR}))",
+    f"CREATE INDEX IF NOT EXISTS ix_clients_search ON clients USING GIN (({CLIENT_TSVECTOR}))",
+]
+
+POSTGRES_DOWNGRADE = [
+    "DROP INDEX IF EXISTS ix_clients_search",
+    "DROP INDEX IF EXISTS ix_cars_search",
+    "DROP FUNCTION IF EXISTS vv_unaccent(text)",
+]
+
+
+def _run(statements):
+    for statement in statements:
+        op.execute(statement)
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        _run(SQLITE_UPGRADE)
+    elif dialect == "postgresql":
+        _run(POSTGRES_UPGRADE)
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        _run(SQLITE_DOWNGRADE)
+    elif dialect == "postgresql":
+        _run(POSTGRES_DOWNGRADE)
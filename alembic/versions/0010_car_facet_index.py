@@ -0,0 +1,22 @@
+"""Índice para os filtros e facetas de marca/modelo dos carros
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+
+revision = "0010"
+down_revision = "0009"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # if_not_exists: o create_all da aplicação pode já ter criado o índice
+    op.create_index("ix_cars_tenant_brand_model", "cars", ["tenant_id", "brand", "model"], if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index("ix_cars_tenant_brand_model", table_name="cars", if_exists=True)
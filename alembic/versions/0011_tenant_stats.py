@@ -0,0 +1,60 @@
+"""Agregados por tenant do /api/stats e data de venda dos carros
+
+Os agregados são preenchidos a partir das tabelas atuais. A data de venda
+só passa a ser registrada daqui em diante, então carros já vendidos não
+entram no tempo médio de venda.
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0011"
+down_revision = "0010"
+branch_labels = None
+depends_on = None
+
+BACKFILL = [
+    "DELETE FROM tenant_stats",
+    "INSERT INTO tenant_stats (tenant_id, metric, key, count, total) "
+    "SELECT tenant_id, 'cars', coalesce(status, 'unknown'), count(*), coalesce(sum(price), 0) "
+    "FROM cars WHERE tenant_id IS NOT NULL GROUP BY tenant_id, coalesce(status, 'unknown')",
+    "INSERT INTO tenant_stats (tenant_id, metric, key, count, total) "
+    "SELECT tenant_id, 'clients', coalesce(negotiation_status, 'unknown'), count(*), 0 "
+    "FROM clients WHERE tenant_id IS NOT NULL GROUP BY tenant_id, coalesce(negotiation_status, 'unknown')",
+    "INSERT INTO tenant_stats (tenant_id, metric, key, count, total) "
+    "SELECT c.tenant_id, 'documents', CASE WHEN d.is_completed THEN 'completed' ELSE 'pending' END, count(*), 0 "
+    "FROM documents d JOIN cars c ON c.id = d.car_id WHERE c.tenant_id IS NOT NULL "
+    "GROUP BY c.tenant_id, CASE WHEN d.is_completed THEN 'completed' ELSE 'pending' END",
+]
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if "sold_at" not in [c["name"] for c in inspector.get_columns("cars")]:
+        op.add_column("cars", sa.Column("sold_at", sa.DateTime(timezone=True), nullable=True))
+
+    if not inspector.has_table("tenant_stats"):
+        op.create_table(
+            "tenant_stats",
+            sa.Column("tenant_id", sa.Integer(), sa.ForeignKey("tenants.id"), primary_key=True),
+            sa.Column("metric", sa.String(20), primary_key=True),
+            sa.Column("key", sa.String(50), primary_key=True),
+            sa.Column("count", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("total", sa.Float(), nullable=False, server_default="0"),
+        )
+
+    for statement in BACKFILL:
+        op.execute(statement)
+
+
+def downgrade():
+    op.drop_table("tenant_stats")
+    # Sem batch_alter_table: recriar cars apagaria os triggers de busca (0009)
+    if op.get_bind().dialect.name == "sqlite":
+        op.execute("ALTER TABLE cars DROP COLUMN sold_at")
+    else:
+        op.drop_column("cars", "sold_at")
@@ -0,0 +1,81 @@
+"""
+API de Análise de Preços do Estoque
+"""
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import BaseModel
+
+from app.db import get_query_db
+from app.api.auth import get_current_user, CurrentUser
+from app.api.cars import CarCreate
+from app.utils.analytics import get_price_table
+from app.utils.conditional import conditional_get, get_read_db
+
+router = APIRouter(prefix="/analytics", tags=["Analytics"])
+
+# Schemas
+class PricePercentiles(BaseModel):
+    brand: str
+    model: Optional[str]
+    year: Optional[int]
+    count: int
+    p10: float
+    p25: float
+    p50: float
+    p75: float
+    p90: float
+
+class PriceSuggestion(BaseModel):
+    level: Optional[Literal["brand", "model", "year"]] = None
+    count: int = 0
+    low: Optional[float] = None
+    median: Optional[float] = None
+    high: Optional[float] = None
+
+class PriceOutlier(BaseModel):
+    car_id: int
+    price: float
+    level: Literal["model", "year"]
+    median: float
+    low: float
+    high: float
+    direction: Literal["below", "above"]
+
+# Rotas
+@router.get("/prices", response_model=List[PricePercentiles], dependencies=[Depends(conditional_get)])
+async def get_price_percentiles(
+    group_by: Literal["brand", "model", "year"] = "model",
+    db: AsyncSession = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Percentis de preço por marca, marca+modelo ou marca+modelo+ano
+
+    Marca e modelo são agrupados sem diferenciar maiúsculas. Carros sem
+    preço ficam de fora.
+    """
+    table = await get_price_table(db, current_user.tenant_id)
+    return table.percentiles(group_by)
+
+@router.post("/prices/suggest", response_model=PriceSuggestion)
+async def suggest_price(
+    car_data: CarCreate,
+    db: AsyncSession = Depends(get_query_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Faixa de preço sugerida (p25 a p75) para um carro novo
+
+    Usa o grupo mais específico (marca+modelo+ano, marca+modelo ou marca)
+    com pelo menos 5 carros; sem grupo suficiente, volta sem faixa.
+    """
+    table = await get_price_table(db, current_user.tenant_id)
+    return table.suggest(car_data.brand, car_data.model, car_data.year) or {}
+
+@router.get("/prices/outliers", response_model=List[PriceOutlier], dependencies=[Depends(conditional_get)])
+async def get_price_outliers(
+    db: AsyncSession = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Carros com preço fora do padrão do seu grupo (cercas de Tukey, 1,5 x IQR)"""
+    table = await get_price_table(db, current_user.tenant_id)
+    return table.outliers()
@@ -8,7 +8,8 @@ from datetime import datetime, timedelta
 from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy import select, event, inspect
+from sqlalchemy.ext.asyncio import AsyncSession
 from jose import JWTError, jwt
 from pydantic import BaseModel, ConfigDict
 
@@ -16,12 +17,20 @@ from app.db import get_db
 from app.models.user import User
 from app.models.tenant import Tenant
 from app.config import settings
+from app.utils.cache import TTLCache
 
 # Configurações
 SECRET_KEY = settings.SECRET_KEY
 ALGORITHM = settings.ALGORITHM
 ACCESS_TOKEN_EXPIRE_MINUTES = settings.ACCESS_TOKEN_EXPIRE_MINUTES
 
+# Cache do usuário autenticado, indexado pelo "sub" do token. É local ao
+# processo: alterações feitas em outro worker aparecem após o TTL.
+principal_cache = TTLCache(
+    maxsize=settings.AUTH_CACHE_MAX_SIZE,
+    ttl=settings.AUTH_CACHE_TTL_SECONDS
+)
+
 # Funções de hash de senha simples e seguras
 def get_password_hash(password: str) -> str:
     """Gera hash da senha usando SHA-256 com salt"""
@@ -65,8 +74,29 @@ class UserResponse(BaseModel):
     tenant_id: int
     is_active: bool
 
+class CurrentUser(BaseModel):
+    """Dados do usuário autenticado usados pelas rotas"""
+    model_config = ConfigDict(from_attributes=True)
+    
+    id: int
+    email: str
+    tenant_id: int
+    is_active: bool = True
+    is_admin: bool = False
+
 # Funções auxiliares JWT
 
+def build_token_data(user: User) -> dict:
+    """Monta o payload do token, com id e tenant se JWT_EMBED_CLAIMS estiver ativo"""
+    data = {"sub": user.email}
+    if settings.JWT_EMBED_CLAIMS:
+        data.update({
+            "uid": user.id,
+            "tid": user.tenant_id,
+            "adm": bool(user.is_admin)
+        })
+    return data
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -77,8 +107,9 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def authenticate_user(db: Session, email: str, password: str):
-    user = db.query(User).filter(User.email == email).first()
+async def authenticate_user(db: AsyncSession, email: str, password: str):
+    result = await db.execute(select(User).where(User.email == email))
+    user = result.scalars().first()
     if not user:
         return False
     if not verify_password(password, user.hashed_password):
@@ -87,7 +118,7 @@ def authenticate_user(db: Session, email: str, password: str):
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -103,17 +134,46 @@ async def get_current_user(
     except JWTError:
         raise credentials_exception
     
-    user = db.query(User).filter(User.email == email).first()
-    if user is None:
+    # Token com id/tenant embutidos: nenhuma consulta necessária. Usuários
+    # desativados continuam válidos até o token expirar (o login já os
+    # recusa, então não recebem um token novo).
+    if settings.JWT_EMBED_CLAIMS and "uid" in payload and "tid" in payload:
+        return CurrentUser(
+            id=payload["uid"],
+            email=email,
+            tenant_id=payload["tid"],
+            is_admin=payload.get("adm", False)
+        )
+    
+    principal = principal_cache.get(email)
+    if principal is None:
+        result = await db.execute(select(User).where(User.email == email))
+        user = result.scalars().first()
+        if user is None:
+            raise credentials_exception
+        principal = CurrentUser.model_validate(user)
+        principal_cache.set(email, principal)
+    
+    if not principal.is_active:
         raise credentials_exception
-    return user
+    return principal
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def invalidate_principal(mapper, connection, target):
+    """Remove do cache o usuário alterado ou removido"""
+    principal_cache.delete(target.email)
+    # Se o email mudou, o valor antigo também é uma chave do cache
+    for old_email in inspect(target).attrs.email.history.deleted:
+        principal_cache.delete(old_email)
 
 # Rotas
 @router.post("/register", response_model=Token)
-async def register(user_data: UserRegister, db: Session = Depends(get_db)):
+async def register(user_data: UserRegister, db: AsyncSession = Depends(get_db)):
     try:
         # Verificar se usuário já existe
-        db_user = db.query(User).filter(User.email == user_data.email).first()
+        result = await db.execute(select(User).where(User.email == user_data.email))
+        db_user = result.scalars().first()
         if db_user:
             raise HTTPException(
                 status_code=400,
@@ -132,15 +192,16 @@ async def register(user_data: UserRegister, db: Session = Depends(get_db)):
         # Remove caracteres especiais
         tenant_slug = ''.join(c for c in tenant_slug if c.isalnum() or c == '-')
         
-        tenant = db.query(Tenant).filter(Tenant.slug == tenant_slug).first()
+        result = await db.execute(select(Tenant).where(Tenant.slug == tenant_slug))
+        tenant = result.scalars().first()
         if not tenant:
             tenant = Tenant(
                 name=user_data.tenant_name,
                 slug=tenant_slug
             )
             db.add(tenant)
-            db.commit()
-            db.refresh(tenant)
+            await db.commit()
+            await db.refresh(tenant)
         
         # Criar usuário
         hashed_password = get_password_hash(user_data.password)
@@ -151,13 +212,13 @@ async def register(user_data: UserRegister, db: Session = Depends(get_db)):
             tenant_id=tenant.id
         )
         db.add(db_user)
-        db.commit()
-        db.refresh(db_user)
+        await db.commit()
+        await db.refresh(db_user)
         
         # Gerar token
         access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
         access_token = create_access_token(
-            data={"sub": db_user.email}, expires_delta=access_token_expires
+            data=build_token_data(db_user), expires_delta=access_token_expires
         )
         
         return {"access_token": access_token, "token_type": "bearer"}
@@ -171,18 +232,23 @@ async def register(user_data: UserRegister, db: Session = Depends(get_db)):
         )
 
 @router.post("/login", response_model=Token)
-async def login(user_data: UserLogin, db: Session = Depends(get_db)):
+async def login(user_data: UserLogin, db: AsyncSession = Depends(get_db)):
     try:
-        user = authenticate_user(db, user_data.email, user_data.password)
+        user = await authenticate_user(db, user_data.email, user_data.password)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Incorrect email or password",
                 headers={"WWW-Authenticate": "Bearer"},
             )
+        if not user.is_active:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Inactive user"
+            )
         access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
         access_token = create_access_token(
-            data={"sub": user.email}, expires_delta=access_token_expires
+            data=build_token_data(user), expires_delta=access_token_expires
         )
         return {"access_token": access_token, "token_type": "bearer"}
     
@@ -195,5 +261,14 @@ async def login(user_data: UserLogin, db: Session = Depends(get_db)):
         )
 
 @router.get("/me", response_model=UserResponse)
-async def read_users_me(current_user: User = Depends(get_current_user)):
-    return current_user
\ No newline at end of file
+async def read_users_me(
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    user = await db.get(User, current_user.id)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    return user
\ No newline at end of file
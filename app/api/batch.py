@@ -0,0 +1,317 @@
+"""
+API de Operações em Lote (fila offline do PWA)
+"""
+from datetime import datetime, timedelta, timezone
+from itertools import groupby
+from types import SimpleNamespace
+from typing import Any, Dict, List, Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import select, insert, update, delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import BaseModel, Field, ValidationError
+
+from app.db import get_db
+from app.models.car import Car
+from app.models.client import Client
+from app.models.document import Document
+from app.models.idempotency_key import IdempotencyKey
+from app.api.auth import get_current_user, CurrentUser
+from app.api.cars import CarCreate, CarUpdate, CarResponse
+from app.api.clients import ClientCreate, ClientUpdate, ClientResponse
+from app.api.docs import DocumentCreate, DocumentUpdate, DocumentResponse
+from app.utils.conditional import bump_data_version
+from app.utils.pagination import timestamp_param
+from app.utils.sync import record_deletions
+from app.utils.upload import release_file, delete_file
+from app.utils.images import delete_image_variants
+from app.utils.stats import StatsDelta, sold_at_for
+
+router = APIRouter(prefix="/batch", tags=["Batch"])
+
+MAX_OPERATIONS = 500
+# Por quanto tempo uma operação repetida devolve o resultado original
+IDEMPOTENCY_KEY_TTL = timedelta(days=7)
+
+# resource -> (modelo, schema de criação, schema de atualização, schema de resposta)
+RESOURCES = {
+    "cars": (Car, CarCreate, CarUpdate, CarResponse),
+    "clients": (Client, ClientCreate, ClientUpdate, ClientResponse),
+    "documents": (Document, DocumentCreate, DocumentUpdate, DocumentResponse),
+}
+
+# Schemas
+class BatchOperation(BaseModel):
+    op: Literal["create", "update", "delete"]
+    resource: Literal["cars", "clients", "documents"]
+    id: Optional[int] = None
+    data: Dict[str, Any] = {}
+    idempotency_key: Optional[str] = Field(None, max_length=255)
+
+class BatchRequest(BaseModel):
+    operations: List[BatchOperation]
+
+class BatchResult(BaseModel):
+    status: int
+    id: Optional[int] = None
+    data: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    replayed: bool = False
+
+class BatchResponse(BaseModel):
+    results: List[BatchResult]
+
+def _error(status_code: int, message: str, row_id: Optional[int] = None) -> dict:
+    return {"status": status_code, "id": row_id, "error": message}
+
+def _validation_error(e: ValidationError) -> dict:
+    message = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+    return _error(422, message)
+
+async def _load_existing(db: AsyncSession, tenant_id: int, operations: List[BatchOperation]) -> Dict[str, dict]:
+    """Carrega, com uma consulta por recurso, as linhas do tenant citadas no lote"""
+    wanted = {"cars": set(), "clients": set(), "documents": set()}
+    for operation in operations:
+        if operation.op != "create" and operation.id is not None:
+            wanted[operation.resource].add(operation.id)
+        car_id = operation.data.get("car_id")
+        if operation.resource != "cars" and isinstance(car_id, int):
+            wanted["cars"].add(car_id)
+
+    existing: Dict[str, dict] = {"cars": {}, "clients": {}, "documents": {}}
+    if wanted["cars"]:
+        result = await db.execute(
+            select(Car.id, Car.photo_url, Car.photo_variants, Car.status, Car.price,
+                   Car.created_at, Car.sold_at)
+            .where(Car.tenant_id == tenant_id, Car.id.in_(wanted["cars"]))
+        )
+        existing["cars"] = {row.id: row for row in result.all()}
+    if wanted["clients"]:
+        result = await db.execute(
+            select(Client.id, Client.negotiation_status)
+            .where(Client.tenant_id == tenant_id, Client.id.in_(wanted["clients"]))
+        )
+        existing["clients"] = {row.id: row for row in result.all()}
+    if wanted["documents"]:
+        result = await db.execute(
+            select(Document.id, Document.file_url, Document.is_completed).join(Car)
+            .where(Car.tenant_id == tenant_id, Document.id.in_(wanted["documents"]))
+        )
+        existing["documents"] = {row.id: row for row in result.all()}
+    return existing
+
+def _car_error(resource: str, values: dict, existing: Dict[str, dict]) -> Optional[dict]:
+    """Clientes e documentos só podem apontar para carros do próprio tenant"""
+    car_id = values.get("car_id")
+    if resource == "cars" or car_id is None:
+        return None
+    if car_id not in existing["cars"]:
+        return _error(status.HTTP_404_NOT_FOUND, "Car not found")
+    return None
+
+def _merge(row, values: dict) -> SimpleNamespace:
+    """Linha carregada (ou já atualizada no lote) com os valores novos"""
+    current = row._asdict() if hasattr(row, "_asdict") else vars(row)
+    return SimpleNamespace(**{**current, **values})
+
+# Registra no StatsDelta uma linha de cada recurso
+STATS = {"cars": StatsDelta.car, "clients": StatsDelta.client, "documents": StatsDelta.document}
+
+async def _create(db, tenant_id, resource, group, existing, results, orphaned_files, stats):
+    model, create_schema, _, response_schema = RESOURCES[resource]
+    rows, indices = [], []
+    for index, operation in group:
+        try:
+            values = create_schema.model_validate(operation.data).model_dump()
+        except ValidationError as e:
+            results[index] = _validation_error(e)
+            continue
+        error = _car_error(resource, values, existing)
+        if error:
+            results[index] = error
+            continue
+        if resource != "documents":
+            values["tenant_id"] = tenant_id
+        rows.append(values)
+        indices.append(index)
+
+    if not rows:
+        return
+    # INSERT em lote; RETURNING devolve as linhas na ordem dos parâmetros
+    created = (await db.scalars(
+        insert(model).returning(model, sort_by_parameter_order=True), rows
+    )).all()
+    for index, obj in zip(indices, created):
+        STATS[resource](stats, obj)
+        results[index] = {
+            "status": status.HTTP_201_CREATED,
+            "id": obj.id,
+            "data": response_schema.model_validate(obj).model_dump(mode="json")
+        }
+
+async def _update(db, tenant_id, resource, group, existing, results, orphaned_files, stats):
+    model, _, update_schema, _ = RESOURCES[resource]
+    rows = []
+    for index, operation in group:
+        if operation.id not in existing[resource]:
+            results[index] = _error(status.HTTP_404_NOT_FOUND, f"{model.__name__} not found", operation.id)
+            continue
+        try:
+            values = update_schema.model_validate(operation.data).model_dump(exclude_unset=True)
+        except ValidationError as e:
+            results[index] = _validation_error(e)
+            continue
+        error = _car_error(resource, values, existing)
+        if error:
+            results[index] = error
+            continue
+        if values:
+            old = existing[resource][operation.id]
+            if resource == "cars" and "status" in values:
+                values["sold_at"] = sold_at_for(old.status, values["status"], old.sold_at)
+            # Operações seguintes do lote enxergam os valores novos
+            new = _merge(old, values)
+            existing[resource][operation.id] = new
+            STATS[resource](stats, old, -1)
+            STATS[resource](stats, new)
+            rows.append({"id": operation.id, **values})
+        results[index] = {"status": status.HTTP_200_OK, "id": operation.id}
+
+    if rows:
+        # UPDATE em lote pela chave primária (agrupado pelos campos alterados)
+        await db.execute(update(model), rows)
+
+async def _delete(db, tenant_id, resource, group, existing, results, orphaned_files, stats):
+    model = RESOURCES[resource][0]
+    ids = []
+    for index, operation in group:
+        row = existing[resource].pop(operation.id, None)
+        if row is None:
+            results[index] = _error(status.HTTP_404_NOT_FOUND, f"{model.__name__} not found", operation.id)
+            continue
+        ids.append(operation.id)
+        STATS[resource](stats, row, -1)
+        results[index] = {"status": status.HTTP_200_OK, "id": operation.id}
+
+        # Arquivos só são apagados depois do commit, se ficarem sem uso
+        file_url = row.photo_url if resource == "cars" else getattr(row, "file_url", None)
+        if file_url and await release_file(db, file_url):
+            orphaned_files.append((file_url, getattr(row, "photo_variants", None)))
+
+    if not ids:
+        return
+    if resource == "cars":
+        # Mesmo efeito do delete do ORM: clientes e documentos ficam sem carro
+        documents = (await db.execute(
+            select(Document.id, Document.is_completed).where(Document.car_id.in_(ids))
+        )).all()
+        await record_deletions(db, tenant_id, "documents", [row.id for row in documents])
+        for row in documents:
+            existing["documents"].pop(row.id, None)
+            stats.document(row, -1)
+        await db.execute(update(Client).where(Client.car_id.in_(ids)).values(car_id=None))
+        await db.execute(update(Document).where(Document.car_id.in_(ids)).values(car_id=None))
+    await record_deletions(db, tenant_id, resource, ids)
+    await db.execute(delete(model).where(model.id.in_(ids)))
+
+HANDLERS = {"create": _create, "update": _update, "delete": _delete}
+
+# Rotas
+@router.post("", response_model=BatchResponse)
+async def run_batch(
+    batch: BatchRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Aplicar várias operações de carros, clientes e documentos de uma vez
+
+    As operações rodam em ordem, numa única transação; sequências do mesmo
+    tipo viram um único INSERT/UPDATE/DELETE. Cada operação tem o próprio
+    resultado (201, 200, 404 ou 422) e uma falha não desfaz as demais.
+    Operações com `idempotency_key` já aplicada devolvem o resultado
+    original com `replayed=true`, sem executar de novo.
+
+    As linhas citadas são carregadas uma vez, no início do lote: update e
+    delete de uma linha criada no próprio lote retornam 404. Envie-os num
+    lote seguinte, com o id devolvido pelo create.
+    """
+    operations = batch.operations
+    if len(operations) > MAX_OPERATIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many operations (max {MAX_OPERATIONS})"
+        )
+
+    tenant_id = current_user.tenant_id
+    results: List[Optional[dict]] = [None] * len(operations)
+
+    # Resultados já gravados para as chaves recebidas
+    keys = {operation.idempotency_key for operation in operations if operation.idempotency_key}
+    stored: Dict[str, dict] = {}
+    if keys:
+        expired_before = datetime.now(timezone.utc) - IDEMPOTENCY_KEY_TTL
+        await db.execute(delete(IdempotencyKey).where(
+            IdempotencyKey.tenant_id == tenant_id,
+            IdempotencyKey.created_at < timestamp_param(expired_before, db.bind.dialect.name)
+        ))
+        result = await db.execute(
+            select(IdempotencyKey.key, IdempotencyKey.result)
+            .where(IdempotencyKey.tenant_id == tenant_id, IdempotencyKey.key.in_(keys))
+        )
+        stored = dict(result.all())
+
+    pending: List[int] = []
+    first_with_key: Dict[str, int] = {}
+    for index, operation in enumerate(operations):
+        key = operation.idempotency_key
+        if key in stored:
+            results[index] = {**stored[key], "replayed": True}
+        elif key in first_with_key:
+            continue  # repetida no próprio lote; copiada da primeira abaixo
+        else:
+            if key:
+                first_with_key[key] = index
+            pending.append(index)
+
+    existing = await _load_existing(db, tenant_id, [operations[i] for i in pending])
+    orphaned_files = []
+    stats = StatsDelta(tenant_id)
+
+    for (op, resource), group in groupby(pending, key=lambda i: (operations[i].op, operations[i].resource)):
+        group = [(index, operations[index]) for index in group]
+        if op != "create" and any(operation.id is None for _, operation in group):
+            for index, operation in group:
+                if operation.id is None:
+                    results[index] = _error(422, "id is required")
+            group = [(index, operation) for index, operation in group if operation.id is not None]
+        await HANDLERS[op](db, tenant_id, resource, group, existing, results, orphaned_files, stats)
+    await stats.apply(db)
+
+    for index, operation in enumerate(operations):
+        if results[index] is None:
+            results[index] = {**results[first_with_key[operation.idempotency_key]], "replayed": True}
+
+    if any(results[index]["status"] < 300 for index in pending):
+        await bump_data_version(db, tenant_id)
+
+    try:
+        if first_with_key:
+            await db.execute(insert(IdempotencyKey), [
+                {"tenant_id": tenant_id, "key": key, "result": results[index]}
+                for key, index in first_with_key.items()
+            ])
+        await db.commit()
+    except IntegrityError:
+        # Outro lote gravou as mesmas chaves ao mesmo tempo; repetir devolve
+        # os resultados dele
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Batch conflicted with a concurrent request, retry"
+        )
+
+    for file_url, photo_variants in orphaned_files:
+        await delete_file(file_url)
+        await delete_image_variants(photo_variants)
+
+    return {"results": results}
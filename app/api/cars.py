@@ -1,38 +1,49 @@
 """
 API de Carros
 """
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile, Response, Query
+from sqlalchemy import select, func, case
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from pydantic import BaseModel, ConfigDict
 
 from app.db import get_db
 from app.models.car import Car
-from app.models.user import User
-from app.api.auth import get_current_user
-from app.utils.upload import save_uploaded_file, delete_file
+from app.models.client import Client
+from app.models.document import Document
+from app.api.auth import get_current_user, CurrentUser
+from app.api.clients import ClientResponse
+from app.api.docs import DocumentResponse
+from app.utils.upload import store_upload, reference_upload, discard_upload, delete_file, release_file
+from app.utils.upload import WithoutUploadFields
+from app.utils.pagination import apply_cursor, set_next_cursor
+from app.utils.conditional import conditional_get, get_read_db, bump_data_version
+from app.utils.sync import record_deletions
+from app.utils.images import create_image_variants, delete_image_variants, strip_metadata
+from app.utils.stats import StatsDelta, sold_at_for
 
 router = APIRouter(prefix="/cars", tags=["Cars"])
 
 # Schemas
-class CarCreate(BaseModel):
+# photo_url/photo_variants não entram na escrita: só o upload (que conta a
+# referência do arquivo em stored_files) define a foto
+class CarCreate(WithoutUploadFields):
     title: str
     brand: str
     model: str
     year: int
     price: Optional[float] = None
-    photo_url: Optional[str] = None
     observations: Optional[str] = None
     status: str = "available"
 
-class CarUpdate(BaseModel):
+class CarUpdate(WithoutUploadFields):
     title: Optional[str] = None
     brand: Optional[str] = None
     model: Optional[str] = None
     year: Optional[int] = None
     price: Optional[float] = None
-    photo_url: Optional[str] = None
     observations: Optional[str] = None
     status: Optional[str] = None
 
@@ -46,39 +57,249 @@ class CarResponse(BaseModel):
     year: int
     price: Optional[float]
     photo_url: Optional[str]
+    photo_variants: Optional[Dict[str, Dict[str, str]]] = None
     observations: Optional[str]
     status: str
+    sold_at: Optional[datetime] = None
     tenant_id: int
+    # Preenchidos apenas com include=client_counts
+    client_count: Optional[int] = None
+    client_status_counts: Optional[Dict[str, int]] = None
+
+class CarFullResponse(CarResponse):
+    clients: List[ClientResponse]
+    documents: List[DocumentResponse]
+
+async def with_client_counts(db: AsyncSession, cars: List[Car], tenant_id: int) -> List[CarResponse]:
+    """Anexa aos carros a contagem de clientes, calculada com um único GROUP BY"""
+    counts: Dict[int, Dict[str, int]] = {car.id: {} for car in cars}
+    if counts:
+        result = await db.execute(
+            select(Client.car_id, Client.negotiation_status, func.count(Client.id))
+            .where(Client.tenant_id == tenant_id, Client.car_id.in_(counts.keys()))
+            .group_by(Client.car_id, Client.negotiation_status)
+        )
+        for car_id, negotiation_status, total in result.all():
+            counts[car_id][negotiation_status or "unknown"] = total
+    
+    return [
+        CarResponse.model_validate(car).model_copy(update={
+            "client_count": sum(counts[car.id].values()),
+            "client_status_counts": counts[car.id]
+        })
+        for car in cars
+    ]
+
+class FacetCount(BaseModel):
+    value: Optional[str]
+    count: int
+    # Limites das faixas (year e price); o máximo é exclusivo
+    min: Optional[int] = None
+    max: Optional[int] = None
+
+class CarFacetsResponse(BaseModel):
+    total: int
+    brand: List[FacetCount]
+    model: List[FacetCount]
+    year: List[FacetCount]
+    price: List[FacetCount]
+    status: List[FacetCount]
+
+class CarFilters:
+    """Filtros da listagem de carros, compartilhados com as facetas"""
+    def __init__(
+        self,
+        status: Optional[str] = None,
+        brand: Optional[List[str]] = Query(None),
+        model: Optional[List[str]] = Query(None),
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        min_year: Optional[int] = None,
+        max_year: Optional[int] = None
+    ):
+        self.status = status
+        self.brand = brand
+        self.model = model
+        self.min_price = min_price
+        self.max_price = max_price
+        self.min_year = min_year
+        self.max_year = max_year
+
+    def apply(self, query):
+        if self.status:
+            query = query.where(Car.status == self.status)
+        if self.brand:
+            query = query.where(Car.brand.in_(self.brand))
+        if self.model:
+            query = query.where(Car.model.in_(self.model))
+        if self.min_price is not None:
+            query = query.where(Car.price >= self.min_price)
+        if self.max_price is not None:
+            query = query.where(Car.price <= self.max_price)
+        if self.min_year is not None:
+            query = query.where(Car.year >= self.min_year)
+        if self.max_year is not None:
+            query = query.where(Car.year <= self.max_year)
+        return query
+
+YEAR_BUCKET_SIZE = 5
+PRICE_BUCKETS = [0, 20000, 40000, 60000, 80000, 100000, 150000, 200000]
+FACETS = ["brand", "model", "year", "price", "status"]
+
+def facet_source(tenant_id: int, filters: CarFilters):
+    """Subconsulta com uma coluna por faceta (faixas já calculadas)"""
+    # Carros sem preço ficam com faixa nula
+    price_bucket = case(
+        *[(Car.price >= edge, edge) for edge in reversed(PRICE_BUCKETS[1:])],
+        (Car.price.is_not(None), PRICE_BUCKETS[0])
+    )
+    query = select(
+        Car.brand.label("brand"),
+        Car.model.label("model"),
+        (Car.year - Car.year % YEAR_BUCKET_SIZE).label("year"),
+        price_bucket.label("price"),
+        Car.status.label("status")
+    ).where(Car.tenant_id == tenant_id)
+    return filters.apply(query).subquery()
+
+def facet_count(facet: str, value, total: int) -> FacetCount:
+    if value is None:
+        return FacetCount(value=None, count=total)
+    if facet == "year":
+        return FacetCount(value=str(value), count=total, min=value, max=value + YEAR_BUCKET_SIZE)
+    if facet == "price":
+        index = PRICE_BUCKETS.index(value)
+        upper = PRICE_BUCKETS[index + 1] if index + 1 < len(PRICE_BUCKETS) else None
+        return FacetCount(value=str(value), count=total, min=value, max=upper)
+    return FacetCount(value=str(value), count=total)
+
+async def compute_facets(db: AsyncSession, tenant_id: int, filters: CarFilters) -> Dict[str, Dict]:
+    """Contagens por faceta: {faceta: {valor: total}}
+
+    No PostgreSQL é uma única consulta com GROUPING SETS; nos demais
+    bancos, um GROUP BY por faceta sobre a mesma subconsulta.
+    """
+    source = facet_source(tenant_id, filters)
+    counts: Dict[str, Dict] = {facet: {} for facet in FACETS}
+    columns = [source.c[facet] for facet in FACETS]
+
+    if db.bind.dialect.name == "postgresql":
+        # grouping(col) = 0 indica a qual conjunto a linha pertence
+        result = await db.execute(
+            select(*columns, *[func.grouping(col) for col in columns], func.count())
+            .group_by(func.grouping_sets(*columns))
+        )
+        for row in result.all():
+            values, grouped, total = row[:len(FACETS)], row[len(FACETS):-1], row[-1]
+            facet_index = grouped.index(0)
+            counts[FACETS[facet_index]][values[facet_index]] = total
+        return counts
+
+    for facet, col in zip(FACETS, columns):
+        result = await db.execute(select(col, func.count()).group_by(col))
+        counts[facet] = dict(result.all())
+    return counts
 
 # Rotas
-@router.get("/", response_model=List[CarResponse])
+@router.get("/", response_model=List[CarResponse], dependencies=[Depends(conditional_get)])
 async def get_cars(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
-    status: Optional[str] = None,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    cursor: Optional[str] = None,
+    include: Optional[str] = None,
+    filters: CarFilters = Depends(),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
-    """Listar todos os carros do tenant"""
-    query = db.query(Car).filter(Car.tenant_id == current_user.tenant_id)
+    """Listar todos os carros do tenant
+    
+    Use o header X-Next-Cursor da resposta como `cursor` para buscar a
+    próxima página; `skip` é ignorado quando há cursor. Com
+    `include=client_counts` cada carro traz a contagem de clientes por
+    status de negociação. `brand` e `model` aceitam vários valores
+    (?brand=Honda&brand=Fiat); preço e ano aceitam faixas (min_/max_).
+    """
+    query = select(Car).where(Car.tenant_id == current_user.tenant_id)
+    query = filters.apply(query)
     
-    if status:
-        query = query.filter(Car.status == status)
+    query = apply_cursor(query, Car, cursor, db.bind.dialect.name)
+    if not cursor:
+        query = query.offset(skip)
     
-    cars = query.offset(skip).limit(limit).all()
+    result = await db.execute(query.limit(limit))
+    cars = result.scalars().all()
+    set_next_cursor(response, cars, limit)
+    
+    if include and "client_counts" in include.split(","):
+        return await with_client_counts(db, cars, current_user.tenant_id)
     return cars
 
-@router.get("/{car_id}", response_model=CarResponse)
+@router.get("/facets", response_model=CarFacetsResponse, dependencies=[Depends(conditional_get)])
+async def get_car_facets(
+    facet_limit: int = Query(50, ge=1, le=500),
+    filters: CarFilters = Depends(),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Contagem de carros por marca, modelo, faixa de ano, faixa de preço e status
+
+    Aceita os mesmos filtros da listagem e conta apenas os carros que os
+    atendem. Marcas e modelos vêm dos mais frequentes para os menos
+    frequentes (até `facet_limit`); faixas de ano e preço em ordem
+    crescente. Carros sem preço aparecem com `value` nulo.
+    """
+    counts = await compute_facets(db, current_user.tenant_id, filters)
+    
+    response = {"total": sum(counts["status"].values())}
+    for facet in FACETS:
+        items = [facet_count(facet, value, total) for value, total in counts[facet].items()]
+        if facet in ("year", "price"):
+            items.sort(key=lambda item: (item.min is None, item.min or 0))
+        else:
+            items.sort(key=lambda item: (-item.count, item.value or ""))
+            items = items[:facet_limit]
+        response[facet] = items
+    return response
+
+@router.get("/{car_id}", response_model=CarResponse, dependencies=[Depends(conditional_get)])
 async def get_car(
     car_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """Obter detalhes de um carro específico"""
-    car = db.query(Car).filter(
+    result = await db.execute(select(Car).where(
         Car.id == car_id,
         Car.tenant_id == current_user.tenant_id
-    ).first()
+    ))
+    car = result.scalars().first()
+    
+    if not car:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Car not found"
+        )
+    
+    return car
+
+@router.get("/{car_id}/full", response_model=CarFullResponse, dependencies=[Depends(conditional_get)])
+async def get_car_full(
+    car_id: int,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Obter o carro com seus clientes e documentos em uma única chamada"""
+    # selectinload: 1 consulta para o carro + 1 para clientes + 1 para documentos
+    result = await db.execute(
+        select(Car)
+        .where(Car.id == car_id, Car.tenant_id == current_user.tenant_id)
+        .options(
+            selectinload(Car.clients.and_(Client.tenant_id == current_user.tenant_id)),
+            selectinload(Car.documents)
+        )
+    )
+    car = result.scalars().first()
     
     if not car:
         raise HTTPException(
@@ -91,8 +312,8 @@ async def get_car(
 @router.post("/", response_model=CarResponse)
 async def create_car(
     car_data: CarCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """Criar um novo carro"""
     db_car = Car(
@@ -101,8 +322,12 @@ async def create_car(
     )
     
     db.add(db_car)
-    db.commit()
-    db.refresh(db_car)
+    stats = StatsDelta(current_user.tenant_id)
+    stats.car(db_car)
+    await stats.apply(db)
+    await bump_data_version(db, current_user.tenant_id)
+    await db.commit()
+    await db.refresh(db_car)
     
     return db_car
 
@@ -110,40 +335,72 @@ async def create_car(
 async def upload_car_photo(
     car_id: int,
     file: UploadFile = File(...),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """Upload de foto para um carro"""
     # Verificar se o carro pertence ao tenant do usuário
-    car = db.query(Car).filter(
+    car_query = select(Car).where(
         Car.id == car_id,
         Car.tenant_id == current_user.tenant_id
-    ).first()
-    
-    if not car:
+    )
+    if (await db.execute(car_query)).scalars().first() is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Car not found"
         )
+    # Devolver a conexão (no SQLite, a única de escrita) enquanto o arquivo
+    # é gravado e processado
+    await db.rollback()
     
     try:
-        # Remover foto antiga se existir
-        if car.photo_url:
-            delete_file(car.photo_url)
+        # Salvar nova foto e gerar as variantes (thumb, card, full)
+        # O original é gravado sem EXIF (localização GPS, câmera...)
+        upload = await store_upload(file, "images", prepare=strip_metadata)
+        photo_url = upload.url
+        try:
+            photo_variants = await create_image_variants(photo_url)
+        except HTTPException:
+            await discard_upload(db, upload)
+            raise
+        
+        # Transação curta: o carro é relido (pode ter sido removido ou
+        # ganhado outra foto enquanto isso) e bloqueado até o commit
+        car = (await db.execute(car_query.with_for_update())).scalars().first()
+        if car is None:
+            if await discard_upload(db, upload):
+                await delete_image_variants(photo_variants)
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Car not found"
+            )
+        await reference_upload(db, upload)
         
-        # Salvar nova foto
-        photo_url = await save_uploaded_file(file, "images")
+        # Remover foto antiga só depois que a nova foi gravada, e apenas se
+        # nenhum outro registro usa o mesmo arquivo
+        old_photo_url = car.photo_url
+        old_photo_variants = car.photo_variants
+        orphaned = old_photo_url and await release_file(db, old_photo_url)
         
         # Atualizar carro
         car.photo_url = photo_url
-        db.commit()
+        car.photo_variants = photo_variants
+        await bump_data_version(db, current_user.tenant_id)
+        await db.commit()
+        
+        if orphaned:
+            await delete_file(old_photo_url)
+            await delete_image_variants(old_photo_variants)
         
         return {
             "message": "Photo uploaded successfully",
             "photo_url": photo_url,
+            "photo_variants": photo_variants,
             "car_id": car_id
         }
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -154,14 +411,15 @@ async def upload_car_photo(
 async def update_car(
     car_id: int,
     car_data: CarUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """Atualizar um carro existente"""
-    car = db.query(Car).filter(
+    result = await db.execute(select(Car).where(
         Car.id == car_id,
         Car.tenant_id == current_user.tenant_id
-    ).first()
+    ))
+    car = result.scalars().first()
     
     if not car:
         raise HTTPException(
@@ -169,26 +427,35 @@ async def update_car(
             detail="Car not found"
         )
     
+    stats = StatsDelta(current_user.tenant_id)
+    stats.car(car, -1)
+    old_status = car.status
+    
     # Atualizar apenas campos fornecidos
     for field, value in car_data.dict(exclude_unset=True).items():
         setattr(car, field, value)
+    car.sold_at = sold_at_for(old_status, car.status, car.sold_at)
     
-    db.commit()
-    db.refresh(car)
+    stats.car(car)
+    await stats.apply(db)
+    await bump_data_version(db, current_user.tenant_id)
+    await db.commit()
+    await db.refresh(car)
     
     return car
 
 @router.delete("/{car_id}")
 async def delete_car(
     car_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """Deletar um carro"""
-    car = db.query(Car).filter(
+    result = await db.execute(select(Car).where(
         Car.id == car_id,
         Car.tenant_id == current_user.tenant_id
-    ).first()
+    ))
+    car = result.scalars().first()
     
     if not car:
         raise HTTPException(
@@ -196,7 +463,27 @@ async def delete_car(
             detail="Car not found"
         )
     
-    db.delete(car)
-    db.commit()
+    orphaned = car.photo_url and await release_file(db, car.photo_url)
+    
+    # Os documentos ficam sem carro e deixam de aparecer para o tenant
+    documents = (await db.execute(
+        select(Document.id, Document.is_completed).where(Document.car_id == car.id)
+    )).all()
+    await record_deletions(db, current_user.tenant_id, "cars", [car.id])
+    await record_deletions(db, current_user.tenant_id, "documents", [row.id for row in documents])
+    
+    stats = StatsDelta(current_user.tenant_id)
+    stats.car(car, -1)
+    for row in documents:
+        stats.document(row, -1)
+    await stats.apply(db)
+    
+    await db.delete(car)
+    await bump_data_version(db, current_user.tenant_id)
+    await db.commit()
+    
+    if orphaned:
+        await delete_file(car.photo_url)
+        await delete_image_variants(car.photo_variants)
     
     return {"message": "Car deleted successfully"}
\ No newline at end of file
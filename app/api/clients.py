@@ -3,14 +3,18 @@ API de Clientes
 """
 from typing import List, Optional
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel, ConfigDict
 
 from app.db import get_db
 from app.models.client import Client
-from app.models.user import User
-from app.api.auth import get_current_user
+from app.api.auth import get_current_user, CurrentUser
+from app.utils.pagination import apply_cursor, set_next_cursor
+from app.utils.conditional import conditional_get, get_read_db, bump_data_version
+from app.utils.sync import record_deletions
+from app.utils.stats import StatsDelta
 
 router = APIRouter(prefix="/clients", tags=["Clients"])
 
@@ -47,38 +51,51 @@ class ClientResponse(BaseModel):
     tenant_id: int
 
 # Rotas
-@router.get("/", response_model=List[ClientResponse])
+@router.get("/", response_model=List[ClientResponse], dependencies=[Depends(conditional_get)])
 async def get_clients(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     status: Optional[str] = None,
     car_id: Optional[int] = None,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
-    """Listar todos os clientes do tenant"""
-    query = db.query(Client).filter(Client.tenant_id == current_user.tenant_id)
+    """Listar todos os clientes do tenant
+    
+    Use o header X-Next-Cursor da resposta como `cursor` para buscar a
+    próxima página; `skip` é ignorado quando há cursor.
+    """
+    query = select(Client).where(Client.tenant_id == current_user.tenant_id)
     
     if status:
-        query = query.filter(Client.negotiation_status == status)
+        query = query.where(Client.negotiation_status == status)
     
     if car_id:
-        query = query.filter(Client.car_id == car_id)
+        query = query.where(Client.car_id == car_id)
+    
+    query = apply_cursor(query, Client, cursor, db.bind.dialect.name)
+    if not cursor:
+        query = query.offset(skip)
     
-    clients = query.offset(skip).limit(limit).all()
+    result = await db.execute(query.limit(limit))
+    clients = result.scalars().all()
+    set_next_cursor(response, clients, limit)
     return clients
 
-@router.get("/{client_id}", response_model=ClientResponse)
+@router.get("/{client_id}", response_model=ClientResponse, dependencies=[Depends(conditional_get)])
 async def get_client(
     client_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """Obter detalhes de um cliente específico"""
-    client = db.query(Client).filter(
+    result = await db.execute(select(Client).where(
         Client.id == client_id,
         Client.tenant_id == current_user.tenant_id
-    ).first()
+    ))
+    client = result.scalars().first()
     
     if not client:
         raise HTTPException(
@@ -91,8 +108,8 @@ async def get_client(
 @router.post("/", response_model=ClientResponse)
 async def create_client(
     client_data: ClientCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """Criar um novo cliente"""
     db_client = Client(
@@ -101,8 +118,12 @@ async def create_client(
     )
     
     db.add(db_client)
-    db.commit()
-    db.refresh(db_client)
+    stats = StatsDelta(current_user.tenant_id)
+    stats.client(db_client)
+    await stats.apply(db)
+    await bump_data_version(db, current_user.tenant_id)
+    await db.commit()
+    await db.refresh(db_client)
     
     return db_client
 
@@ -110,14 +131,15 @@ async def create_client(
 async def update_client(
     client_id: int,
     client_data: ClientUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """Atualizar um cliente existente"""
-    client = db.query(Client).filter(
+    result = await db.execute(select(Client).where(
         Client.id == client_id,
         Client.tenant_id == current_user.tenant_id
-    ).first()
+    ))
+    client = result.scalars().first()
     
     if not client:
         raise HTTPException(
@@ -125,26 +147,33 @@ async def update_client(
             detail="Client not found"
         )
     
+    stats = StatsDelta(current_user.tenant_id)
+    stats.client(client, -1)
+    
     # Atualizar apenas campos fornecidos
     for field, value in client_data.dict(exclude_unset=True).items():
         setattr(client, field, value)
     
-    db.commit()
-    db.refresh(client)
+    stats.client(client)
+    await stats.apply(db)
+    await bump_data_version(db, current_user.tenant_id)
+    await db.commit()
+    await db.refresh(client)
     
     return client
 
 @router.delete("/{client_id}")
 async def delete_client(
     client_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """Deletar um cliente"""
-    client = db.query(Client).filter(
+    result = await db.execute(select(Client).where(
         Client.id == client_id,
         Client.tenant_id == current_user.tenant_id
-    ).first()
+    ))
+    client = result.scalars().first()
     
     if not client:
         raise HTTPException(
@@ -152,7 +181,12 @@ async def delete_client(
             detail="Client not found"
         )
     
-    db.delete(client)
-    db.commit()
+    await record_deletions(db, current_user.tenant_id, "clients", [client.id])
+    stats = StatsDelta(current_user.tenant_id)
+    stats.client(client, -1)
+    await stats.apply(db)
+    await db.delete(client)
+    await bump_data_version(db, current_user.tenant_id)
+    await db.commit()
     
     return {"message": "Client deleted successfully"}
\ No newline at end of file
@@ -3,33 +3,38 @@ API de Documentos
 """
 from typing import List, Optional
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile, Form
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile, Form, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel, ConfigDict
 
 from app.db import get_db
 from app.models.document import Document
 from app.models.car import Car
-from app.models.user import User
-from app.api.auth import get_current_user
-from app.utils.upload import save_uploaded_file, delete_file
+from app.api.auth import get_current_user, CurrentUser
+from app.utils.upload import store_upload, reference_upload, discard_upload, delete_file, release_file
+from app.utils.upload import WithoutUploadFields
+from app.utils.pagination import apply_cursor, set_next_cursor
+from app.utils.conditional import conditional_get, get_read_db, bump_data_version
+from app.utils.sync import record_deletions
+from app.utils.stats import StatsDelta
 
 router = APIRouter(prefix="/docs", tags=["Documents"])
 
 # Schemas
-class DocumentCreate(BaseModel):
+# file_url não entra na escrita: só os uploads (que contam a referência do
+# arquivo em stored_files) definem o arquivo
+class DocumentCreate(WithoutUploadFields):
     name: str
     document_type: str
-    file_url: Optional[str] = None
     notes: Optional[str] = None
     is_required: bool = False
     is_completed: bool = False
     car_id: int
 
-class DocumentUpdate(BaseModel):
+class DocumentUpdate(WithoutUploadFields):
     name: Optional[str] = None
     document_type: Optional[str] = None
-    file_url: Optional[str] = None
     notes: Optional[str] = None
     is_required: Optional[bool] = None
     is_completed: Optional[bool] = None
@@ -47,38 +52,51 @@ class DocumentResponse(BaseModel):
     car_id: int
 
 # Rotas
-@router.get("/", response_model=List[DocumentResponse])
+@router.get("/", response_model=List[DocumentResponse], dependencies=[Depends(conditional_get)])
 async def get_documents(
+    response: Response,
     car_id: Optional[int] = None,
     document_type: Optional[str] = None,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
-    """Listar documentos"""
-    query = db.query(Document).join(Car).filter(Car.tenant_id == current_user.tenant_id)
+    """Listar documentos
+    
+    Use o header X-Next-Cursor da resposta como `cursor` para buscar a
+    próxima página; `skip` é ignorado quando há cursor.
+    """
+    query = select(Document).join(Car).where(Car.tenant_id == current_user.tenant_id)
     
     if car_id:
-        query = query.filter(Document.car_id == car_id)
+        query = query.where(Document.car_id == car_id)
     
     if document_type:
-        query = query.filter(Document.document_type == document_type)
+        query = query.where(Document.document_type == document_type)
+    
+    query = apply_cursor(query, Document, cursor, db.bind.dialect.name)
+    if not cursor:
+        query = query.offset(skip)
     
-    documents = query.offset(skip).limit(limit).all()
+    result = await db.execute(query.limit(limit))
+    documents = result.scalars().all()
+    set_next_cursor(response, documents, limit)
     return documents
 
-@router.get("/{document_id}", response_model=DocumentResponse)
+@router.get("/{document_id}", response_model=DocumentResponse, dependencies=[Depends(conditional_get)])
 async def get_document(
     document_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """Obter detalhes de um documento específico"""
-    document = db.query(Document).join(Car).filter(
+    result = await db.execute(select(Document).join(Car).where(
         Document.id == document_id,
         Car.tenant_id == current_user.tenant_id
-    ).first()
+    ))
+    document = result.scalars().first()
     
     if not document:
         raise HTTPException(
@@ -91,15 +109,16 @@ async def get_document(
 @router.post("/", response_model=DocumentResponse)
 async def create_document(
     document_data: DocumentCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """Criar um novo documento"""
     # Verificar se o carro pertence ao tenant do usuário
-    car = db.query(Car).filter(
+    result = await db.execute(select(Car).where(
         Car.id == document_data.car_id,
         Car.tenant_id == current_user.tenant_id
-    ).first()
+    ))
+    car = result.scalars().first()
     
     if not car:
         raise HTTPException(
@@ -110,8 +129,12 @@ async def create_document(
     db_document = Document(**document_data.dict())
     
     db.add(db_document)
-    db.commit()
-    db.refresh(db_document)
+    stats = StatsDelta(current_user.tenant_id)
+    stats.document(db_document)
+    await stats.apply(db)
+    await bump_data_version(db, current_user.tenant_id)
+    await db.commit()
+    await db.refresh(db_document)
     
     return db_document
 
@@ -119,34 +142,55 @@ async def create_document(
 async def upload_document_file(
     document_id: int,
     file: UploadFile = File(...),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """Upload de arquivo para um documento"""
     # Verificar se o documento pertence ao tenant do usuário
-    document = db.query(Document).join(Car).filter(
+    document_query = select(Document).join(Car).where(
         Document.id == document_id,
         Car.tenant_id == current_user.tenant_id
-    ).first()
-    
-    if not document:
+    )
+    if (await db.execute(document_query)).scalars().first() is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Document not found"
         )
+    # Devolver a conexão (no SQLite, a única de escrita) durante a gravação
+    await db.rollback()
     
     try:
-        # Remover arquivo antigo se existir
-        if document.file_url:
-            delete_file(document.file_url)
-        
         # Salvar novo arquivo
-        file_url = await save_uploaded_file(file, "documents")
+        upload = await store_upload(file, "documents")
+        file_url = upload.url
+        
+        # Transação curta: o documento é relido e bloqueado até o commit
+        document = (await db.execute(document_query.with_for_update())).scalars().first()
+        if document is None:
+            await discard_upload(db, upload)
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Document not found"
+            )
+        await reference_upload(db, upload)
+        
+        # Remover arquivo antigo só depois que o novo foi gravado, e apenas
+        # se nenhum outro documento usa o mesmo arquivo
+        old_file_url = document.file_url
+        orphaned = old_file_url and await release_file(db, old_file_url)
         
         # Atualizar documento
+        stats = StatsDelta(current_user.tenant_id)
+        stats.document(document, -1)
         document.file_url = file_url
         document.is_completed = True
-        db.commit()
+        stats.document(document)
+        await stats.apply(db)
+        await bump_data_version(db, current_user.tenant_id)
+        await db.commit()
+        
+        if orphaned:
+            await delete_file(old_file_url)
         
         return {
             "message": "File uploaded successfully",
@@ -154,6 +198,8 @@ async def upload_document_file(
             "document_id": document_id
         }
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -168,31 +214,41 @@ async def create_document_with_file(
     file: UploadFile = File(...),
     notes: str = Form(""),
     is_required: str = Form("false"),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """Criar documento e fazer upload do arquivo em uma só operação"""
     # Verificar se o carro pertence ao tenant do usuário
-    car = db.query(Car).filter(
+    car_query = select(Car.id).where(
         Car.id == car_id,
         Car.tenant_id == current_user.tenant_id
-    ).first()
-    
-    if not car:
+    )
+    if (await db.execute(car_query)).first() is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Car not found"
         )
+    # Devolver a conexão (no SQLite, a única de escrita) durante a gravação
+    await db.rollback()
     
     try:
         # Salvar arquivo
-        file_url = await save_uploaded_file(file, "documents")
+        upload = await store_upload(file, "documents")
+        
+        # Transação curta: o carro pode ter sido removido enquanto isso
+        if (await db.execute(car_query)).first() is None:
+            await discard_upload(db, upload)
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Car not found"
+            )
+        await reference_upload(db, upload)
         
         # Criar documento
         db_document = Document(
             name=name,
             document_type=document_type,
-            file_url=file_url,
+            file_url=upload.url,
             notes=notes,
             is_required=is_required.lower() == 'true',
             is_completed=True,
@@ -200,11 +256,17 @@ async def create_document_with_file(
         )
         
         db.add(db_document)
-        db.commit()
-        db.refresh(db_document)
+        stats = StatsDelta(current_user.tenant_id)
+        stats.document(db_document)
+        await stats.apply(db)
+        await bump_data_version(db, current_user.tenant_id)
+        await db.commit()
+        await db.refresh(db_document)
         
         return db_document
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -215,14 +277,15 @@ async def create_document_with_file(
 async def update_document(
     document_id: int,
     document_data: DocumentUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """Atualizar um documento existente"""
-    document = db.query(Document).join(Car).filter(
+    result = await db.execute(select(Document).join(Car).where(
         Document.id == document_id,
         Car.tenant_id == current_user.tenant_id
-    ).first()
+    ))
+    document = result.scalars().first()
     
     if not document:
         raise HTTPException(
@@ -230,26 +293,33 @@ async def update_document(
             detail="Document not found"
         )
     
+    stats = StatsDelta(current_user.tenant_id)
+    stats.document(document, -1)
+    
     # Atualizar apenas campos fornecidos
     for field, value in document_data.dict(exclude_unset=True).items():
         setattr(document, field, value)
     
-    db.commit()
-    db.refresh(document)
+    stats.document(document)
+    await stats.apply(db)
+    await bump_data_version(db, current_user.tenant_id)
+    await db.commit()
+    await db.refresh(document)
     
     return document
 
 @router.delete("/{document_id}")
 async def delete_document(
     document_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """Deletar um documento"""
-    document = db.query(Document).join(Car).filter(
+    result = await db.execute(select(Document).join(Car).where(
         Document.id == document_id,
         Car.tenant_id == current_user.tenant_id
-    ).first()
+    ))
+    document = result.scalars().first()
     
     if not document:
         raise HTTPException(
@@ -257,7 +327,17 @@ async def delete_document(
             detail="Document not found"
         )
     
-    db.delete(document)
-    db.commit()
+    orphaned = document.file_url and await release_file(db, document.file_url)
+    
+    await record_deletions(db, current_user.tenant_id, "documents", [document.id])
+    stats = StatsDelta(current_user.tenant_id)
+    stats.document(document, -1)
+    await stats.apply(db)
+    await db.delete(document)
+    await bump_data_version(db, current_user.tenant_id)
+    await db.commit()
+    
+    if orphaned:
+        await delete_file(document.file_url)
     
     return {"message": "Document deleted successfully"}
\ No newline at end of file
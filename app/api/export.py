@@ -0,0 +1,119 @@
+"""
+API de Exportação (CSV/JSONL em streaming)
+"""
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime
+from typing import AsyncIterator, Literal
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+
+from app.db import AsyncSessionLocal
+from app.models.car import Car
+from app.models.client import Client
+from app.models.document import Document
+from app.api.auth import get_current_user, CurrentUser
+
+router = APIRouter(prefix="/export", tags=["Export"])
+
+# Linhas lidas do cursor do banco por vez
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_COLUMNS = {
+    "cars": [Car.id, Car.title, Car.brand, Car.model, Car.year, Car.price, Car.status,
+             Car.observations, Car.photo_url, Car.created_at, Car.updated_at],
+    "clients": [Client.id, Client.name, Client.phone, Client.cpf, Client.email,
+                Client.negotiation_status, Client.notes, Client.car_id,
+                Client.created_at, Client.updated_at],
+    "documents": [Document.id, Document.name, Document.document_type, Document.file_url,
+                  Document.notes, Document.is_required, Document.is_completed,
+                  Document.car_id, Document.created_at, Document.updated_at],
+}
+
+def export_query(resource: str, tenant_id: int):
+    """Somente colunas (sem objetos do ORM), em ordem de id"""
+    columns = EXPORT_COLUMNS[resource]
+    query = select(*columns)
+    if resource == "documents":
+        query = query.join(Car, Document.car_id == Car.id).where(Car.tenant_id == tenant_id)
+    else:
+        query = query.where(columns[0].table.c.tenant_id == tenant_id)
+    return query.order_by(columns[0])
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+async def export_lines(resource: str, tenant_id: int, fmt: str) -> AsyncIterator[bytes]:
+    """Gera o arquivo em blocos, um por lote lido do banco"""
+    names = [column.key for column in EXPORT_COLUMNS[resource]]
+
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(names)
+        # BOM para o Excel reconhecer o UTF-8
+        yield ("\ufeff" + buffer.getvalue()).encode()
+
+    # A sessão da requisição já foi fechada quando o corpo é enviado; o
+    # gerador abre a própria e lê com um cursor do lado do servidor
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(
+            export_query(resource, tenant_id).execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+        async for rows in result.partitions():
+            if fmt == "csv":
+                buffer.seek(0)
+                buffer.truncate()
+                writer.writerows(rows)
+                yield buffer.getvalue().encode()
+            else:
+                yield "".join(
+                    json.dumps(dict(zip(names, row)), default=_json_default, ensure_ascii=False) + "\n"
+                    for row in rows
+                ).encode()
+
+async def gzip_stream(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Compacta o fluxo em formato gzip sem juntar o conteúdo"""
+    compressor = zlib.compressobj(wbits=31)
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+# Rotas
+@router.get("/{resource}")
+async def export_resource(
+    resource: Literal["cars", "clients", "documents"],
+    format: Literal["csv", "jsonl"] = "csv",
+    gzip: bool = False,
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Exportar carros, clientes ou documentos do tenant
+
+    O arquivo é gerado enquanto é enviado, com memória constante
+    independentemente do tamanho do tenant. Use `gzip=true` para receber
+    o arquivo compactado (.gz).
+    """
+    body = export_lines(resource, current_user.tenant_id, format)
+    filename = f"{resource}-{date.today().isoformat()}.{format}"
+    media_type = "text/csv; charset=utf-8" if format == "csv" else "application/x-ndjson"
+
+    if gzip:
+        body = gzip_stream(body)
+        filename += ".gz"
+        media_type = "application/gzip"
+
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "Cache-Control": "no-store"
+        }
+    )
@@ -0,0 +1,184 @@
+"""
+API de Importação de Estoque (planilhas CSV/XLSX)
+"""
+import asyncio
+from datetime import datetime, timezone
+from itertools import islice
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, File, UploadFile, Response
+from sqlalchemy import select, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import BaseModel, ConfigDict, ValidationError
+
+from app.db import get_db, AsyncSessionLocal
+from app.models.car import Car
+from app.models.import_job import ImportJob
+from app.api.auth import get_current_user, CurrentUser
+from app.api.cars import CarCreate
+from app.utils.conditional import bump_data_version
+from app.utils.stats import StatsDelta
+from app.utils.spreadsheet import iter_rows, SpreadsheetError
+from app.utils.upload import stream_to_temp
+
+router = APIRouter(prefix="/cars", tags=["Cars"])
+
+ALLOWED_EXTENSIONS = {".csv", ".xlsx"}
+MAX_IMPORT_SIZE = 50 * 1024 * 1024  # 50MB
+# Arquivos até este tamanho são importados na própria requisição
+INLINE_IMPORT_MAX_SIZE = 256 * 1024
+BATCH_SIZE = 500
+MAX_REPORTED_ERRORS = 1000
+
+# Colunas gravadas pela importação (ordem usada no COPY)
+COPY_COLUMNS = list(CarCreate.model_fields) + ["tenant_id"]
+
+# Schemas
+class ImportJobResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    filename: Optional[str]
+    status: str
+    total_rows: int
+    imported_rows: int
+    error_count: int
+    errors: Optional[List[Dict[str, Any]]]
+    message: Optional[str]
+    created_at: Optional[datetime]
+    finished_at: Optional[datetime]
+
+async def insert_cars(db: AsyncSession, rows: List[dict]) -> None:
+    """Insere um lote de carros sem criar objetos do ORM (COPY no PostgreSQL)"""
+    if db.bind.dialect.name == "postgresql":
+        connection = await db.connection()
+        raw = await connection.get_raw_connection()
+        if not raw.driver_connection.is_in_transaction():
+            # O adaptador do asyncpg só abre a transação no primeiro comando
+            # enviado pelo SQLAlchemy; o COPY direto no driver rodaria fora
+            # dela (autocommit) e um rollback não o desfaria
+            await connection.exec_driver_sql("SELECT 1")
+        await raw.driver_connection.copy_records_to_table(
+            "cars",
+            records=[tuple(row[column] for column in COPY_COLUMNS) for row in rows],
+            columns=COPY_COLUMNS
+        )
+    else:
+        await db.execute(insert(Car), rows)
+
+async def run_import_job(job_id: int, path: Path, file_ext: str, tenant_id: int) -> None:
+    """Lê a planilha em lotes de BATCH_SIZE linhas, confirmando cada lote"""
+    async with AsyncSessionLocal(write_only=True) as db:
+        job = await db.get(ImportJob, job_id)
+        job.status = "running"
+        await db.commit()
+
+        errors: List[dict] = []
+        rows = iter_rows(path, file_ext)
+        try:
+            while True:
+                # A leitura do arquivo é bloqueante; roda fora do event loop
+                chunk = await asyncio.to_thread(lambda: list(islice(rows, BATCH_SIZE)))
+                if not chunk:
+                    break
+
+                valid = []
+                for line, raw in chunk:
+                    try:
+                        values = CarCreate.model_validate(raw).model_dump()
+                    except ValidationError as e:
+                        job.error_count += 1
+                        if len(errors) < MAX_REPORTED_ERRORS:
+                            errors.append({"row": line, "error": "; ".join(
+                                f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()
+                            )})
+                        continue
+                    values["tenant_id"] = tenant_id
+                    valid.append(values)
+
+                if valid:
+                    await insert_cars(db, valid)
+                    stats = StatsDelta(tenant_id)
+                    for values in valid:
+                        stats.car(values)
+                    await stats.apply(db)
+                    await bump_data_version(db, tenant_id)
+                job.total_rows += len(chunk)
+                job.imported_rows += len(valid)
+                job.errors = list(errors)
+                await db.commit()
+            job.status = "completed"
+        except SpreadsheetError as e:
+            await db.rollback()
+            job.status = "failed"
+            job.message = str(e)
+        except Exception as e:
+            await db.rollback()
+            job.status = "failed"
+            job.message = f"Erro inesperado: {e}"
+        finally:
+            rows.close()
+            path.unlink(missing_ok=True)
+
+        job.finished_at = datetime.now(timezone.utc)
+        await db.commit()
+
+# Rotas
+@router.post("/import", response_model=ImportJobResponse)
+async def import_cars(
+    response: Response,
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Importar carros de uma planilha CSV ou XLSX
+
+    Colunas aceitas: título, marca, modelo, ano, preço, observações e
+    status (em português ou com os nomes dos campos). Arquivos pequenos são
+    importados na hora; os maiores viram um job em segundo plano (202) a
+    ser acompanhado em GET /api/cars/import/{job_id}. Linhas inválidas são
+    ignoradas e listadas em `errors`.
+    """
+    file_ext = Path(file.filename or "").suffix.lower()
+    if file_ext not in ALLOWED_EXTENSIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Tipo de arquivo não permitido. Extensões aceitas: .csv, .xlsx"
+        )
+
+    temp_path, _, size = await stream_to_temp(file, MAX_IMPORT_SIZE)
+
+    job = ImportJob(tenant_id=current_user.tenant_id, filename=file.filename, status="pending")
+    db.add(job)
+    await db.commit()
+
+    if size <= INLINE_IMPORT_MAX_SIZE:
+        await run_import_job(job.id, temp_path, file_ext, current_user.tenant_id)
+        await db.refresh(job)
+        return job
+
+    background_tasks.add_task(run_import_job, job.id, temp_path, file_ext, current_user.tenant_id)
+    response.status_code = status.HTTP_202_ACCEPTED
+    return job
+
+@router.get("/import/{job_id}", response_model=ImportJobResponse)
+async def get_import_job(
+    job_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Acompanhar uma importação"""
+    result = await db.execute(select(ImportJob).where(
+        ImportJob.id == job_id,
+        ImportJob.tenant_id == current_user.tenant_id
+    ))
+    job = result.scalars().first()
+
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Import job not found"
+        )
+
+    return job
@@ -0,0 +1,73 @@
+"""
+API de Arquivos Enviados (uploads)
+"""
+import mimetypes
+from pathlib import Path
+from fastapi import APIRouter, HTTPException, Request, Response, status
+from fastapi.responses import FileResponse, RedirectResponse
+
+from app.config import settings
+from app.utils.storage import get_storage, LocalStorage
+from app.utils.conditional import etag_matches
+
+router = APIRouter(tags=["Media"])
+
+# Uploads nunca mudam no lugar (nome único ou hash do conteúdo), então
+# podem ficar em cache indefinidamente. Só as fotos dos carros são
+# públicas; documentos (CRLV, contratos com CPF) ficam fora de caches
+# compartilhados (CDN, proxy)
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+PRIVATE_IMMUTABLE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+
+def upload_cache_control(key: str) -> str:
+    """Cache-Control de um upload: público só para as fotos e suas variantes"""
+    if key.startswith("photos/"):
+        return IMMUTABLE_CACHE_CONTROL
+    return PRIVATE_IMMUTABLE_CACHE_CONTROL
+
+def upload_etag(key: str) -> str:
+    """ETag forte derivado do nome do arquivo (hash do conteúdo ou uuid)"""
+    return f'"{Path(key).stem}"'
+
+@router.api_route("/uploads/{key:path}", methods=["GET", "HEAD"])
+async def get_upload(key: str, request: Request):
+    """Servir um arquivo enviado com cache de longa duração
+
+    Suporta requisições condicionais (304), Range (via FileResponse) e,
+    com MEDIA_ACCEL_MODE, delega a transferência ao proxy (nginx/Apache).
+    """
+    storage = get_storage()
+
+    # Armazenamento externo: redirecionar para a URL assinada, mantendo o
+    # redirect em cache por menos tempo que a validade da assinatura
+    if not isinstance(storage, LocalStorage):
+        max_age = max(settings.S3_PRESIGN_EXPIRES - 60, 0)
+        return RedirectResponse(
+            storage.presigned_url(key),
+            status_code=status.HTTP_307_TEMPORARY_REDIRECT,
+            headers={"Cache-Control": f"private, max-age={max_age}"}
+        )
+
+    try:
+        path = storage.path(key)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
+    if not path.is_file():
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
+
+    etag = upload_etag(key)
+    headers = {"ETag": etag, "Cache-Control": upload_cache_control(key)}
+
+    if etag_matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    # O proxy lê o arquivo do disco; a aplicação só envia os headers
+    if settings.MEDIA_ACCEL_MODE == "x-accel":
+        headers["X-Accel-Redirect"] = settings.MEDIA_ACCEL_PREFIX.rstrip("/") + "/" + key
+    elif settings.MEDIA_ACCEL_MODE == "x-sendfile":
+        headers["X-Sendfile"] = str(path)
+    if settings.MEDIA_ACCEL_MODE:
+        media_type = mimetypes.guess_type(key)[0] or "application/octet-stream"
+        return Response(headers=headers, media_type=media_type)
+
+    return FileResponse(path, headers=headers)
\ No newline at end of file
@@ -0,0 +1,94 @@
+"""
+API de Busca (carros e clientes)
+"""
+import re
+import unicodedata
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import select, text, table, column
+from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import BaseModel
+
+from app.models.car import Car
+from app.models.client import Client
+from app.models.search import CAR_TSVECTOR, CLIENT_TSVECTOR
+from app.api.auth import get_current_user, CurrentUser
+from app.api.cars import CarResponse
+from app.api.clients import ClientResponse
+from app.utils.conditional import conditional_get, get_read_db
+
+router = APIRouter(prefix="/search", tags=["Search"])
+
+MIN_QUERY_LENGTH = 2
+# Consultas só com dígitos e pontuação são tratadas como telefone/CPF
+PHONE_OR_CPF = re.compile(r"^[\d\s().+\-/]+$")
+
+cars_fts = table("cars_fts", column("rowid"), column("rank"))
+clients_fts = table("clients_fts", column("rowid"), column("rank"))
+
+# Schemas
+class SearchResponse(BaseModel):
+    cars: List[CarResponse]
+    clients: List[ClientResponse]
+
+def search_terms(q: str) -> List[str]:
+    """Termos sem acento e em minúsculas; "(11) 9999-0000" vira um só termo"""
+    if PHONE_OR_CPF.match(q):
+        digits = re.sub(r"\D", "", q)
+        return [digits] if digits else []
+    normalized = unicodedata.normalize("NFKD", q.lower())
+    plain = "".join(c for c in normalized if not unicodedata.combining(c))
+    return re.findall(r"[a-z0-9]+", plain)
+
+def fts_match(terms: List[str]) -> str:
+    """Consulta FTS5: todos os termos, cada um como prefixo"""
+    return " ".join(f'"{term}"*' for term in terms)
+
+def tsquery(terms: List[str]) -> str:
+    """Consulta tsquery equivalente (termos já contêm só [a-z0-9])"""
+    return " & ".join(f"{term}:*" for term in terms)
+
+async def search_model(db: AsyncSession, model, fts, tsvector: str, terms: List[str], tenant_id: int, limit: int):
+    query = select(model).where(model.tenant_id == tenant_id)
+    if db.bind.dialect.name == "postgresql":
+        ts = "to_tsquery('simple', :q)"
+        query = (
+            query.where(text(f"{tsvector} @@ {ts}"))
+            .order_by(text(f"ts_rank({tsvector}, {ts}) DESC"))
+            .params(q=tsquery(terms))
+        )
+    else:
+        query = (
+            query.join(fts, fts.c.rowid == model.id)
+            .where(text(f"{fts.name} MATCH :q"))
+            .order_by(fts.c.rank)
+            .params(q=fts_match(terms))
+        )
+    result = await db.execute(query.limit(limit))
+    return result.scalars().all()
+
+# Rotas
+@router.get("", response_model=SearchResponse, dependencies=[Depends(conditional_get)])
+async def search(
+    q: str = Query(..., max_length=100),
+    type: Optional[Literal["cars", "clients"]] = None,
+    limit: int = Query(10, ge=1, le=50),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Buscar carros e clientes do tenant (typeahead)
+
+    Ignora acentos e maiúsculas e casa o início das palavras ("civ"
+    encontra "Civic"). Telefone e CPF podem ser digitados com ou sem
+    pontuação, e o telefone também sem o DDD.
+    """
+    terms = search_terms(q)
+    if sum(len(term) for term in terms) < MIN_QUERY_LENGTH:
+        return {"cars": [], "clients": []}
+
+    cars, clients = [], []
+    if type in (None, "cars"):
+        cars = await search_model(db, Car, cars_fts, CAR_TSVECTOR, terms, current_user.tenant_id, limit)
+    if type in (None, "clients"):
+        clients = await search_model(db, Client, clients_fts, CLIENT_TSVECTOR, terms, current_user.tenant_id, limit)
+    return {"cars": cars, "clients": clients}
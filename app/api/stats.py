@@ -0,0 +1,78 @@
+"""
+API de Estatísticas do Tenant (painel do gerente)
+"""
+from typing import Dict, Optional
+from fastapi import APIRouter, Depends
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import BaseModel
+
+from app.models.tenant_stat import TenantStat
+from app.api.auth import get_current_user, CurrentUser
+from app.utils.conditional import conditional_get, get_read_db
+
+router = APIRouter(prefix="/stats", tags=["Stats"])
+
+# Schemas
+class InventoryStats(BaseModel):
+    count: int
+    value: float
+
+class DocumentStats(BaseModel):
+    total: int
+    completed: int
+    completion_rate: Optional[float]
+
+class StatsResponse(BaseModel):
+    funnel: Dict[str, int]
+    inventory: Dict[str, InventoryStats]
+    sold_count: int
+    avg_days_to_sale: Optional[float]
+    documents: DocumentStats
+
+# Rotas
+@router.get("", response_model=StatsResponse, dependencies=[Depends(conditional_get)])
+async def get_stats(
+    db: AsyncSession = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Funil de clientes, valor do estoque, tempo médio de venda e documentação
+
+    Lê os agregados de tenant_stats (poucas linhas por tenant), mantidos a
+    cada escrita; o custo não depende do tamanho do estoque. O tempo médio
+    considera apenas carros cuja venda foi registrada pela API.
+    """
+    result = await db.execute(
+        select(TenantStat.metric, TenantStat.key, TenantStat.count, TenantStat.total)
+        .where(TenantStat.tenant_id == current_user.tenant_id)
+    )
+
+    funnel: Dict[str, int] = {}
+    inventory: Dict[str, InventoryStats] = {}
+    documents: Dict[str, int] = {}
+    sold_count, sold_days = 0, 0.0
+    for metric, key, count, total in result.all():
+        if not count:
+            continue
+        if metric == "clients":
+            funnel[key] = count
+        elif metric == "cars":
+            inventory[key] = InventoryStats(count=count, value=round(total, 2))
+        elif metric == "documents":
+            documents[key] = count
+        elif metric == "sales":
+            sold_count, sold_days = count, total
+
+    total_documents = sum(documents.values())
+    completed = documents.get("completed", 0)
+    return {
+        "funnel": funnel,
+        "inventory": inventory,
+        "sold_count": sold_count,
+        "avg_days_to_sale": round(sold_days / sold_count, 1) if sold_count else None,
+        "documents": {
+            "total": total_documents,
+            "completed": completed,
+            "completion_rate": round(completed / total_documents, 4) if total_documents else None
+        }
+    }
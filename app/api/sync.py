@@ -0,0 +1,138 @@
+"""
+API de Sincronização Incremental (PWA offline)
+"""
+from typing import Dict, List, Optional
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import select, func, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import BaseModel
+
+from app.config import settings
+from app.models.car import Car
+from app.models.client import Client
+from app.models.document import Document
+from app.models.deleted_record import DeletedRecord
+from app.api.auth import get_current_user, CurrentUser
+from app.api.cars import CarResponse
+from app.api.clients import ClientResponse
+from app.api.docs import DocumentResponse
+from app.db import get_db
+from app.utils.conditional import conditional_get
+from app.utils.pagination import apply_cursor, encode_cursor, timestamp_param
+from app.utils.sync import SNAPSHOT_ENTITIES, SYNC_ENTITIES, SyncCursor, cursor_expired
+from app.utils.sync import decode_sync_cursor, encode_page_cursor, encode_sync_cursor, sync_horizon
+
+router = APIRouter(prefix="/sync", tags=["Sync"])
+
+# Schemas
+class SyncResponse(BaseModel):
+    cars: List[CarResponse]
+    clients: List[ClientResponse]
+    documents: List[DocumentResponse]
+    deleted: Dict[str, List[int]]
+    cursor: str
+    full: bool
+    more: bool
+
+def changed_since(model, since):
+    """Linhas criadas ou alteradas a partir de `since` (usa os dois índices)"""
+    return or_(model.created_at >= since, model.updated_at >= since)
+
+def changed_at(model):
+    """Momento da última alteração (updated_at só é preenchido na primeira edição)"""
+    return func.coalesce(model.updated_at, model.created_at)
+
+def entity_page_query(entity: str, tenant_id: int, position: SyncCursor, dialect_name: str):
+    """Consulta da entidade, ordenada pela chave da paginação e a partir do cursor
+
+    O snapshot percorre as linhas por (created_at, id); as alterações, por
+    (última alteração, id), e as remoções por (deleted_at, id).
+    """
+    if entity == "deleted":
+        since = timestamp_param(position.since, dialect_name)
+        query = select(DeletedRecord).where(
+            DeletedRecord.tenant_id == tenant_id, DeletedRecord.deleted_at >= since
+        )
+        return apply_cursor(query, DeletedRecord, position.after, dialect_name, DeletedRecord.deleted_at)
+
+    model = {"cars": Car, "clients": Client, "documents": Document}[entity]
+    if model is Document:
+        query = select(Document).join(Car).where(Car.tenant_id == tenant_id)
+    else:
+        query = select(model).where(model.tenant_id == tenant_id)
+    if position.since is None:
+        return apply_cursor(query, model, position.after, dialect_name)
+    query = query.where(changed_since(model, timestamp_param(position.since, dialect_name)))
+    return apply_cursor(query, model, position.after, dialect_name, changed_at(model))
+
+def page_key(entity: str, row, full: bool):
+    """Valor de data da chave de paginação de uma linha (ver entity_page_query)"""
+    if entity == "deleted":
+        return row.deleted_at
+    if full:
+        return row.created_at
+    return row.updated_at or row.created_at
+
+async def sync_page(db: AsyncSession, tenant_id: int, position: SyncCursor, limit: int) -> dict:
+    """Próxima página da sincronização, percorrendo as entidades em ordem
+
+    A página é preenchida com até `limit` linhas (remoções incluídas),
+    passando para a entidade seguinte quando uma acaba. Na última, o cursor
+    devolvido é o de alterações a partir de `started_at`, o que cobre o
+    que mudou enquanto as páginas eram buscadas.
+    """
+    full = position.since is None
+    entities = SNAPSHOT_ENTITIES if full else SYNC_ENTITIES
+    page = {"cars": [], "clients": [], "documents": [], "deleted": {"cars": [], "clients": [], "documents": []}}
+    remaining = limit
+    for entity in entities[entities.index(position.entity):]:
+        query = entity_page_query(entity, tenant_id, position, db.bind.dialect.name)
+        rows = (await db.execute(query.limit(remaining))).scalars().all()
+        if entity == "deleted":
+            for row in rows:
+                page["deleted"].setdefault(row.entity, []).append(row.entity_id)
+        else:
+            page[entity] = rows
+        remaining -= len(rows)
+        if remaining == 0:
+            last = rows[-1]
+            after = encode_cursor(page_key(entity, last, full), last.id)
+            page.update(cursor=encode_page_cursor(position._replace(entity=entity, after=after)), full=full, more=True)
+            return page
+        position = position._replace(after=None)
+    page.update(cursor=encode_sync_cursor(position.started_at), full=full, more=False)
+    return page
+
+# Rotas
+@router.get("", response_model=SyncResponse, dependencies=[Depends(conditional_get)])
+async def sync(
+    since: Optional[str] = None,
+    limit: int = Query(settings.SYNC_PAGE_SIZE, ge=1, le=settings.SYNC_PAGE_SIZE),
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Alterações do tenant desde o cursor, em páginas de até `limit` linhas
+
+    Sem `since` começa o snapshot completo (`full=true`); ao fim dele,
+    substitua os dados locais pelo que foi recebido. Com `since`, vêm só as
+    linhas criadas ou alteradas e os ids removidos (`deleted`). Enquanto
+    `more=true`, envie o `cursor` da resposta como `since` para buscar a
+    página seguinte; depois, guarde o último `cursor` para a próxima
+    sincronização. Uma mesma linha pode vir repetida em chamadas seguidas;
+    aplique as alterações por id. Um cursor mais antigo que
+    SYNC_TOMBSTONE_RETENTION_DAYS recomeça o snapshot completo, pois as
+    remoções daquela época já foram apagadas.
+
+    Fica sempre no banco principal (não usa get_read_db): o cursor e os
+    dados precisam vir do mesmo lugar, sem atraso de replicação.
+    """
+    # Horário do banco, lido antes dos dados, para não depender do relógio
+    # do servidor da aplicação
+    now = await sync_horizon(db)
+
+    position = decode_sync_cursor(since) if since else None
+    if position is None or cursor_expired(position, now):
+        position = SyncCursor(None, now, SNAPSHOT_ENTITIES[0])
+    elif position.started_at is None:
+        position = SyncCursor(position.since, now, SYNC_ENTITIES[0])
+    return await sync_page(db, current_user.tenant_id, position, limit)
@@ -11,16 +11,87 @@ class Settings:
     SECRET_KEY: str = os.getenv("SECRET_KEY", "dev_secret_key_change_in_production")
     ALGORITHM: str = os.getenv("ALGORITHM", "HS256")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "1440"))
+    # Inclui id/tenant no token e dispensa a consulta do usuário a cada request.
+    # Um usuário desativado não consegue novo login, mas o token que já tem
+    # continua válido até expirar: use com ACCESS_TOKEN_EXPIRE_MINUTES curto
+    JWT_EMBED_CLAIMS: bool = os.getenv("JWT_EMBED_CLAIMS", "false").lower() == "true"
+    
+    # Cache do usuário autenticado
+    AUTH_CACHE_TTL_SECONDS: int = int(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+    AUTH_CACHE_MAX_SIZE: int = int(os.getenv("AUTH_CACHE_MAX_SIZE", "10000"))
     
     # Database
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./vendavoa.db")
+    # Réplicas de leitura, separadas por vírgula (vazio: tudo no principal)
+    DATABASE_REPLICA_URLS: str = os.getenv("DATABASE_REPLICA_URLS", "")
+    # Após uma escrita do tenant, suas leituras ficam no principal por este
+    # tempo (cobre o atraso de replicação)
+    REPLICA_STICKY_SECONDS: float = float(os.getenv("REPLICA_STICKY_SECONDS", "5"))
+    # Réplica que falha fica fora do rodízio por este tempo
+    REPLICA_EJECT_SECONDS: float = float(os.getenv("REPLICA_EJECT_SECONDS", "30"))
+    # Pool das rotas, por processo: até DB_POOL_SIZE + DB_MAX_OVERFLOW
+    # conexões (multiplique pelo número de workers para comparar com o
+    # limite do PostgreSQL)
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "5"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "10"))  # segundos esperando conexão livre
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # segundos; -1 desativa
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    # Apenas PostgreSQL; 0 desativa
+    DB_STATEMENT_TIMEOUT_MS: int = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))
+    
+    # Consultas por requisição: acima do orçamento, ou com a mesma consulta
+    # repetida esse número de vezes (N+1), a requisição gera um aviso no log
+    QUERY_BUDGET: int = int(os.getenv("QUERY_BUDGET", "30"))
+    QUERY_REPEAT_THRESHOLD: int = int(os.getenv("QUERY_REPEAT_THRESHOLD", "5"))
+    
+    # /metrics (Prometheus): com vários workers, cada um grava suas métricas
+    # em METRICS_DIR e o /metrics soma as de todos; METRICS_TOKEN, se
+    # definido, é exigido como "Authorization: Bearer <token>" (também para
+    # os detalhes do /health)
+    METRICS_DIR: str = os.getenv("METRICS_DIR", "")
+    METRICS_FLUSH_SECONDS: float = float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+    METRICS_TOKEN: str = os.getenv("METRICS_TOKEN", "")
+    
+    # SQLite em arquivo: "production" (WAL, pragmas ajustados e uma única
+    # conexão de escrita) ou "simple" (padrões do SQLite)
+    SQLITE_PROFILE: str = os.getenv("SQLITE_PROFILE", "production")
+    SQLITE_BUSY_TIMEOUT_MS: int = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    SQLITE_MMAP_SIZE: int = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+    SQLITE_CACHE_SIZE_KB: int = int(os.getenv("SQLITE_CACHE_SIZE_KB", str(32 * 1024)))  # por conexão
     
     # Environment
     ENVIRONMENT: str = os.getenv("ENVIRONMENT", "development")
     
     # Upload settings
     MAX_FILE_SIZE: int = 10 * 1024 * 1024  # 10MB
-    UPLOAD_DIR: str = "uploads"
+    UPLOAD_DIR: str = os.getenv("UPLOAD_DIR", "uploads")
+    # "content": arquivos nomeados pelo SHA-256, sem duplicatas; "uuid": nome aleatório
+    UPLOAD_STORAGE_MODE: str = os.getenv("UPLOAD_STORAGE_MODE", "content")
+    
+    # Armazenamento: "local" (pasta UPLOAD_DIR) ou "s3" (S3/MinIO/R2)
+    STORAGE_BACKEND: str = os.getenv("STORAGE_BACKEND", "local")
+    S3_BUCKET: str = os.getenv("S3_BUCKET", "")
+    S3_PREFIX: str = os.getenv("S3_PREFIX", "")
+    S3_ENDPOINT_URL: str = os.getenv("S3_ENDPOINT_URL", "")
+    S3_REGION: str = os.getenv("S3_REGION", "")
+    S3_ACCESS_KEY_ID: str = os.getenv("S3_ACCESS_KEY_ID", "")
+    S3_SECRET_ACCESS_KEY: str = os.getenv("S3_SECRET_ACCESS_KEY", "")
+    S3_PRESIGN_EXPIRES: int = int(os.getenv("S3_PRESIGN_EXPIRES", "3600"))
+    
+    # Entrega de uploads pelo proxy: "" (a aplicação envia), "x-accel" (nginx)
+    # ou "x-sendfile" (Apache/lighttpd)
+    MEDIA_ACCEL_MODE: str = os.getenv("MEDIA_ACCEL_MODE", "")
+    MEDIA_ACCEL_PREFIX: str = os.getenv("MEDIA_ACCEL_PREFIX", "/protected-uploads/")
+    
+    # Sincronização (/api/sync): remoções ficam registradas por este número
+    # de dias; clientes com cursor mais antigo recebem o snapshot completo
+    SYNC_TOMBSTONE_RETENTION_DAYS: int = int(os.getenv("SYNC_TOMBSTONE_RETENTION_DAYS", "30"))
+    # Linhas por página do snapshot completo
+    SYNC_PAGE_SIZE: int = int(os.getenv("SYNC_PAGE_SIZE", "500"))
+    
+    # Processos dedicados ao processamento de imagens
+    IMAGE_WORKERS: int = int(os.getenv("IMAGE_WORKERS", "2"))
     
     @property
     def is_production(self) -> bool:
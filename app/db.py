@@ -1,30 +1,227 @@
 """
 Configuração do banco de dados
 """
-import os
-from sqlalchemy import create_engine
+from fastapi import Request
+from sqlalchemy import create_engine, event, Insert, Update, Delete
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from dotenv import load_dotenv
+from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
 
-load_dotenv()
+from app.config import settings
+from app.utils.pool import PoolMetrics, instrumented_pool
+from app.utils.queries import watch_queries
+from app.utils.replicas import ReplicaSet
 
-DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./vendavoa.db")
+def normalize_url(url: str) -> str:
+    # Fix para URLs do Render/Heroku PostgreSQL
+    if url.startswith("postgres://"):
+        return url.replace("postgres://", "postgresql://", 1)
+    return url
 
-# Engine do banco de dados
-if DATABASE_URL.startswith("sqlite"):
-    engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-else:
-    engine = create_engine(DATABASE_URL)
+DATABASE_URL = normalize_url(settings.DATABASE_URL)
+REPLICA_URLS = [normalize_url(url.strip()) for url in settings.DATABASE_REPLICA_URLS.split(",") if url.strip()]
+
+def get_async_url(url: str) -> str:
+    """Converte a URL síncrona para o driver assíncrono equivalente"""
+    if url.startswith("sqlite:"):
+        return url.replace("sqlite:", "sqlite+aiosqlite:", 1)
+    if url.startswith("postgresql+psycopg2:"):
+        return url.replace("postgresql+psycopg2:", "postgresql+asyncpg:", 1)
+    if url.startswith("postgresql:"):
+        return url.replace("postgresql:", "postgresql+asyncpg:", 1)
+    return url
+
+def is_memory_sqlite(url: str) -> bool:
+    database = make_url(url).database
+    return not database or database == ":memory:"
+
+def use_sqlite_profile(url: str) -> bool:
+    """Perfil de produção do SQLite: WAL, pragmas ajustados e escritor único"""
+    return (
+        settings.SQLITE_PROFILE == "production"
+        and make_url(url).get_backend_name() == "sqlite"
+        and not is_memory_sqlite(url)
+    )
+
+def set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """Pragmas aplicados a cada conexão nova do SQLite"""
+    cursor = dbapi_connection.cursor()
+    for pragma in (
+        "journal_mode = WAL",  # leitores não bloqueiam o escritor (persistente no arquivo)
+        "synchronous = NORMAL",  # seguro com WAL; fsync só nos checkpoints
+        f"busy_timeout = {settings.SQLITE_BUSY_TIMEOUT_MS}",
+        f"mmap_size = {settings.SQLITE_MMAP_SIZE}",
+        f"cache_size = -{settings.SQLITE_CACHE_SIZE_KB}",  # negativo: em KiB
+        "temp_store = MEMORY",
+    ):
+        cursor.execute(f"PRAGMA {pragma}")
+    cursor.close()
+
+def make_engine(url: str, is_async: bool, metrics: PoolMetrics = None, pool_size: int = None, max_overflow: int = None):
+    """Cria uma engine com o pool configurado em Settings
+
+    A engine assíncrona atende as rotas: pool limitado (DB_POOL_SIZE +
+    DB_MAX_OVERFLOW conexões por processo), pre-ping, reciclagem e, no
+    PostgreSQL, statement_timeout. A síncrona só roda na inicialização,
+    em scripts e nas migrações; no PostgreSQL ela não mantém conexões
+    ociosas (NullPool) nem tem limite de tempo por comando.
+    """
+    backend = make_url(url).get_backend_name()
+    connect_args = {}
+    options = {"pool_pre_ping": settings.DB_POOL_PRE_PING}
+
+    if backend == "sqlite":
+        if not is_async:
+            connect_args["check_same_thread"] = False
+        if is_memory_sqlite(url):
+            # Banco em memória usa um pool próprio, de conexão única
+            return _create(url, is_async, connect_args=connect_args)
+    elif not is_async:
+        return _create(url, is_async, poolclass=NullPool)
+    elif settings.DB_STATEMENT_TIMEOUT_MS:
+        # asyncpg: parâmetros da sessão enviados na conexão
+        connect_args["server_settings"] = {"statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)}
+
+    pool_class = AsyncAdaptedQueuePool if is_async else QueuePool
+    options.update(
+        poolclass=instrumented_pool(pool_class, metrics) if metrics else pool_class,
+        pool_size=settings.DB_POOL_SIZE if pool_size is None else pool_size,
+        max_overflow=settings.DB_MAX_OVERFLOW if max_overflow is None else max_overflow,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+    )
+    new_engine = _create(url, is_async, connect_args=connect_args, **options)
+    if use_sqlite_profile(url):
+        sync_engine = new_engine.sync_engine if is_async else new_engine
+        event.listen(sync_engine, "connect", set_sqlite_pragmas)
+    return new_engine
+
+def _create(url: str, is_async: bool, **options):
+    if is_async:
+        return create_async_engine(get_async_url(url), **options)
+    return create_engine(url, **options)
+
+# Engine síncrona (scripts, init_db, migrações e criação das tabelas)
+engine = make_engine(DATABASE_URL, is_async=False)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Engine assíncrona usada pelas rotas da API
+pool_metrics = PoolMetrics()
+async_engine = make_engine(DATABASE_URL, is_async=True, metrics=pool_metrics)
+# Pools instrumentados, por nome: {nome: (engine, métricas)}
+pools = {"main": (async_engine, pool_metrics)}
+
+# No perfil de produção do SQLite, todas as escritas passam por uma única
+# conexão: quem escreve espera a vez no pool (até DB_POOL_TIMEOUT) em vez
+# de receber "database is locked"; as leituras seguem no pool principal
+writer_engine = None
+if use_sqlite_profile(DATABASE_URL):
+    writer_metrics = PoolMetrics()
+    writer_engine = make_engine(DATABASE_URL, is_async=True, metrics=writer_metrics, pool_size=1, max_overflow=0)
+    pools["writer"] = (writer_engine, writer_metrics)
+
+# Réplicas de leitura (opcionais), usadas pelas rotas GET via get_read_db
+replicas = ReplicaSet([], settings.REPLICA_EJECT_SECONDS)
+for number, replica_url in enumerate(REPLICA_URLS, start=1):
+    replica_metrics = PoolMetrics()
+    replica_engine = make_engine(replica_url, is_async=True, metrics=replica_metrics)
+    replicas.engines.append(replica_engine)
+    pools[f"replica{number}"] = (replica_engine, replica_metrics)
+
+def _watch_replica(replica_engine) -> None:
+    """Afasta a réplica quando uma conexão dela cai no meio de uma consulta"""
+    @event.listens_for(replica_engine.sync_engine, "handle_error")
+    def eject_on_disconnect(context):
+        if context.is_disconnect:
+            replicas.eject(replica_engine, context.original_exception)
+
+for replica_engine in replicas.engines:
+    _watch_replica(replica_engine)
+
+# Contagem de consultas por requisição (QueryStatsMiddleware)
+watch_queries(engine)
+for pool_engine, _ in pools.values():
+    watch_queries(pool_engine.sync_engine)
+
+class RoutingSession(Session):
+    """Sessão que separa leituras e escritas
+
+    As escritas vão para `writer` (escritor único do SQLite) ou, sem ele,
+    para a engine principal. As leituras vão para `reader` (uma réplica),
+    se houver. Uma vez que a transação escreve, as consultas seguintes dela
+    também vão para a engine de escrita e enxergam o que ainda não foi
+    confirmado. Com `write_only`, a sessão inteira usa a engine de escrita:
+    quem lê e depois escreve não segura uma conexão de leitura (com uma
+    transação aberta, que atrasa o checkpoint do WAL) enquanto espera o
+    escritor.
+    """
+
+    def __init__(self, *args, writer=None, reader=None, write_only=False, **kw):
+        super().__init__(*args, **kw)
+        self.writer = writer.sync_engine if writer is not None else None
+        self.reader = reader.sync_engine if reader is not None else None
+        self.write_only = write_only
+        self.writing = False
+
+    def get_bind(self, mapper=None, *, clause=None, bind=None, **kw):
+        if bind is not None:
+            return super().get_bind(mapper, clause=clause, bind=bind, **kw)
+        if self.write_only or self.writing or self._flushing or isinstance(clause, (Insert, Update, Delete)):
+            self.writing = True
+            if self.writer is not None:
+                return self.writer
+        elif self.reader is not None:
+            return self.reader
+        return super().get_bind(mapper, clause=clause, **kw)
+
+@event.listens_for(RoutingSession, "after_transaction_end")
+def _end_writing(session, transaction):
+    if transaction.parent is None:
+        session.writing = False
+
+def get_pool_stats() -> dict:
+    """Conexões em uso, overflow e espera no checkout de cada pool das rotas"""
+    return {
+        name: metrics.stats(pool_engine.pool)
+        for name, (pool_engine, metrics) in pools.items()
+        if isinstance(pool_engine.pool, QueuePool)
+    }
+
+# expire_on_commit=False: os objetos continuam legíveis após o commit,
+# sem disparar lazy loads fora do contexto assíncrono
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    sync_session_class=RoutingSession,
+    writer=writer_engine,
+    autoflush=False,
+    expire_on_commit=False
+)
+
 Base = declarative_base()
 
-# Dependency para obter sessão do banco
-def get_db():
+# Métodos HTTP que não alteram dados
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+# Dependency para obter sessão assíncrona do banco; requisições que
+# escrevem usam só a engine de escrita desde a primeira consulta
+async def get_db(request: Request):
+    async with AsyncSessionLocal(write_only=request.method not in SAFE_METHODS) as db:
+        yield db
+
+# Sessão para rotas que só leem mas não usam GET (corpo com os parâmetros
+# da consulta): fica fora da engine de escrita, que o POST usaria
+async def get_query_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# Sessão síncrona para scripts e tarefas fora do event loop
+def get_sync_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
@@ -1,16 +1,23 @@
 """
 Aplicação principal FastAPI
 """
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+import asyncio
+import hmac
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 import os
 from pathlib import Path
 
-from app.db import engine, Base
-from app.api import auth, cars, clients
+from app.config import settings
+from app.db import engine, Base, get_pool_stats, replicas
+from app.api import auth, cars, clients, media, sync, batch, imports, export, search, stats, analytics
 from app.api import docs as docs_api
+from app.utils import images, metrics
+from app.utils.queries import QueryStatsMiddleware
+from app.utils.upload import UploadSizeLimitMiddleware
 
 # Obter diretório base do projeto
 BASE_DIR = Path(__file__).parent.parent
@@ -19,13 +26,29 @@ FRONTEND_DIR = BASE_DIR / "frontend"
 # Criar tabelas
 Base.metadata.create_all(bind=engine)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Com vários workers, cada um publica suas métricas em METRICS_DIR
+    flusher = asyncio.create_task(metrics.flush_periodically()) if settings.METRICS_DIR else None
+    yield
+    if flusher is not None:
+        flusher.cancel()
+        metrics.remove_snapshot()
+    # Encerrar o pool de processamento de imagens
+    images.shutdown_pool()
+
 # Inicializar aplicação
 app = FastAPI(
     title="VendaVoa - Sistema para Revendedores",
     description="Sistema completo para gestão de carros e clientes",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+# Uploads acima do limite são recusados antes de o corpo ser lido (por
+# dentro do CORS, para que o navegador consiga ler o erro)
+app.add_middleware(UploadSizeLimitMiddleware, limits={"/api/cars/import": imports.MAX_IMPORT_SIZE})
+
 # Configurar CORS
 app.add_middleware(
     CORSMiddleware,
@@ -33,17 +56,37 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
+)
+
+# Latência por rota e requisições em andamento (/metrics)
+app.add_middleware(metrics.MetricsMiddleware)
+
+# Consultas SQL por requisição (Server-Timing e aviso de N+1 no log)
+app.add_middleware(
+    QueryStatsMiddleware,
+    budget=settings.QUERY_BUDGET,
+    repeat_threshold=settings.QUERY_REPEAT_THRESHOLD,
 )
 
 # Incluir rotas da API
 app.include_router(auth.router, prefix="/api")
 app.include_router(cars.router, prefix="/api")
+app.include_router(imports.router, prefix="/api")
 app.include_router(clients.router, prefix="/api")
 app.include_router(docs_api.router, prefix="/api")
+app.include_router(sync.router, prefix="/api")
+app.include_router(batch.router, prefix="/api")
+app.include_router(export.router, prefix="/api")
+app.include_router(search.router, prefix="/api")
+app.include_router(stats.router, prefix="/api")
+app.include_router(analytics.router, prefix="/api")
 
 # Servir arquivos estáticos
 app.mount("/static", StaticFiles(directory=str(FRONTEND_DIR / "static")), name="static")
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+
+# Uploads: cache imutável, ETag, Range e redirecionamento para o S3
+app.include_router(media.router)
 
 # Rotas para as páginas
 @app.get("/")
@@ -70,10 +113,32 @@ async def client_page(client_id: int):
 async def upload_page():
     return FileResponse(str(FRONTEND_DIR / "templates" / "upload.html"))
 
+def has_metrics_token(request: Request) -> bool:
+    expected = f"Bearer {settings.METRICS_TOKEN}"
+    return hmac.compare_digest(request.headers.get("authorization", ""), expected)
+
 # Health check
 @app.get("/health")
-async def health():
-    return {"status": "ok"}
+async def health(request: Request):
+    body = {"status": "ok"}
+    # Cache de autenticação, pools e réplicas: com METRICS_TOKEN, só para
+    # quem envia o token; sem ele, só fora de produção
+    show_details = has_metrics_token(request) if settings.METRICS_TOKEN else not settings.is_production
+    if show_details:
+        body.update({
+            "auth_cache": auth.principal_cache.stats(),
+            "db_pool": get_pool_stats(),
+            "replicas": replicas.stats(),
+        })
+    return body
+
+# Métricas no formato do Prometheus
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def get_metrics(request: Request):
+    if settings.METRICS_TOKEN and not has_metrics_token(request):
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    samples = await asyncio.to_thread(metrics.aggregate)
+    return PlainTextResponse(metrics.render(samples), media_type="text/plain; version=0.0.4")
 
 if __name__ == "__main__":
     import uvicorn
@@ -5,4 +5,10 @@ from app.models.tenant import Tenant
 from app.models.user import User
 from app.models.car import Car
 from app.models.client import Client
-from app.models.document import Document
\ No newline at end of file
+from app.models.document import Document
+from app.models.stored_file import StoredFile
+from app.models.deleted_record import DeletedRecord
+from app.models.idempotency_key import IdempotencyKey
+from app.models.import_job import ImportJob
+from app.models.tenant_stat import TenantStat
+from app.models import search  # noqa: F401 - índices de busca textual
\ No newline at end of file
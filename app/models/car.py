@@ -1,7 +1,7 @@
 """
 Modelo de Carro
 """
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Text, Float
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Text, Float, Index, JSON
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db import Base
@@ -16,8 +16,10 @@ class Car(Base):
     year = Column(Integer, nullable=False)
     price = Column(Float)
     photo_url = Column(String)
+    photo_variants = Column(JSON)  # {"thumb": {"webp": url, "jpeg": url}, ...}
     observations = Column(Text)
     status = Column(String, default="available")  # available, sold, reserved
+    sold_at = Column(DateTime(timezone=True))  # quando o status passou a "sold"
     tenant_id = Column(Integer, ForeignKey("tenants.id"))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -25,4 +27,12 @@ class Car(Base):
     # Relacionamentos
     tenant = relationship("Tenant", back_populates="cars")
     clients = relationship("Client", back_populates="car")
-    documents = relationship("Document", back_populates="car")
\ No newline at end of file
+    documents = relationship("Document", back_populates="car")
+
+    # Índices para as consultas filtradas por tenant
+    __table_args__ = (
+        Index("ix_cars_tenant_status", "tenant_id", "status"),
+        Index("ix_cars_tenant_created", "tenant_id", "created_at", "id"),
+        Index("ix_cars_tenant_updated", "tenant_id", "updated_at"),
+        Index("ix_cars_tenant_brand_model", "tenant_id", "brand", "model"),
+    )
\ No newline at end of file
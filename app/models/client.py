@@ -1,7 +1,7 @@
 """
 Modelo de Cliente
 """
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db import Base
@@ -23,4 +23,12 @@ class Client(Base):
 
     # Relacionamentos
     car = relationship("Car", back_populates="clients")
-    tenant = relationship("Tenant", back_populates="clients")
\ No newline at end of file
+    tenant = relationship("Tenant", back_populates="clients")
+
+    # Índices para as consultas filtradas por tenant e por carro
+    __table_args__ = (
+        Index("ix_clients_tenant_status", "tenant_id", "negotiation_status"),
+        Index("ix_clients_tenant_created", "tenant_id", "created_at", "id"),
+        Index("ix_clients_tenant_updated", "tenant_id", "updated_at"),
+        Index("ix_clients_car_status", "car_id", "negotiation_status"),
+    )
\ No newline at end of file
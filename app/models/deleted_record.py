@@ -0,0 +1,20 @@
+"""
+Modelo de Registro Removido (tombstones para a sincronização incremental)
+"""
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
+from sqlalchemy.sql import func
+from app.db import Base
+
+class DeletedRecord(Base):
+    __tablename__ = "deleted_records"
+
+    id = Column(Integer, primary_key=True, index=True)
+    tenant_id = Column(Integer, ForeignKey("tenants.id"), nullable=False)
+    entity = Column(String(20), nullable=False)  # cars, clients, documents
+    entity_id = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    # /api/sync busca as remoções do tenant a partir de uma data
+    __table_args__ = (
+        Index("ix_deleted_records_tenant_deleted", "tenant_id", "deleted_at"),
+    )
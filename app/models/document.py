@@ -1,7 +1,7 @@
 """
 Modelo de Documento
 """
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db import Base
@@ -21,4 +21,11 @@ class Document(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     # Relacionamentos
-    car = relationship("Car", back_populates="documents")
\ No newline at end of file
+    car = relationship("Car", back_populates="documents")
+
+    # Documentos são sempre buscados pelo carro (o tenant vem do join com cars)
+    __table_args__ = (
+        Index("ix_documents_car_type", "car_id", "document_type"),
+        Index("ix_documents_car_created", "car_id", "created_at", "id"),
+        Index("ix_documents_car_updated", "car_id", "updated_at"),
+    )
\ No newline at end of file
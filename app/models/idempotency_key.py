@@ -0,0 +1,20 @@
+"""
+Modelo de Chave de Idempotência (operações do /api/batch já aplicadas)
+"""
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON, Index, UniqueConstraint
+from sqlalchemy.sql import func
+from app.db import Base
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+
+    id = Column(Integer, primary_key=True, index=True)
+    tenant_id = Column(Integer, ForeignKey("tenants.id"), nullable=False)
+    key = Column(String(255), nullable=False)
+    result = Column(JSON, nullable=False)  # resposta devolvida na primeira execução
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("tenant_id", "key", name="uq_idempotency_keys_tenant_key"),
+        Index("ix_idempotency_keys_tenant_created", "tenant_id", "created_at"),
+    )
@@ -0,0 +1,25 @@
+"""
+Modelo de Importação de Estoque (planilhas CSV/XLSX)
+"""
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON, Index
+from sqlalchemy.sql import func
+from app.db import Base
+
+class ImportJob(Base):
+    __tablename__ = "import_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    tenant_id = Column(Integer, ForeignKey("tenants.id"), nullable=False)
+    filename = Column(String)
+    status = Column(String, nullable=False, default="pending")  # pending, running, completed, failed
+    total_rows = Column(Integer, nullable=False, default=0)
+    imported_rows = Column(Integer, nullable=False, default=0)
+    error_count = Column(Integer, nullable=False, default=0)
+    errors = Column(JSON)  # [{"row": 3, "error": "year: ..."}], limitado
+    message = Column(String)  # erro do arquivo como um todo
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    finished_at = Column(DateTime(timezone=True))
+
+    __table_args__ = (
+        Index("ix_import_jobs_tenant_created", "tenant_id", "created_at"),
+    )
@@ -0,0 +1,80 @@
+"""
+Índices de busca textual de carros e clientes
+
+SQLite: tabelas FTS5 (cars_fts, clients_fts) mantidas por triggers.
+PostgreSQL: índices GIN sobre to_tsvector, sem acentos (extensão unaccent),
+criados só pela migração 0009 (alembic upgrade head): CREATE EXTENSION
+exige privilégio e CREATE OR REPLACE FUNCTION falha ("tuple concurrently
+updated") quando vários workers sobem ao mesmo tempo.
+Telefone e CPF entram só com os dígitos, e o telefone também sem o DDD.
+"""
+from sqlalchemy import event, text
+from app.db import Base
+
+def _sqlite_digits(expr: str) -> str:
+    for char in (" ", "-", "(", ")", ".", "+", "/"):
+        expr = f"replace({expr}, '{char}', '')"
+    return expr
+
+def _sqlite_client_values(row: str) -> str:
+    phone = _sqlite_digits(f"coalesce({row}.phone, '')")
+    cpf = _sqlite_digits(f"coalesce({row}.cpf, '')")
+    return f"{row}.id, {row}.name, {row}.notes, {phone} || ' ' || substr({phone}, 3), {cpf}"
+
+CAR_SEARCH_COLUMNS = "title, brand, model, year, observations"
+
+SQLITE_DDL = [
+    # remove_diacritics 2: "Veículo" e "veiculo" viram o mesmo termo
+    "CREATE VIRTUAL TABLE IF NOT EXISTS cars_fts USING fts5("
+    f"{CAR_SEARCH_COLUMNS}, tokenize = 'unicode61 remove_diacritics 2')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS clients_fts USING fts5("
+    "name, notes, phone, cpf, tokenize = 'unicode61 remove_diacritics 2')",
+
+    "CREATE TRIGGER IF NOT EXISTS cars_fts_insert AFTER INSERT ON cars BEGIN "
+    f"INSERT INTO cars_fts(rowid, {CAR_SEARCH_COLUMNS}) "
+    "VALUES (new.id, new.title, new.brand, new.model, new.year, new.observations); END",
+    "CREATE TRIGGER IF NOT EXISTS cars_fts_delete AFTER DELETE ON cars BEGIN "
+    "DELETE FROM cars_fts WHERE rowid = old.id; END",
+    f"CREATE TRIGGER IF NOT EXISTS cars_fts_update AFTER UPDATE OF {CAR_SEARCH_COLUMNS} ON cars BEGIN "
+    "DELETE FROM cars_fts WHERE rowid = old.id; "
+    f"INSERT INTO cars_fts(rowid, {CAR_SEARCH_COLUMNS}) "
+    "VALUES (new.id, new.title, new.brand, new.model, new.year, new.observations); END",
+
+    "CREATE TRIGGER IF NOT EXISTS clients_fts_insert AFTER INSERT ON clients BEGIN "
+    f"INSERT INTO clients_fts(rowid, name, notes, phone, cpf) VALUES ({_sqlite_client_values('new')}); END",
+    "CREATE TRIGGER IF NOT EXISTS clients_fts_delete AFTER DELETE ON clients BEGIN "
+    "DELETE FROM clients_fts WHERE rowid = old.id; END",
+    "CREATE TRIGGER IF NOT EXISTS clients_fts_update AFTER UPDATE OF name, notes, phone, cpf ON clients BEGIN "
+    "DELETE FROM clients_fts WHERE rowid = old.id; "
+    f"INSERT INTO clients_fts(rowid, name, notes, phone, cpf) VALUES ({_sqlite_client_values('new')}); END",
+]
+
+SQLITE_BACKFILL = [
+    f"INSERT INTO cars_fts(rowid, {CAR_SEARCH_COLUMNS}) SELECT id, {CAR_SEARCH_COLUMNS} FROM cars",
+    f"INSERT INTO clients_fts(rowid, name, notes, phone, cpf) SELECT {_sqlite_client_values('clients')} FROM clients",
+]
+
+def _pg_digits(column: str) -> str:
+    return f"regexp_replace(coalesce({column}, ''), '[^0-9]', '', 'g')"
+
+# As consultas precisam usar exatamente estas expressões para usar os índices
+CAR_TSVECTOR = (
+    "to_tsvector('simple', vv_unaccent(coalesce(title, '') || ' ' || coalesce(brand, '') || ' ' || "
+    "coalesce(model, '') || ' ' || coalesce(year::text, '') || ' ' || coalesce(observations, '')))"
+)
+CLIENT_TSVECTOR = (
+    "to_tsvector('simple', vv_unaccent(coalesce(name, '') || ' ' || coalesce(notes, '')) || ' ' || "
+    f"{_pg_digits('phone')} || ' ' || substr({_pg_digits('phone')}, 3) || ' ' || {_pg_digits('cpf')})"
+)
+
+@event.listens_for(Base.metadata, "after_create")
+def create_search_index(target, connection, **kw):
+    """Cria as tabelas FTS5 do SQLite junto com as tabelas (create_all)"""
+    if connection.dialect.name == "sqlite":
+        exists = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE name = 'cars_fts'")
+        ).first()
+        if exists:
+            return
+        for statement in SQLITE_DDL + SQLITE_BACKFILL:
+            connection.exec_driver_sql(statement)
@@ -15,6 +15,9 @@ class Tenant(Base):
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Incrementados a cada escrita em carros/clientes/documentos (ETag das listagens)
+    data_version = Column(Integer, nullable=False, default=0, server_default="0")
+    data_changed_at = Column(DateTime(timezone=True))
 
     # Relacionamentos
     users = relationship("User", back_populates="tenant")
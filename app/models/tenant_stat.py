@@ -0,0 +1,16 @@
+"""
+Modelo de Estatística do Tenant (agregados mantidos a cada escrita)
+"""
+from sqlalchemy import Column, Integer, String, Float, ForeignKey
+from app.db import Base
+
+class TenantStat(Base):
+    __tablename__ = "tenant_stats"
+
+    # metric: cars (key = status), clients (key = negotiation_status),
+    # documents (key = completed/pending), sales (key = days)
+    tenant_id = Column(Integer, ForeignKey("tenants.id"), primary_key=True)
+    metric = Column(String(20), primary_key=True)
+    key = Column(String(50), primary_key=True)
+    count = Column(Integer, nullable=False, default=0, server_default="0")
+    total = Column(Float, nullable=False, default=0, server_default="0")  # soma de preços ou de dias
@@ -0,0 +1,210 @@
+"""
+Análise de preços do estoque (percentis por grupo, faixa sugerida e outliers)
+
+As colunas são carregadas numa única consulta e todo o cálculo é feito
+com NumPy, sem laços por carro.
+"""
+import asyncio
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.car import Car
+from app.utils.cache import TTLCache
+from app.utils.conditional import get_data_version
+
+QUANTILES = np.array([0.1, 0.25, 0.5, 0.75, 0.9])
+P10, P25, P50, P75, P90 = range(len(QUANTILES))
+# Grupos menores que isso não geram faixa nem outliers
+MIN_GROUP_SIZE = 5
+# Cercas de Tukey: fora de [p25 - k*IQR, p75 + k*IQR] é outlier
+OUTLIER_IQR_FACTOR = 1.5
+LEVELS = ("brand", "model", "year")
+
+def grouped_quantiles(codes: np.ndarray, values: np.ndarray, n_groups: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Quantis (interpolação linear, como np.quantile) de cada grupo
+
+    Retorna (contagens por grupo, matriz n_groups x len(QUANTILES)).
+    """
+    order = np.lexsort((values, codes))
+    sorted_values = values[order]
+    counts = np.bincount(codes, minlength=n_groups)
+    starts = np.cumsum(counts) - counts
+    positions = starts[:, None] + QUANTILES[None, :] * (counts[:, None] - 1)
+    low = np.floor(positions).astype(np.int64)
+    high = np.ceil(positions).astype(np.int64)
+    return counts, sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (positions - low)
+
+def normalize_name(value: str) -> str:
+    return " ".join(value.split()).lower()
+
+def _lookup(names: np.ndarray, value: str) -> Optional[int]:
+    """Posição do nome normalizado em `names` (ordenado)"""
+    value = normalize_name(value)
+    index = int(np.searchsorted(names, value))
+    if index < len(names) and names[index] == value:
+        return index
+    return None
+
+class PriceGroups:
+    """Percentis de um nível de agrupamento (marca, marca+modelo ou marca+modelo+ano)"""
+
+    def __init__(self, keys: np.ndarray, codes: np.ndarray, prices: np.ndarray):
+        self.keys = keys  # chave de cada grupo, em ordem
+        self.codes = codes  # grupo de cada carro
+        self.counts, self.quantiles = grouped_quantiles(codes, prices, len(keys))
+
+    def find(self, key: int) -> Optional[int]:
+        index = int(np.searchsorted(self.keys, key))
+        if index < len(self.keys) and self.keys[index] == key:
+            return index
+        return None
+
+class PriceTable:
+    """Preços de um tenant e seus percentis nos três níveis"""
+
+    def __init__(self, rows: List[tuple]):
+        ids, prices, years, brands, models = zip(*rows) if rows else ((),) * 5
+        self.ids = np.array(ids, dtype=np.int64)
+        self.prices = np.array(prices, dtype=np.float64)
+        self.years = np.array(years, dtype=np.int64)
+        self.brand_names, self.brand_labels, brand_codes = self._factorize(brands)
+        self.model_names, self.model_labels, model_codes = self._factorize(models)
+
+        # Chaves inteiras combinadas: marca -> marca+modelo -> marca+modelo+ano
+        self.n_models = max(len(self.model_names), 1)
+        self.year_min = int(self.years.min()) if len(self.years) else 0
+        self.n_years = int(self.years.max()) - self.year_min + 1 if len(self.years) else 1
+        brand_model = brand_codes.astype(np.int64) * self.n_models + model_codes
+        brand_model_year = brand_model * self.n_years + (self.years - self.year_min)
+
+        self.groups: Dict[str, PriceGroups] = {}
+        for level, combined in zip(LEVELS, (brand_codes.astype(np.int64), brand_model, brand_model_year)):
+            keys, codes = np.unique(combined, return_inverse=True)
+            self.groups[level] = PriceGroups(keys, codes, self.prices)
+
+    @staticmethod
+    def _factorize(values) -> Tuple[np.ndarray, List[str], np.ndarray]:
+        """Códigos sem diferenciar maiúsculas/espaços; o rótulo é uma das grafias
+
+        Só os valores distintos passam pelo Python (str.lower), não cada carro.
+        """
+        raw, raw_codes = np.unique(np.array(values, dtype=str), return_inverse=True)
+        names, first, name_codes = np.unique(
+            np.array([normalize_name(value) for value in raw], dtype=str),
+            return_index=True, return_inverse=True
+        )
+        return names, [str(raw[i]) for i in first], name_codes[raw_codes.reshape(-1)]
+
+    def group_key(self, level: str, brand: str, model: str, year: int) -> Optional[int]:
+        """Chave do grupo de um carro (que pode não estar no estoque)"""
+        brand_code = _lookup(self.brand_names, brand)
+        if brand_code is None:
+            return None
+        if level == "brand":
+            return brand_code
+        model_code = _lookup(self.model_names, model)
+        if model_code is None:
+            return None
+        key = brand_code * self.n_models + model_code
+        if level == "model":
+            return key
+        if not self.year_min <= year < self.year_min + self.n_years:
+            return None
+        return key * self.n_years + (year - self.year_min)
+
+    def describe(self, level: str, key: int) -> Dict[str, object]:
+        """Marca/modelo/ano de uma chave de grupo"""
+        year = None
+        if level == "year":
+            key, year = divmod(int(key), self.n_years)
+            year += self.year_min
+        brand_code, model_code = divmod(int(key), self.n_models) if level != "brand" else (int(key), None)
+        return {
+            "brand": self.brand_labels[brand_code],
+            "model": self.model_labels[model_code] if model_code is not None else None,
+            "year": year,
+        }
+
+    def percentiles(self, level: str) -> List[dict]:
+        """Percentis de todos os grupos do nível"""
+        groups = self.groups[level]
+        return [
+            {**self.describe(level, key), "count": int(count), **dict(zip(
+                ("p10", "p25", "p50", "p75", "p90"), map(float, quantiles)
+            ))}
+            for key, count, quantiles in zip(groups.keys, groups.counts, groups.quantiles)
+        ]
+
+    def suggest(self, brand: str, model: str, year: int) -> Optional[dict]:
+        """Faixa p25-p75 do grupo mais específico com amostra suficiente"""
+        for level in reversed(LEVELS):
+            key = self.group_key(level, brand, model, year)
+            index = self.groups[level].find(key) if key is not None else None
+            if index is None:
+                continue
+            count = int(self.groups[level].counts[index])
+            if count < MIN_GROUP_SIZE:
+                continue
+            quantiles = self.groups[level].quantiles[index]
+            return {
+                "level": level,
+                "count": count,
+                "low": float(quantiles[P25]),
+                "median": float(quantiles[P50]),
+                "high": float(quantiles[P75]),
+            }
+        return None
+
+    def outliers(self) -> List[dict]:
+        """Carros fora das cercas de Tukey do grupo mais específico com amostra suficiente"""
+        if not len(self.prices):
+            return []
+        specific, general = self.groups["year"], self.groups["model"]
+        use_specific = specific.counts[specific.codes] >= MIN_GROUP_SIZE
+        quantiles = np.where(
+            use_specific[:, None],
+            specific.quantiles[specific.codes],
+            general.quantiles[general.codes]
+        )
+        eligible = use_specific | (general.counts[general.codes] >= MIN_GROUP_SIZE)
+
+        spread = OUTLIER_IQR_FACTOR * (quantiles[:, P75] - quantiles[:, P25])
+        low = quantiles[:, P25] - spread
+        high = quantiles[:, P75] + spread
+        flagged = np.flatnonzero(eligible & ((self.prices < low) | (self.prices > high)))
+        return [
+            {
+                "car_id": int(self.ids[i]),
+                "price": float(self.prices[i]),
+                "level": "year" if use_specific[i] else "model",
+                "median": float(quantiles[i, P50]),
+                "low": float(low[i]),
+                "high": float(high[i]),
+                "direction": "below" if self.prices[i] < low[i] else "above",
+            }
+            for i in flagged
+        ]
+
+# Uma tabela por tenant, guardada com a versão dos dados: qualquer escrita
+# (bump_data_version) faz a próxima leitura recalcular
+price_tables = TTLCache(maxsize=32, ttl=3600)
+
+async def get_price_table(db: AsyncSession, tenant_id: int) -> PriceTable:
+    """Tabela de preços do tenant, recalculada só após escritas"""
+    version, _ = await get_data_version(db, tenant_id)
+    cached = price_tables.get(tenant_id)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    result = await db.execute(
+        select(Car.id, Car.price, Car.year, Car.brand, Car.model)
+        .where(Car.tenant_id == tenant_id, Car.price.is_not(None))
+    )
+    rows = result.all()
+    # O cálculo é só CPU; roda fora do event loop
+    table = await asyncio.to_thread(PriceTable, rows)
+    price_tables.set(tenant_id, (version, table))
+    return table
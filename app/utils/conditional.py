@@ -0,0 +1,138 @@
+"""
+Requisições condicionais (ETag / Last-Modified) para as listagens da API
+"""
+import hashlib
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional, Tuple
+
+from fastapi import Depends, HTTPException, Request, Response, status
+from sqlalchemy import select, update, func
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.db import get_db, AsyncSessionLocal, replicas
+from app.models.tenant import Tenant
+from app.api.auth import get_current_user, CurrentUser
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Verifica o If-None-Match (aceita lista e comparação fraca)"""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return etag.removeprefix("W/") in candidates
+
+async def bump_data_version(db: AsyncSession, tenant_id: int) -> None:
+    """Marca que os dados do tenant mudaram
+
+    Deve ser chamada na mesma transação da escrita (antes do commit), assim
+    a versão só avança se a alteração for confirmada.
+    """
+    await db.execute(
+        update(Tenant)
+        .where(Tenant.id == tenant_id)
+        .values(data_version=Tenant.data_version + 1, data_changed_at=func.now())
+    )
+
+async def get_data_version(db: AsyncSession, tenant_id: int) -> Tuple[int, Optional[datetime]]:
+    """Versão atual dos dados do tenant (uma consulta pela chave primária)"""
+    result = await db.execute(
+        select(Tenant.data_version, Tenant.data_changed_at).where(Tenant.id == tenant_id)
+    )
+    row = result.first()
+    if row is None:
+        return 0, None
+    changed_at = row.data_changed_at
+    # SQLite devolve datas sem fuso; func.now() grava em UTC
+    if changed_at is not None and changed_at.tzinfo is None:
+        changed_at = changed_at.replace(tzinfo=timezone.utc)
+    return row.data_version or 0, changed_at
+
+def _not_modified_since(request: Request, changed_at: datetime) -> bool:
+    if_modified_since = request.headers.get("if-modified-since")
+    if not if_modified_since:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    return changed_at.replace(microsecond=0) <= since
+
+async def conditional_get(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
+) -> Optional[datetime]:
+    """Dependência para GETs: responde 304 antes de carregar qualquer linha
+
+    O ETag combina a versão dos dados do tenant com a URL (caminho e
+    parâmetros), então cada página/filtro tem o seu. Qualquer escrita que
+    chame bump_data_version invalida todos de uma vez.
+    """
+    version, changed_at = await get_data_version(db, current_user.tenant_id)
+    url_hash = hashlib.sha1(f"{request.url.path}?{request.url.query}".encode()).hexdigest()[:16]
+    etag = f'W/"{current_user.tenant_id}-{version}-{url_hash}"'
+
+    headers = {
+        "ETag": etag,
+        # Sempre revalidar, mas permitir que o navegador reaproveite o corpo
+        "Cache-Control": "private, no-cache",
+        "Vary": "Authorization",
+    }
+    if changed_at is not None:
+        headers["Last-Modified"] = format_datetime(changed_at.astimezone(timezone.utc), usegmt=True)
+
+    # If-None-Match tem precedência sobre If-Modified-Since
+    if "if-none-match" in request.headers:
+        not_modified = etag_matches(request, etag)
+    else:
+        not_modified = changed_at is not None and _not_modified_since(request, changed_at)
+
+    if not_modified:
+        raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    response.headers.update(headers)
+    return changed_at
+
+async def get_read_db(
+    changed_at: Optional[datetime] = Depends(conditional_get),
+    db: AsyncSession = Depends(get_db)
+):
+    """Sessão para rotas somente leitura: usa uma réplica, se houver
+
+    A versão dos dados vem sempre do principal (conditional_get). Se o
+    tenant escreveu há menos de REPLICA_STICKY_SECONDS, a leitura fica no
+    principal para enxergar a própria escrita. Sem réplica, a rota reusa a
+    sessão da requisição (a mesma do conditional_get); com réplica, a
+    conexão do principal é devolvida ao pool antes de abrir a da réplica.
+    Réplica que não conecta é afastada e a requisição segue no principal.
+    """
+    replica = None
+    recently_changed = changed_at is not None and (
+        datetime.now(timezone.utc) - changed_at < timedelta(seconds=settings.REPLICA_STICKY_SECONDS)
+    )
+    if replicas and not recently_changed:
+        replica = replicas.choose()
+    if replica is None:
+        yield db
+        return
+
+    await db.close()
+    replica_db = AsyncSessionLocal(reader=replica)
+    try:
+        await replica_db.connection()
+    except (SQLAlchemyError, OSError) as e:
+        await replica_db.close()
+        replicas.eject(replica, e)
+        replica_db = None
+
+    if replica_db is None:
+        yield db
+        return
+    async with replica_db:
+        yield replica_db
@@ -0,0 +1,202 @@
+"""
+Processamento de imagens: orientação, remoção de EXIF e variantes redimensionadas
+"""
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from fastapi import HTTPException
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from app.config import settings
+from app.utils.storage import get_storage, TEMP_DIR
+from app.utils.upload import get_file_key, delete_file
+
+logger = logging.getLogger(__name__)
+
+# Nome da variante -> maior dimensão em pixels
+VARIANTS = {
+    "thumb": 320,
+    "card": 800,
+    "full": 1600,
+}
+
+# Formato -> (extensão, opções do Pillow)
+FORMATS = {
+    "webp": ("webp", {"quality": 80, "method": 4}),
+    "jpeg": ("jpg", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+# Tag EXIF de orientação (1 = normal)
+ORIENTATION_TAG = 0x0112
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pending = 0
+
+def variant_filenames(stem: str) -> Dict[str, Dict[str, str]]:
+    """Nomes dos arquivos de cada variante: {variante: {formato: nome}}"""
+    return {
+        name: {fmt: f"{stem}_{name}.{ext}" for fmt, (ext, _) in FORMATS.items()}
+        for name in VARIANTS
+    }
+
+def _render_variants(source: str, out_dir: str) -> Dict[str, Dict[str, str]]:
+    """Gera as variantes de uma imagem (executado no pool de processos)
+
+    Retorna {variante: {formato: nome_do_arquivo}}, com os arquivos gravados
+    em `out_dir`.
+    """
+    source_path = Path(source)
+    filenames = variant_filenames(source_path.stem)
+    with Image.open(source_path) as image:
+        # Aplicar a orientação do EXIF antes de descartá-lo
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ("RGB", "L"):
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            image = image.convert("RGBA")
+            background.paste(image, mask=image.getchannel("A"))
+            image = background
+        else:
+            image = image.convert("RGB")
+
+        for name, max_size in VARIANTS.items():
+            resized = image.copy()
+            resized.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+            for fmt, (_, options) in FORMATS.items():
+                # Sem o parâmetro exif, o arquivo é gravado sem metadados
+                target = Path(out_dir) / filenames[name][fmt]
+                resized.save(target, format=fmt.upper(), **options)
+        return filenames
+
+def _strip_metadata(source: str, target: str) -> Tuple[str, int]:
+    """Regrava a foto original sem EXIF (GPS, câmera...) e sem textos embutidos
+
+    A orientação do EXIF é aplicada aos pixels antes de descartá-lo; o
+    perfil de cor é mantido. JPEGs sem rotação mantêm as tabelas de
+    quantização originais (sem nova perda de qualidade). Retorna o SHA-256
+    e o tamanho do arquivo gravado (executado no pool de processos).
+    """
+    with Image.open(source) as image:
+        fmt = image.format
+        options = {}
+        if image.info.get("icc_profile"):
+            options["icc_profile"] = image.info["icc_profile"]
+        if getattr(image, "is_animated", False):
+            image.save(target, format=fmt, save_all=True, **options)
+        elif image.getexif().get(ORIENTATION_TAG, 1) in (0, 1):
+            if fmt == "JPEG":
+                options.update(quality="keep", subsampling="keep")
+            image.save(target, format=fmt, **options)
+        else:
+            if fmt == "JPEG":
+                options.update(quality=92)
+            ImageOps.exif_transpose(image).save(target, format=fmt, **options)
+
+    digest = hashlib.sha256()
+    with open(target, "rb") as cleaned:
+        while chunk := cleaned.read(1024 * 1024):
+            digest.update(chunk)
+    return digest.hexdigest(), Path(target).stat().st_size
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn: o processo filho não herda threads/conexões do servidor
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.IMAGE_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _pool
+
+def pending_jobs() -> int:
+    """Quantidade de imagens aguardando ou em processamento"""
+    return _pending
+
+async def _run_in_pool(function, *args):
+    """Executa no pool de processos, convertendo falhas em erros HTTP"""
+    global _pending
+    _pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_pool(), function, *args)
+    except BrokenProcessPool:
+        # Um processo do pool morreu: descartar o pool para recriá-lo
+        logger.exception("Pool de processamento de imagens interrompido")
+        shutdown_pool()
+        raise HTTPException(status_code=503, detail="Processamento de imagem indisponível")
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+        logger.warning("Falha ao processar imagem %s: %s", args[0], e)
+        raise HTTPException(status_code=400, detail="Arquivo de imagem inválido")
+    finally:
+        _pending -= 1
+
+async def strip_metadata(temp_path: Path) -> Tuple[Path, str, int]:
+    """Versão sem metadados de um upload de foto (usado como `prepare` do upload)
+
+    Retorna o novo arquivo temporário, seu SHA-256 e tamanho; o endereço
+    por conteúdo passa a ser o do arquivo limpo.
+    """
+    target = temp_path.with_name(f"{temp_path.stem}.clean")
+    try:
+        sha256, size = await _run_in_pool(_strip_metadata, str(temp_path), str(target))
+    except BaseException:
+        target.unlink(missing_ok=True)
+        raise
+    return target, sha256, size
+
+async def create_image_variants(photo_url: str) -> Dict[str, Dict[str, str]]:
+    """Gera as variantes da foto enviada e retorna suas URLs
+
+    A imagem é processada em um pool de processos para não bloquear o
+    event loop. Arquivos que não são imagens válidas geram erro 400.
+    """
+    storage = get_storage()
+    key = get_file_key(photo_url)
+    key_dir = key.rsplit("/", 1)[0]
+    base_url = photo_url.rsplit("/", 1)[0]
+
+    # Fotos idênticas (mesmo hash) compartilham as variantes já geradas
+    variants = variant_filenames(Path(key).stem)
+    variant_keys = [
+        f"{key_dir}/{filename}"
+        for files in variants.values() for filename in files.values()
+    ]
+    if all(await asyncio.gather(*(storage.exists(k) for k in variant_keys))):
+        return _variant_urls(base_url, variants)
+
+    out_dir = Path(tempfile.mkdtemp(dir=TEMP_DIR))
+    try:
+        async with storage.local_copy(key) as source:
+            await _run_in_pool(_render_variants, str(source), str(out_dir))
+        for variant_key in variant_keys:
+            await storage.put_file(variant_key, out_dir / variant_key.rsplit("/", 1)[1])
+    finally:
+        await asyncio.to_thread(shutil.rmtree, out_dir, True)
+
+    return _variant_urls(base_url, variants)
+
+def _variant_urls(base_url: str, variants: Dict[str, Dict[str, str]]) -> Dict[str, Dict[str, str]]:
+    return {
+        name: {fmt: f"{base_url}/{filename}" for fmt, filename in files.items()}
+        for name, files in variants.items()
+    }
+
+async def delete_image_variants(photo_variants: Optional[Dict[str, Dict[str, str]]]) -> None:
+    """Remove os arquivos das variantes de uma foto"""
+    for files in (photo_variants or {}).values():
+        for url in files.values():
+            await delete_file(url)
+
+def shutdown_pool() -> None:
+    """Encerra o pool de processos (chamado no desligamento da aplicação)"""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
\ No newline at end of file
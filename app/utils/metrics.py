@@ -0,0 +1,235 @@
+"""
+Métricas no formato de texto do Prometheus (latência por rota, requisições
+em andamento, pools do banco, uploads e fila de imagens)
+"""
+import asyncio
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+
+from app.config import settings
+from app.utils.pool import WAIT_BUCKETS
+from app.utils.queries import route_template
+
+logger = logging.getLogger(__name__)
+
+# Limites (em segundos) dos buckets do histograma de latência
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Nome -> (tipo, descrição) de cada métrica exposta
+FAMILIES = {
+    "vendavoa_http_request_duration_seconds": ("histogram", "Latência das requisições HTTP por rota, método e status"),
+    "vendavoa_http_requests_in_flight": ("gauge", "Requisições HTTP em andamento"),
+    "vendavoa_upload_bytes_total": ("counter", "Bytes recebidos em uploads aceitos"),
+    "vendavoa_uploads_total": ("counter", "Uploads aceitos"),
+    "vendavoa_image_jobs_pending": ("gauge", "Imagens aguardando ou em processamento no pool de variantes"),
+    "vendavoa_db_pool_connections": ("gauge", "Conexões do pool por estado (in_use, idle, overflow)"),
+    "vendavoa_db_pool_checkouts_total": ("counter", "Conexões retiradas do pool"),
+    "vendavoa_db_pool_timeouts_total": ("counter", "Esperas por conexão que estouraram DB_POOL_TIMEOUT"),
+    "vendavoa_db_pool_wait_seconds": ("histogram", "Espera por uma conexão livre no pool"),
+}
+
+# Amostra: (nome, rótulos ordenados, valor)
+Sample = Tuple[str, Tuple[Tuple[str, str], ...], float]
+
+class RequestMetrics:
+    """Contadores do processo atual, seguros entre threads"""
+
+    def __init__(self):
+        self.in_flight = 0
+        self.upload_bytes = 0
+        self.uploads = 0
+        # (método, rota, status) -> contagem por bucket (último: +Inf) e soma
+        self.requests: Dict[Tuple[str, str, str], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def request_started(self) -> None:
+        with self._lock:
+            self.in_flight += 1
+
+    def observe_request(self, method: str, route: str, status: int, seconds: float) -> None:
+        """Registra uma requisição terminada (e a tira das em andamento)"""
+        key = (method, route, str(status))
+        with self._lock:
+            self.in_flight -= 1
+            series = self.requests.get(key)
+            if series is None:
+                series = self.requests[key] = [0] * (len(LATENCY_BUCKETS) + 2)
+            series[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+            series[-1] += seconds
+
+    def observe_upload(self, size: int) -> None:
+        with self._lock:
+            self.uploads += 1
+            self.upload_bytes += size
+
+    def samples(self) -> List[Sample]:
+        with self._lock:
+            samples: List[Sample] = [
+                ("vendavoa_http_requests_in_flight", (), self.in_flight),
+                ("vendavoa_upload_bytes_total", (), self.upload_bytes),
+                ("vendavoa_uploads_total", (), self.uploads),
+            ]
+            for (method, route, status), series in self.requests.items():
+                labels = (("method", method), ("route", route), ("status", status))
+                samples += _histogram("vendavoa_http_request_duration_seconds", labels, LATENCY_BUCKETS, series[:-1], series[-1])
+        return samples
+
+request_metrics = RequestMetrics()
+
+def _histogram(name: str, labels, limits: Iterable[float], counts: List[float], total: float) -> List[Sample]:
+    """Amostras _bucket (acumuladas), _sum e _count a partir das contagens por bucket"""
+    samples: List[Sample] = []
+    cumulative = 0
+    for limit, count in zip([*map(str, limits), "+Inf"], counts):
+        cumulative += count
+        samples.append((f"{name}_bucket", labels + (("le", limit),), cumulative))
+    samples.append((f"{name}_sum", labels, total))
+    samples.append((f"{name}_count", labels, cumulative))
+    return samples
+
+def collect() -> List[Sample]:
+    """Amostras deste processo: contadores das requisições e estado atual dos pools e da fila"""
+    # Importados aqui: upload.py usa este módulo e images.py importa upload.py
+    from app.db import get_pool_stats
+    from app.utils import images
+
+    samples = request_metrics.samples()
+    samples.append(("vendavoa_image_jobs_pending", (), images.pending_jobs()))
+    for pool_name, stats in get_pool_stats().items():
+        labels = (("pool", pool_name),)
+        for state, value in (("in_use", stats["checked_out"]), ("idle", stats["idle"]), ("overflow", stats["overflow"])):
+            samples.append(("vendavoa_db_pool_connections", labels + (("state", state),), value))
+        samples.append(("vendavoa_db_pool_checkouts_total", labels, stats["checkouts"]))
+        samples.append(("vendavoa_db_pool_timeouts_total", labels, stats["timeouts"]))
+        samples += _histogram(
+            "vendavoa_db_pool_wait_seconds", labels, WAIT_BUCKETS,
+            list(stats["wait_buckets"].values()), stats["wait_total_ms"] / 1000
+        )
+    return samples
+
+class MetricsMiddleware:
+    """Mede a latência de cada requisição HTTP e as requisições em andamento
+
+    As rotas entram pelo modelo (/api/cars/{car_id}); caminhos sem rota
+    (404) ficam juntos em "(unmatched)" para não multiplicar as séries.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        request_metrics.request_started()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = route_template(scope) if scope.get("endpoint") is not None else "(unmatched)"
+            request_metrics.observe_request(scope["method"], route, status_code, time.perf_counter() - started)
+
+# Vários workers (METRICS_DIR): cada processo grava suas amostras em
+# <METRICS_DIR>/<pid>.json a cada METRICS_FLUSH_SECONDS e o /metrics soma
+# os arquivos dos processos vivos. Um worker reiniciado zera os próprios
+# contadores, o que o Prometheus trata como reinício (rate/increase)
+
+def _snapshot_path(pid: int) -> Path:
+    return Path(settings.METRICS_DIR) / f"{pid}.json"
+
+def write_snapshot() -> None:
+    """Grava as amostras deste processo (substituição atômica)"""
+    path = _snapshot_path(os.getpid())
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_suffix(".tmp")
+    temp_path.write_text(json.dumps([[name, list(labels), value] for name, labels, value in collect()]))
+    os.replace(temp_path, path)
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def _read_snapshots() -> Iterable[Sample]:
+    for path in Path(settings.METRICS_DIR).glob("*.json"):
+        try:
+            pid = int(path.stem)
+        except ValueError:
+            continue
+        if pid != os.getpid() and not _alive(pid):
+            path.unlink(missing_ok=True)
+            continue
+        try:
+            entries = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue
+        for name, labels, value in entries:
+            yield name, tuple(tuple(label) for label in labels), value
+
+def aggregate() -> List[Sample]:
+    """Amostras de todos os workers somadas (ou só deste processo, sem METRICS_DIR)"""
+    if not settings.METRICS_DIR:
+        return collect()
+    write_snapshot()
+    totals: Dict[Tuple[str, tuple], float] = defaultdict(float)
+    for name, labels, value in _read_snapshots():
+        totals[(name, labels)] += value
+    return [(name, labels, value) for (name, labels), value in totals.items()]
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def render(samples: List[Sample]) -> str:
+    """Formato de texto do Prometheus (versão 0.0.4)"""
+    by_family: Dict[str, List[Sample]] = defaultdict(list)
+    for sample in samples:
+        name = sample[0]
+        for suffix in ("_bucket", "_sum", "_count"):
+            if name.endswith(suffix) and name[:-len(suffix)] in FAMILIES:
+                name = name[:-len(suffix)]
+                break
+        by_family[name].append(sample)
+
+    lines = []
+    for family, (kind, description) in FAMILIES.items():
+        lines.append(f"# HELP {family} {description}")
+        lines.append(f"# TYPE {family} {kind}")
+        for name, labels, value in by_family.get(family, ()):
+            label_text = ",".join(f'{key}="{_escape(str(label))}"' for key, label in labels)
+            lines.append(f"{name}{{{label_text}}} {_number(value)}" if labels else f"{name} {_number(value)}")
+    return "\n".join(lines) + "\n"
+
+async def flush_periodically() -> None:
+    """Tarefa de fundo (com METRICS_DIR): mantém o arquivo deste worker atualizado"""
+    while True:
+        try:
+            await asyncio.to_thread(write_snapshot)
+        except OSError as e:
+            logger.warning("Falha ao gravar métricas em %s: %s", settings.METRICS_DIR, e)
+        await asyncio.sleep(settings.METRICS_FLUSH_SECONDS)
+
+def remove_snapshot() -> None:
+    _snapshot_path(os.getpid()).unlink(missing_ok=True)
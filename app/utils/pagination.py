@@ -0,0 +1,66 @@
+"""
+Paginação por cursor (keyset) ordenada por (created_at, id)
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Sequence, Tuple
+from fastapi import HTTPException, Response, status
+from sqlalchemy import and_, or_, String, type_coerce
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Gera um cursor opaco a partir da última linha da página"""
+    raw = json.dumps([created_at.isoformat(), row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Lê um cursor gerado por encode_cursor"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+def timestamp_param(value: datetime, dialect_name: str):
+    """Parâmetro para comparar com colunas de data (created_at, updated_at)"""
+    # No SQLite as datas são texto gravado pelo CURRENT_TIMESTAMP
+    # ("YYYY-MM-DD HH:MM:SS"); o parâmetro precisa do mesmo formato para
+    # que a comparação de strings funcione
+    if dialect_name == "sqlite":
+        text = value.strftime("%Y-%m-%d %H:%M:%S")
+        if value.microsecond:
+            text += f".{value.microsecond:06d}"
+        return type_coerce(text, String)
+    return value
+
+def apply_cursor(query, model, cursor: Optional[str], dialect_name: str, column=None):
+    """Ordena a consulta por (created_at, id) e aplica o cursor, se houver
+
+    `column` troca o created_at por outra coluna ou expressão de data (a
+    sincronização pagina as alterações por coalesce(updated_at, created_at)).
+    """
+    column = model.created_at if column is None else column
+    query = query.order_by(column, model.id)
+    if not cursor:
+        return query
+    created_at, row_id = decode_cursor(cursor)
+    created_at = timestamp_param(created_at, dialect_name)
+    return query.where(or_(
+        column > created_at,
+        and_(column == created_at, model.id > row_id)
+    ))
+
+def set_next_cursor(response: Response, items: Sequence, limit: int) -> None:
+    """Publica o cursor da próxima página no header X-Next-Cursor"""
+    if not items or len(items) < limit:
+        return
+    last = items[-1]
+    if last.created_at is None:
+        return
+    response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last.created_at, last.id)
\ No newline at end of file
@@ -0,0 +1,83 @@
+"""
+Métricas do pool de conexões (espera no checkout, conexões em uso e overflow)
+"""
+import bisect
+import logging
+import threading
+import time
+from typing import Type
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+logger = logging.getLogger(__name__)
+
+# Limites (em segundos) dos buckets do histograma de espera
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Esperas acima disso são registradas no log (pool saturado)
+SLOW_CHECKOUT_SECONDS = 0.5
+
+class PoolMetrics:
+    """Contadores de checkout de um pool, seguros entre threads"""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_sum = 0.0
+        self.wait_max = 0.0
+        self.wait_buckets = [0] * (len(WAIT_BUCKETS) + 1)  # último: acima do maior limite
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_sum += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            self.wait_buckets[bisect.bisect_left(WAIT_BUCKETS, seconds)] += 1
+
+    def stats(self, pool) -> dict:
+        """Estado atual do pool somado aos contadores acumulados"""
+        with self._lock:
+            observed = self.checkouts + self.timeouts
+            return {
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "idle": pool.checkedin(),
+                # overflow() é negativo enquanto o pool não está cheio
+                "overflow": max(pool.overflow(), 0),
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_avg_ms": round(self.wait_sum / observed * 1000, 3) if observed else 0.0,
+                "wait_max_ms": round(self.wait_max * 1000, 3),
+                "wait_total_ms": round(self.wait_sum * 1000, 3),
+                "wait_buckets": dict(zip(
+                    [str(limit) for limit in WAIT_BUCKETS] + ["+Inf"], self.wait_buckets
+                )),
+            }
+
+def instrumented_pool(pool_class: Type[QueuePool], metrics: PoolMetrics) -> Type[QueuePool]:
+    """Subclasse do pool que mede o tempo de espera de cada checkout"""
+
+    class InstrumentedPool(pool_class):
+        def _do_get(self):
+            start = time.perf_counter()
+            try:
+                connection = super()._do_get()
+            except PoolTimeoutError:
+                metrics.observe(time.perf_counter() - start, timed_out=True)
+                logger.warning(
+                    "Pool de conexões esgotado: %s em uso, %s de overflow",
+                    self.checkedout(), max(self.overflow(), 0)
+                )
+                raise
+            waited = time.perf_counter() - start
+            metrics.observe(waited)
+            if waited > SLOW_CHECKOUT_SECONDS:
+                logger.warning("Checkout de conexão esperou %.0f ms", waited * 1000)
+            return connection
+
+    InstrumentedPool.__name__ = f"Instrumented{pool_class.__name__}"
+    return InstrumentedPool
@@ -0,0 +1,175 @@
+"""
+Consultas SQL por requisição: contagem, tempo no banco e detecção de N+1
+"""
+import logging
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+
+logger = logging.getLogger(__name__)
+
+# Trecho do SQL mostrado nos logs e nas falhas do query_budget
+STATEMENT_PREVIEW = 200
+
+class QueryStats:
+    """Consultas executadas durante uma requisição (ou um bloco query_budget)"""
+
+    __slots__ = ("count", "duration", "statements")
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        # O SQL chega com placeholders: a mesma consulta com outros
+        # parâmetros conta como repetição (o padrão do N+1)
+        self.statements: Counter = Counter()
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.count += 1
+        self.duration += seconds
+        self.statements[statement] += 1
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """Consultas executadas threshold vezes ou mais, da mais repetida para a menos"""
+        return [(sql, n) for sql, n in self.statements.most_common() if n >= threshold]
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.duration * 1000:.1f};desc="{self.count} queries"'
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+# Chamados com (rota, estatísticas) ao fim de cada requisição (usado pelo query_budget)
+_observers: List[Callable[[str, QueryStats], None]] = []
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info["query_started"] = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    started = conn.info.pop("query_started", None)
+    if stats is not None and started is not None:
+        stats.record(statement, time.perf_counter() - started)
+
+def watch_queries(sync_engine) -> None:
+    """Registra os eventos de contagem numa engine (síncrona ou .sync_engine)"""
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+def route_template(scope) -> str:
+    """Caminho da requisição com os parâmetros no lugar dos valores (/api/cars/{car_id})"""
+    # Dentro de um Mount (/static), o prefixo montado fica em root_path
+    mount_prefix = scope.get("root_path", "")[len(scope.get("app_root_path", "")):]
+    if mount_prefix:
+        return f"{mount_prefix}/{{path}}"
+    path = scope["path"]
+    for name, value in (scope.get("path_params") or {}).items():
+        value = str(value)
+        if "/" in value:
+            path = path.replace(value, f"{{{name}}}", 1)
+        else:
+            path = "/".join(f"{{{name}}}" if part == value else part for part in path.split("/"))
+    return path
+
+def _preview(statement: str) -> str:
+    return " ".join(statement.split())[:STATEMENT_PREVIEW]
+
+class QueryStatsMiddleware:
+    """Conta as consultas de cada requisição HTTP
+
+    Devolve o total e o tempo no banco no cabeçalho Server-Timing (visível
+    no DevTools) e registra no log uma linha por requisição que consultou o
+    banco; vira aviso quando passa de `budget` consultas ou quando a mesma
+    consulta se repete `repeat_threshold` vezes (provável N+1). Consultas
+    feitas depois do início da resposta (streaming) entram só no log.
+    """
+
+    def __init__(self, app, budget: int, repeat_threshold: int):
+        self.app = app
+        self.budget = budget
+        self.repeat_threshold = repeat_threshold
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current.set(stats)
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                MutableHeaders(scope=message).append("Server-Timing", stats.server_timing())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            self._report(scope, status_code, stats, time.perf_counter() - started)
+
+    def _report(self, scope, status_code: int, stats: QueryStats, elapsed: float) -> None:
+        route = route_template(scope)
+        for observer in list(_observers):
+            observer(route, stats)
+        if not stats.count:
+            return
+
+        repeated = stats.repeated(self.repeat_threshold)
+        fields = {
+            "method": scope["method"],
+            "route": route,
+            "status": status_code,
+            "queries": stats.count,
+            "db_ms": round(stats.duration * 1000, 1),
+            "total_ms": round(elapsed * 1000, 1),
+            "repeated": len(repeated),
+        }
+        message = "sql " + " ".join(f"{key}={value}" for key, value in fields.items())
+        if stats.count > self.budget or repeated:
+            for statement, times in repeated:
+                message += f"\n  {times}x {_preview(statement)}"
+            logger.warning(message, extra={"sql": fields})
+        else:
+            logger.info(message, extra={"sql": fields})
+
+@contextmanager
+def query_budget(max_queries: int) -> Iterator[List[Tuple[str, QueryStats]]]:
+    """Falha (AssertionError) se alguma requisição do bloco passar de max_queries
+
+    Conta as requisições atendidas pelo QueryStatsMiddleware (inclusive via
+    TestClient, que roda a aplicação em outra thread) e as consultas feitas
+    diretamente dentro do bloco. Nos testes, pela fixture max_queries
+    (tests/conftest.py):
+
+        def test_cars(client, auth_headers, max_queries):
+            with max_queries(3):
+                client.get("/api/cars/", headers=auth_headers)
+    """
+    seen: List[Tuple[str, QueryStats]] = []
+    observer = lambda route, stats: seen.append((route, stats))
+    direct = QueryStats()
+    token = _current.set(direct)
+    _observers.append(observer)
+    try:
+        yield seen
+    finally:
+        _observers.remove(observer)
+        _current.reset(token)
+
+    if direct.count:
+        seen.append(("(bloco)", direct))
+    over = [(route, stats) for route, stats in seen if stats.count > max_queries]
+    if over:
+        lines = []
+        for route, stats in over:
+            lines.append(f"{route}: {stats.count} consultas (limite {max_queries})")
+            lines += [f"  {n}x {_preview(sql)}" for sql, n in stats.statements.most_common(5)]
+        raise AssertionError("\n".join(lines))
@@ -0,0 +1,55 @@
+"""
+Réplicas de leitura: rodízio entre as réplicas saudáveis e afastamento das que falham
+"""
+import itertools
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+class ReplicaSet:
+    """Escolhe a próxima réplica (round-robin), pulando as afastadas"""
+
+    def __init__(self, engines: List, eject_seconds: float):
+        self.engines = engines
+        self.eject_seconds = eject_seconds
+        self.ejections = 0
+        self._ejected_until: Dict[int, float] = {}
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def __bool__(self) -> bool:
+        return bool(self.engines)
+
+    def choose(self):
+        """Próxima réplica saudável, ou None se todas estiverem afastadas"""
+        now = time.monotonic()
+        with self._lock:
+            for _ in range(len(self.engines)):
+                index = next(self._counter) % len(self.engines)
+                if self._ejected_until.get(index, 0) <= now:
+                    return self.engines[index]
+        return None
+
+    def eject(self, engine, reason: Optional[BaseException] = None) -> None:
+        """Tira a réplica do rodízio por eject_seconds"""
+        index = self.engines.index(engine)
+        with self._lock:
+            self._ejected_until[index] = time.monotonic() + self.eject_seconds
+            self.ejections += 1
+        logger.warning(
+            "Réplica %s afastada por %ss: %s", engine.url.render_as_string(), self.eject_seconds, reason
+        )
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "replicas": len(self.engines),
+                "healthy": sum(
+                    1 for index in range(len(self.engines)) if self._ejected_until.get(index, 0) <= now
+                ),
+                "ejections": self.ejections,
+            }
@@ -0,0 +1,142 @@
+"""
+Leitura de planilhas de estoque (CSV/XLSX) linha a linha
+"""
+import codecs
+import csv
+import unicodedata
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+# Cabeçalhos aceitos (sem acento, minúsculos) -> campo de CarCreate
+HEADER_ALIASES = {
+    "title": "title", "titulo": "title",
+    "brand": "brand", "marca": "brand",
+    "model": "model", "modelo": "model",
+    "year": "year", "ano": "year", "ano_modelo": "year",
+    "price": "price", "preco": "price", "valor": "price",
+    "observations": "observations", "observacoes": "observations", "obs": "observations",
+    "status": "status", "situacao": "status",
+}
+REQUIRED_FIELDS = {"brand", "model", "year"}
+
+STATUS_ALIASES = {
+    "disponivel": "available",
+    "vendido": "sold",
+    "reservado": "reserved",
+}
+
+class SpreadsheetError(ValueError):
+    """Arquivo que não pode ser importado (formato ou cabeçalho inválido)"""
+
+def _plain(value: str) -> str:
+    """Texto minúsculo e sem acentos"""
+    normalized = unicodedata.normalize("NFKD", value.strip().lower())
+    return "".join(c for c in normalized if not unicodedata.combining(c))
+
+def normalize_header(name: Any) -> Optional[str]:
+    if name is None:
+        return None
+    return HEADER_ALIASES.get(_plain(str(name)).replace(" ", "_"))
+
+def parse_price(value: Any) -> Any:
+    """Aceita "45000", "45.000,00" e "R$ 45.000,00"; o resto fica para a validação"""
+    if not isinstance(value, str):
+        return value
+    text = value.replace("R$", "").replace(" ", "").strip()
+    if "," in text:
+        text = text.replace(".", "").replace(",", ".")
+    return text
+
+def clean_row(raw: Dict[str, Any]) -> Dict[str, Any]:
+    """Remove células vazias e converte os formatos usados nas planilhas"""
+    row = {}
+    for field, value in raw.items():
+        if isinstance(value, str):
+            value = value.strip()
+        if value is None or value == "":
+            continue
+        row[field] = value
+
+    if "price" in row:
+        row["price"] = parse_price(row["price"])
+    if isinstance(row.get("status"), str):
+        status = _plain(row["status"])
+        row["status"] = STATUS_ALIASES.get(status, status)
+    # Exportações de DMS costumam não ter um título próprio
+    if "title" not in row and {"brand", "model"} <= row.keys():
+        row["title"] = " ".join(str(row[f]) for f in ("brand", "model", "year") if f in row)
+    return row
+
+def _map_header(header) -> Dict[int, str]:
+    columns = {}
+    for index, name in enumerate(header):
+        field = normalize_header(name)
+        if field and field not in columns.values():
+            columns[index] = field
+    missing = REQUIRED_FIELDS - set(columns.values())
+    if missing:
+        raise SpreadsheetError(f"Colunas obrigatórias ausentes: {', '.join(sorted(missing))}")
+    return columns
+
+def _detect_encoding(path: Path) -> str:
+    """UTF-8 (com ou sem BOM) ou, se não decodificar, Windows-1252 (Excel)"""
+    with open(path, "rb") as f:
+        sample = f.read(64 * 1024)
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+        return "utf-8-sig"
+    except UnicodeDecodeError:
+        return "cp1252"
+
+def _iter_csv(path: Path) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    encoding = _detect_encoding(path)
+    with open(path, newline="", encoding=encoding, errors="replace") as f:
+        sample = f.read(8 * 1024)
+        f.seek(0)
+        try:
+            # Excel em português exporta com ";"
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+        except csv.Error:
+            dialect = csv.excel
+        reader = csv.reader(f, dialect)
+        header = next(reader, None)
+        if header is None:
+            raise SpreadsheetError("Arquivo vazio")
+        columns = _map_header(header)
+        for values in reader:
+            if not any(v.strip() for v in values):
+                continue
+            yield reader.line_num, {
+                field: values[index] for index, field in columns.items() if index < len(values)
+            }
+
+def _iter_xlsx(path: Path) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise SpreadsheetError("Importação de XLSX requer o pacote openpyxl")
+
+    # read_only: as linhas são lidas do arquivo sob demanda. O arquivo é
+    # aberto aqui porque o openpyxl recusa caminhos sem extensão .xlsx
+    with open(path, "rb") as f:
+        workbook = load_workbook(f, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                raise SpreadsheetError("Planilha vazia")
+            columns = _map_header(header)
+            for line, values in enumerate(rows, start=2):
+                if not any(v not in (None, "") for v in values):
+                    continue
+                yield line, {
+                    field: values[index] for index, field in columns.items() if index < len(values)
+                }
+        finally:
+            workbook.close()
+
+def iter_rows(path: Path, file_ext: str) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Gera (número da linha na planilha, campos limpos) sem carregar o arquivo inteiro"""
+    rows = _iter_xlsx(path) if file_ext == ".xlsx" else _iter_csv(path)
+    for line, raw in rows:
+        yield line, clean_row(raw)
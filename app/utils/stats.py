@@ -0,0 +1,132 @@
+"""
+Agregados por tenant do /api/stats, atualizados na mesma transação das escritas
+"""
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import select, delete, func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.car import Car
+from app.models.client import Client
+from app.models.document import Document
+from app.models.tenant_stat import TenantStat
+
+SOLD = "sold"
+
+def _field(row: Any, name: str):
+    """Lê um campo de um objeto do ORM, de uma linha ou de um dict"""
+    if isinstance(row, dict):
+        return row.get(name)
+    return getattr(row, name, None)
+
+def _aware(value: datetime) -> datetime:
+    # SQLite devolve datas sem fuso; são gravadas em UTC
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+def sold_at_for(old_status: Optional[str], new_status: Optional[str], sold_at: Optional[datetime]) -> Optional[datetime]:
+    """Valor de sold_at após uma mudança de status"""
+    if new_status != SOLD:
+        return None
+    if old_status != SOLD:
+        return datetime.now(timezone.utc)
+    return sold_at
+
+def days_to_sale(car: Any) -> Optional[float]:
+    """Dias entre o cadastro e a venda (None se a venda não foi registrada)"""
+    created_at, sold_at = _field(car, "created_at"), _field(car, "sold_at")
+    if _field(car, "status") != SOLD or created_at is None or sold_at is None:
+        return None
+    return (_aware(sold_at) - _aware(created_at)).total_seconds() / 86400
+
+class StatsDelta:
+    """Variações dos agregados de um tenant, gravadas de uma vez por apply()
+
+    Numa atualização, registre a linha antiga com sign=-1 antes de alterá-la
+    e a nova com sign=1 depois; campos que não mudaram se anulam.
+    """
+    def __init__(self, tenant_id: int):
+        self.tenant_id = tenant_id
+        self.values: Dict[Tuple[str, str], List[float]] = defaultdict(lambda: [0, 0.0])
+
+    def add(self, metric: str, key: str, count: int, total: float = 0.0) -> None:
+        value = self.values[(metric, key)]
+        value[0] += count
+        value[1] += total
+
+    def car(self, car: Any, sign: int = 1) -> None:
+        self.add("cars", _field(car, "status") or "unknown", sign, sign * (_field(car, "price") or 0))
+        days = days_to_sale(car)
+        if days is not None:
+            self.add("sales", "days", sign, sign * days)
+
+    def client(self, client: Any, sign: int = 1) -> None:
+        self.add("clients", _field(client, "negotiation_status") or "unknown", sign)
+
+    def document(self, document: Any, sign: int = 1) -> None:
+        self.add("documents", "completed" if _field(document, "is_completed") else "pending", sign)
+
+    async def apply(self, db: AsyncSession) -> None:
+        """Soma as variações às linhas de tenant_stats (upsert atômico)"""
+        rows = [
+            {"tenant_id": self.tenant_id, "metric": metric, "key": key, "count": count, "total": total}
+            for (metric, key), (count, total) in self.values.items()
+            if count or total
+        ]
+        self.values.clear()
+        if not rows:
+            return
+        dialect = postgresql if db.bind.dialect.name == "postgresql" else sqlite
+        statement = dialect.insert(TenantStat)
+        statement = statement.on_conflict_do_update(
+            index_elements=[TenantStat.tenant_id, TenantStat.metric, TenantStat.key],
+            set_={
+                "count": TenantStat.count + statement.excluded.count,
+                "total": TenantStat.total + statement.excluded.total,
+            }
+        )
+        await db.execute(statement, rows)
+
+async def rebuild_stats(db: AsyncSession, tenant_id: int) -> None:
+    """Recalcula os agregados do tenant a partir das tabelas (corrige divergências)"""
+    await db.execute(delete(TenantStat).where(TenantStat.tenant_id == tenant_id))
+    stats = StatsDelta(tenant_id)
+
+    result = await db.execute(
+        select(Car.status, func.count(), func.coalesce(func.sum(Car.price), 0))
+        .where(Car.tenant_id == tenant_id)
+        .group_by(Car.status)
+    )
+    for car_status, count, total in result.all():
+        stats.add("cars", car_status or "unknown", count, total)
+
+    if db.bind.dialect.name == "postgresql":
+        days = func.extract("epoch", Car.sold_at - Car.created_at) / 86400
+    else:
+        days = func.julianday(Car.sold_at) - func.julianday(Car.created_at)
+    count, total = (await db.execute(
+        select(func.count(), func.coalesce(func.sum(days), 0))
+        .where(Car.tenant_id == tenant_id, Car.status == SOLD, Car.sold_at.is_not(None))
+    )).one()
+    if count:
+        stats.add("sales", "days", count, total)
+
+    result = await db.execute(
+        select(Client.negotiation_status, func.count())
+        .where(Client.tenant_id == tenant_id)
+        .group_by(Client.negotiation_status)
+    )
+    for negotiation_status, count in result.all():
+        stats.add("clients", negotiation_status or "unknown", count)
+
+    result = await db.execute(
+        select(Document.is_completed, func.count()).join(Car)
+        .where(Car.tenant_id == tenant_id)
+        .group_by(Document.is_completed)
+    )
+    for is_completed, count in result.all():
+        stats.add("documents", "completed" if is_completed else "pending", count)
+
+    await stats.apply(db)
@@ -0,0 +1,206 @@
+"""
+Backends de armazenamento dos uploads (disco local ou S3 compatível)
+"""
+import asyncio
+import mimetypes
+import shutil
+import tempfile
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator, Optional
+
+import aiofiles
+import aiofiles.os
+
+from app.config import settings
+
+CHUNK_SIZE = 64 * 1024
+
+# Área de trabalho local (uploads em andamento, cópias para processamento).
+# Fica dentro de UPLOAD_DIR para que o rename final seja atômico mesmo com a
+# pasta num volume próprio; o LocalStorage recusa chaves dentro dela
+TEMP_DIR = Path(settings.UPLOAD_DIR) / "tmp"
+TEMP_DIR.mkdir(parents=True, exist_ok=True)
+
+class StorageBackend(ABC):
+    """Interface comum dos backends; as chaves são caminhos relativos (photos/x.jpg)"""
+
+    @abstractmethod
+    async def put_file(self, key: str, source: Path) -> None:
+        """Grava o arquivo local `source` sob `key`; `source` é consumido"""
+
+    @abstractmethod
+    def iter_chunks(self, key: str) -> AsyncIterator[bytes]:
+        """Lê o conteúdo de `key` em blocos"""
+
+    @abstractmethod
+    async def delete(self, key: str) -> bool:
+        """Apaga `key`; False se não foi possível"""
+
+    @abstractmethod
+    async def exists(self, key: str) -> bool:
+        """Se existe um arquivo sob `key`"""
+
+    @abstractmethod
+    def presigned_url(self, key: str, expires_in: Optional[int] = None) -> str:
+        """URL temporária para download direto do arquivo"""
+
+    @asynccontextmanager
+    async def local_copy(self, key: str):
+        """Caminho local com o conteúdo de `key` (cópia temporária se preciso)"""
+        temp_dir = Path(tempfile.mkdtemp(dir=TEMP_DIR))
+        path = temp_dir / Path(key).name
+        try:
+            async with aiofiles.open(path, "wb") as out:
+                async for chunk in self.iter_chunks(key):
+                    await out.write(chunk)
+            yield path
+        finally:
+            await asyncio.to_thread(shutil.rmtree, temp_dir, True)
+
+class LocalStorage(StorageBackend):
+    """Arquivos no disco do servidor, servidos em /uploads"""
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.temp_dir = TEMP_DIR.resolve()
+
+    def path(self, key: str) -> Path:
+        path = (self.root / key).resolve()
+        # Impede chaves como "../../etc/passwd" e arquivos temporários
+        # (uploads pela metade em tmp/) servidos em /uploads/tmp/...
+        if self.root.resolve() not in path.parents or path == self.temp_dir or self.temp_dir in path.parents:
+            raise ValueError(f"Invalid storage key: {key}")
+        return path
+
+    async def put_file(self, key: str, source: Path) -> None:
+        target = self.path(key)
+        await aiofiles.os.makedirs(target.parent, exist_ok=True)
+        # Rename atômico: leitores nunca veem um arquivo pela metade
+        await aiofiles.os.replace(source, target)
+
+    async def iter_chunks(self, key: str) -> AsyncIterator[bytes]:
+        async with aiofiles.open(self.path(key), "rb") as f:
+            while True:
+                chunk = await f.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+
+    async def delete(self, key: str) -> bool:
+        try:
+            await aiofiles.os.remove(self.path(key))
+            return True
+        except (FileNotFoundError, ValueError):
+            return False
+
+    async def exists(self, key: str) -> bool:
+        try:
+            return await aiofiles.os.path.isfile(self.path(key))
+        except ValueError:
+            return False
+
+    def presigned_url(self, key: str, expires_in: Optional[int] = None) -> str:
+        return f"/uploads/{key}"
+
+    @asynccontextmanager
+    async def local_copy(self, key: str):
+        yield self.path(key)
+
+class S3Storage(StorageBackend):
+    """Bucket S3 ou compatível (MinIO, R2, Spaces...) via boto3"""
+
+    def __init__(self, bucket: str, prefix: str = "", endpoint_url: Optional[str] = None,
+                 region: Optional[str] = None, access_key_id: Optional[str] = None,
+                 secret_access_key: Optional[str] = None, presign_expires: int = 3600):
+        try:
+            import boto3
+            from botocore.exceptions import ClientError
+        except ImportError:
+            raise RuntimeError("STORAGE_BACKEND=s3 requires boto3 (pip install boto3)")
+
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.presign_expires = presign_expires
+        self._client_error = ClientError
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url or None,
+            region_name=region or None,
+            aws_access_key_id=access_key_id or None,
+            aws_secret_access_key=secret_access_key or None,
+        )
+
+    def object_key(self, key: str) -> str:
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    async def put_file(self, key: str, source: Path) -> None:
+        content_type = mimetypes.guess_type(key)[0] or "application/octet-stream"
+        try:
+            # upload_file lê o arquivo em partes (multipart para arquivos grandes)
+            await asyncio.to_thread(
+                self.client.upload_file,
+                str(source),
+                self.bucket,
+                self.object_key(key),
+                ExtraArgs={"ContentType": content_type},
+            )
+        finally:
+            await aiofiles.os.remove(source)
+
+    async def iter_chunks(self, key: str) -> AsyncIterator[bytes]:
+        response = await asyncio.to_thread(
+            self.client.get_object, Bucket=self.bucket, Key=self.object_key(key)
+        )
+        chunks = response["Body"].iter_chunks(CHUNK_SIZE)
+        while True:
+            chunk = await asyncio.to_thread(next, chunks, None)
+            if chunk is None:
+                break
+            yield chunk
+
+    async def delete(self, key: str) -> bool:
+        await asyncio.to_thread(
+            self.client.delete_object, Bucket=self.bucket, Key=self.object_key(key)
+        )
+        return True
+
+    async def exists(self, key: str) -> bool:
+        try:
+            await asyncio.to_thread(
+                self.client.head_object, Bucket=self.bucket, Key=self.object_key(key)
+            )
+            return True
+        except self._client_error:
+            return False
+
+    def presigned_url(self, key: str, expires_in: Optional[int] = None) -> str:
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": self.bucket, "Key": self.object_key(key)},
+            ExpiresIn=expires_in or self.presign_expires,
+        )
+
+_storage: Optional[StorageBackend] = None
+
+def get_storage() -> StorageBackend:
+    """Backend configurado em STORAGE_BACKEND (criado na primeira chamada)"""
+    global _storage
+    if _storage is None:
+        if settings.STORAGE_BACKEND == "s3":
+            _storage = S3Storage(
+                bucket=settings.S3_BUCKET,
+                prefix=settings.S3_PREFIX,
+                endpoint_url=settings.S3_ENDPOINT_URL,
+                region=settings.S3_REGION,
+                access_key_id=settings.S3_ACCESS_KEY_ID,
+                secret_access_key=settings.S3_SECRET_ACCESS_KEY,
+                presign_expires=settings.S3_PRESIGN_EXPIRES,
+            )
+        elif settings.STORAGE_BACKEND == "local":
+            _storage = LocalStorage(settings.UPLOAD_DIR)
+        else:
+            raise RuntimeError(f"Unknown STORAGE_BACKEND: {settings.STORAGE_BACKEND}")
+    return _storage
\ No newline at end of file
@@ -0,0 +1,121 @@
+"""
+Utilitários da sincronização incremental (/api/sync)
+"""
+import base64
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, NamedTuple, Optional
+from fastapi import HTTPException, status
+from sqlalchemy import insert, delete, select, func, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.deleted_record import DeletedRecord
+from app.utils.pagination import timestamp_param
+
+# Margem aplicada ao cursor para não perder escritas cujo horário foi
+# definido antes da leitura mas que só foram confirmadas depois dela. No
+# PostgreSQL, now() é o início da transação, e sync_horizon já recua o
+# cursor até a transação de escrita mais antiga em andamento; a margem
+# cobre o que ela não vê (escritas de outro usuário do banco, sem
+# pg_read_all_stats). No SQLite as escritas são serializadas e curtas, e a
+# margem precisa ser maior que a transação de escrita mais longa.
+SYNC_OVERLAP = timedelta(seconds=5)
+
+# Por quanto tempo as remoções ficam registradas; um cursor mais antigo que
+# isso pode ter perdido remoções e recebe o snapshot completo de novo
+TOMBSTONE_RETENTION = timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+
+# Ordem em que as páginas percorrem as entidades; "deleted" (as remoções)
+# só entra nas alterações, não no snapshot completo
+SNAPSHOT_ENTITIES = ("cars", "clients", "documents")
+SYNC_ENTITIES = SNAPSHOT_ENTITIES + ("deleted",)
+
+class SyncCursor(NamedTuple):
+    """Posição de um cliente na sincronização
+
+    `since` é o início das alterações a buscar (None: snapshot completo).
+    Enquanto as páginas de uma sincronização são buscadas, `started_at` é
+    o horário em que a primeira foi lida e `entity`/`after` indicam onde a
+    anterior parou (`after` é um cursor de app.utils.pagination).
+    """
+    since: Optional[datetime]
+    started_at: Optional[datetime] = None
+    entity: Optional[str] = None
+    after: Optional[str] = None
+
+async def record_deletions(db: AsyncSession, tenant_id: int, entity: str, ids: Iterable[int]) -> None:
+    """Registra a remoção dos ids na mesma transação da escrita
+
+    Aproveita para apagar as remoções do tenant mais antigas que
+    TOMBSTONE_RETENTION.
+    """
+    rows = [{"tenant_id": tenant_id, "entity": entity, "entity_id": entity_id} for entity_id in ids]
+    if not rows:
+        return
+    expired_before = datetime.now(timezone.utc) - TOMBSTONE_RETENTION
+    await db.execute(delete(DeletedRecord).where(
+        DeletedRecord.tenant_id == tenant_id,
+        DeletedRecord.deleted_at < timestamp_param(expired_before, db.bind.dialect.name)
+    ))
+    await db.execute(insert(DeletedRecord), rows)
+
+async def sync_horizon(db: AsyncSession) -> datetime:
+    """Horário do banco até o qual todas as escritas já estão visíveis
+
+    Deve ser lido no principal, antes dos dados: numa réplica, o atraso da
+    replicação faria o cursor passar de linhas que ela ainda não recebeu.
+    No PostgreSQL, uma transação de escrita ainda aberta grava created_at/
+    updated_at com o seu próprio início (now()), que pode ser anterior ao
+    desta leitura; o horizonte recua até a mais antiga delas.
+    """
+    if db.bind.dialect.name == "postgresql":
+        result = await db.execute(text(
+            "SELECT least(now(), min(xact_start)) FROM pg_stat_activity WHERE backend_xid IS NOT NULL"
+        ))
+    else:
+        result = await db.execute(select(func.now()))
+    return result.scalar_one()
+
+def _encode(raw: str) -> str:
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def encode_sync_cursor(moment: datetime) -> str:
+    """Cursor opaco a partir do horário do banco na leitura"""
+    return _encode((moment - SYNC_OVERLAP).isoformat())
+
+def encode_page_cursor(position: SyncCursor) -> str:
+    """Cursor da próxima página de uma sincronização em andamento"""
+    since = position.since.isoformat() if position.since else None
+    return _encode(json.dumps([since, position.started_at.isoformat(), position.entity, position.after]))
+
+def decode_sync_cursor(cursor: str) -> SyncCursor:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded).decode()
+        if not raw.startswith("["):
+            return SyncCursor(datetime.fromisoformat(raw))
+        since, started_at, entity, after = json.loads(raw)
+        entities = SNAPSHOT_ENTITIES if since is None else SYNC_ENTITIES
+        if entity not in entities or not isinstance(after, (str, type(None))):
+            raise ValueError(entity)
+        return SyncCursor(
+            datetime.fromisoformat(since) if since else None,
+            datetime.fromisoformat(started_at),
+            entity,
+            after
+        )
+    except (ValueError, TypeError, UnicodeDecodeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid sync cursor"
+        )
+
+def _naive_utc(moment: datetime) -> datetime:
+    # O PostgreSQL devolve horários com fuso; o SQLite, em UTC sem fuso
+    return moment.astimezone(timezone.utc).replace(tzinfo=None) if moment.tzinfo else moment
+
+def cursor_expired(position: SyncCursor, now: datetime) -> bool:
+    """Se remoções posteriores ao cursor podem já ter sido apagadas"""
+    oldest = position.since if position.since is not None else position.started_at
+    return _naive_utc(oldest) < _naive_utc(now) - TOMBSTONE_RETENTION
@@ -3,23 +3,54 @@ Utilitários para upload de arquivos
 """
 import os
 import uuid
+import hashlib
 from pathlib import Path
-from typing import Optional
+from typing import Awaitable, Callable, Dict, NamedTuple, Optional, Tuple
 from fastapi import UploadFile, HTTPException
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, model_validator
+from starlette.datastructures import Headers
+from sqlalchemy import select, update, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+import aiofiles
+import aiofiles.os
 import shutil
 
+from app.config import settings
+from app.models.stored_file import StoredFile
+from app.utils.metrics import request_metrics
+from app.utils.storage import get_storage, TEMP_DIR
+
 # Configurações
-UPLOAD_DIR = Path("uploads")
+UPLOAD_DIR = Path(settings.UPLOAD_DIR)
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
+CHUNK_SIZE = 64 * 1024  # 64KB por leitura
+# Folga para os cabeçalhos e demais campos do formulário multipart
+MULTIPART_OVERHEAD = 64 * 1024
 ALLOWED_EXTENSIONS = {
     "images": {".jpg", ".jpeg", ".png", ".gif", ".webp"},
     "documents": {".pdf", ".doc", ".docx", ".txt", ".jpg", ".jpeg", ".png"}
 }
 
-# Criar diretórios se não existirem
-UPLOAD_DIR.mkdir(exist_ok=True)
-(UPLOAD_DIR / "photos").mkdir(exist_ok=True)
-(UPLOAD_DIR / "documents").mkdir(exist_ok=True)
+# URLs de arquivo que só as rotas de upload alteram
+UPLOAD_URL_FIELDS = {"photo_url", "file_url"}
+
+class WithoutUploadFields(BaseModel):
+    """Base dos schemas de entrada de carros e documentos
+
+    photo_url/file_url só mudam pelas rotas de upload, que contam as
+    referências em stored_files; enviadas no corpo (POST, PUT, /api/batch)
+    são recusadas com 422 em vez de ignoradas em silêncio.
+    """
+
+    @model_validator(mode="before")
+    @classmethod
+    def reject_upload_fields(cls, data):
+        if isinstance(data, dict):
+            sent = sorted(UPLOAD_URL_FIELDS.intersection(data))
+            if sent:
+                raise ValueError(f"{', '.join(sent)} só pode ser alterado pela rota de upload")
+        return data
 
 def validate_file(file: UploadFile, file_type: str = "documents") -> bool:
     """Valida se o arquivo é permitido"""
@@ -29,50 +60,240 @@ def validate_file(file: UploadFile, file_type: str = "documents") -> bool:
     file_ext = Path(file.filename).suffix.lower()
     return file_ext in ALLOWED_EXTENSIONS.get(file_type, set())
 
-async def save_uploaded_file(file: UploadFile, file_type: str = "documents") -> str:
-    """Salva arquivo enviado e retorna o caminho"""
+async def _remove_quietly(path: Path) -> None:
+    try:
+        await aiofiles.os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def file_too_large(max_size: int) -> HTTPException:
+    return HTTPException(
+        status_code=400,
+        detail=f"Arquivo muito grande. Máximo: {max_size // 1024 // 1024}MB"
+    )
+
+class UploadSizeLimitMiddleware:
+    """Recusa uploads grandes demais antes de o formulário ser lido
+
+    O Starlette lê o corpo multipart inteiro (guardando os arquivos em
+    disco) antes de a rota rodar, então o limite de stream_to_temp só age
+    depois de o upload terminar. Aqui o Content-Length é conferido antes de
+    ler o corpo; sem ele (Transfer-Encoding: chunked), os bytes são
+    contados durante a leitura e ela para ao passar do limite. `limits`
+    dá limites próprios por prefixo de caminho (ex.: a importação).
+    """
+
+    def __init__(self, app, max_size: int = MAX_FILE_SIZE, limits: Optional[Dict[str, int]] = None):
+        self.app = app
+        self.max_size = max_size
+        self.limits = limits or {}
+
+    def limit_for(self, path: str) -> int:
+        for prefix, limit in self.limits.items():
+            if path.startswith(prefix):
+                return limit
+        return self.max_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        if not headers.get("content-type", "").startswith("multipart/form-data"):
+            await self.app(scope, receive, send)
+            return
+
+        max_size = self.limit_for(scope["path"])
+        max_body = max_size + MULTIPART_OVERHEAD
+        content_length = headers.get("content-length", "")
+        if content_length.isdigit() and int(content_length) > max_body:
+            error = file_too_large(max_size)
+            response = JSONResponse({"detail": error.detail}, status_code=error.status_code)
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_body:
+                    raise file_too_large(max_size)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+async def stream_to_temp(file: UploadFile, max_size: int = MAX_FILE_SIZE) -> Tuple[Path, str, int]:
+    """Grava o upload em blocos num arquivo temporário
+
+    Retorna o caminho temporário, o SHA-256 do conteúdo e o tamanho. O
+    upload é interrompido assim que passa de `max_size`.
+    """
+    too_large = file_too_large(max_size)
+    
+    # Rejeitar cedo quando o tamanho já é conhecido
+    if file.size is not None and file.size > max_size:
+        raise too_large
+    
+    temp_path = TEMP_DIR / f"{uuid.uuid4()}.part"
+    digest = hashlib.sha256()
+    written = 0
+    try:
+        async with aiofiles.open(temp_path, "wb") as buffer:
+            while True:
+                chunk = await file.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if written > max_size:
+                    raise too_large
+                digest.update(chunk)
+                await buffer.write(chunk)
+    except BaseException:
+        await _remove_quietly(temp_path)
+        raise
+    request_metrics.observe_upload(written)
+    return temp_path, digest.hexdigest(), written
+
+def content_key(subdir: str, sha256: str, file_ext: str) -> str:
+    """Caminho de um arquivo endereçado por conteúdo: photos/ab/cd/<sha256>.jpg"""
+    return f"{subdir}/{sha256[:2]}/{sha256[2:4]}/{sha256}{file_ext}"
+
+class StoredUpload(NamedTuple):
+    """Arquivo gravado por store_upload, ainda sem referência no banco"""
+    url: str
+    sha256: str
+    size: int
+
+async def store_upload(
+    file: UploadFile,
+    file_type: str = "documents",
+    prepare: Optional[Callable[[Path], Awaitable[Tuple[Path, str, int]]]] = None
+) -> StoredUpload:
+    """Grava o arquivo enviado no armazenamento, sem acessar o banco
+    
+    Feito antes da transação de escrita, para que a conexão (no SQLite, a
+    única de escrita) não fique presa durante a cópia e o processamento.
+    No modo "content" (UPLOAD_STORAGE_MODE) o arquivo é nomeado pelo hash
+    do conteúdo e uploads repetidos reaproveitam o mesmo arquivo. Depois,
+    reference_upload conta a referência na transação que usa o arquivo, ou
+    discard_upload o descarta se ela não acontecer. `prepare` recebe o
+    arquivo temporário antes do armazenamento e devolve o arquivo a gravar,
+    seu hash e tamanho (usado para remover os metadados das fotos).
+    """
     if not validate_file(file, file_type):
         raise HTTPException(
             status_code=400, 
             detail=f"Tipo de arquivo não permitido. Extensões aceitas: {', '.join(ALLOWED_EXTENSIONS[file_type])}"
         )
     
-    # Verificar tamanho do arquivo
-    content = await file.read()
-    if len(content) > MAX_FILE_SIZE:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Arquivo muito grande. Máximo: {MAX_FILE_SIZE // 1024 // 1024}MB"
-        )
-    
-    # Gerar nome único
     file_ext = Path(file.filename).suffix.lower()
-    unique_filename = f"{uuid.uuid4()}{file_ext}"
+    subdir = "photos" if file_type == "images" else "documents"
+    
+    # O hash é calculado durante a gravação, sem reler o arquivo
+    temp_path, sha256, size = await stream_to_temp(file)
+    if prepare is not None:
+        original = temp_path
+        try:
+            temp_path, sha256, size = await prepare(original)
+        except BaseException:
+            await _remove_quietly(original)
+            raise
+        if temp_path != original:
+            await _remove_quietly(original)
     
-    # Determinar diretório
-    if file_type == "images":
-        file_path = UPLOAD_DIR / "photos" / unique_filename
+    if settings.UPLOAD_STORAGE_MODE == "content":
+        key = content_key(subdir, sha256, file_ext)
     else:
-        file_path = UPLOAD_DIR / "documents" / unique_filename
+        key = f"{subdir}/{uuid.uuid4()}{file_ext}"
+    
+    # Enviar ao armazenamento (no disco local é um rename atômico; se o
+    # mesmo conteúdo já existe, é sobrescrito por bytes idênticos)
+    try:
+        await get_storage().put_file(key, temp_path)
+    except BaseException:
+        await _remove_quietly(temp_path)
+        raise
     
-    # Salvar arquivo
-    with open(file_path, "wb") as buffer:
-        buffer.write(content)
+    # URL relativa
+    return StoredUpload(f"/uploads/{key}", sha256, size)
+
+async def reference_upload(db: AsyncSession, upload: StoredUpload) -> None:
+    """Conta a referência ao arquivo em stored_files, na transação de `db`"""
+    if settings.UPLOAD_STORAGE_MODE == "content":
+        await add_file_reference(db, get_file_key(upload.url), upload.sha256, upload.size)
+
+async def discard_upload(db: AsyncSession, upload: StoredUpload) -> bool:
+    """Apaga um arquivo de store_upload que não chegou a ser referenciado
+
+    No modo "content", o mesmo arquivo pode já pertencer a outro registro;
+    nesse caso ele fica onde está. Retorna True quando o arquivo foi
+    apagado (e as variantes, derivadas do mesmo hash, também podem ser).
+    """
+    if settings.UPLOAD_STORAGE_MODE == "content":
+        result = await db.execute(
+            select(StoredFile.path).where(StoredFile.path == get_file_key(upload.url))
+        )
+        in_use = result.first() is not None
+        await db.rollback()
+        if in_use:
+            return False
+    await delete_file(upload.url)
+    return True
+
+def _upsert(db: AsyncSession):
+    if db.bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
+
+async def add_file_reference(db: AsyncSession, key: str, sha256: str, size: int) -> None:
+    """Registra mais uma referência ao arquivo (cria a linha se necessário)"""
+    insert = _upsert(db)
+    stmt = insert(StoredFile).values(path=key, sha256=sha256, size=size, ref_count=1)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["path"],
+        set_={"ref_count": StoredFile.ref_count + 1}
+    )
+    await db.execute(stmt)
+
+def get_file_key(file_url: str) -> str:
+    """Remove o prefixo /uploads/ da URL pública"""
+    if file_url.startswith("/uploads/"):
+        return file_url[9:]
+    return file_url
+
+async def release_file(db: AsyncSession, file_url: str) -> bool:
+    """Remove uma referência ao arquivo
     
-    # Retornar URL relativa
-    return f"/uploads/{file_type if file_type != 'images' else 'photos'}/{unique_filename}"
+    Retorna True quando ninguém mais usa o arquivo e ele pode ser apagado
+    com delete_file após o commit. Arquivos sem contagem de referências
+    (uploads antigos, com nome aleatório) são sempre liberados.
+    """
+    key = get_file_key(file_url)
+    result = await db.execute(
+        update(StoredFile)
+        .where(StoredFile.path == key)
+        .values(ref_count=StoredFile.ref_count - 1)
+        .returning(StoredFile.ref_count)
+    )
+    row = result.first()
+    if row is None:
+        return True
+    if row[0] <= 0:
+        await db.execute(delete(StoredFile).where(
+            StoredFile.path == key,
+            StoredFile.ref_count <= 0
+        ))
+        return True
+    return False
 
-def delete_file(file_path: str) -> bool:
-    """Remove arquivo do sistema"""
+async def delete_file(file_path: str) -> bool:
+    """Remove arquivo do armazenamento"""
     try:
-        # Remover "/uploads/" do início se existir
-        if file_path.startswith("/uploads/"):
-            file_path = file_path[9:]
-        
-        full_path = UPLOAD_DIR / file_path
-        if full_path.exists():
-            full_path.unlink()
-            return True
-        return False
-    except:
+        return await get_storage().delete(get_file_key(file_path))
+    except Exception:
         return False
\ No newline at end of file
@@ -15,6 +15,7 @@ mkdir -p uploads/documents
 # Inicializar banco de dados
 echo "🗄️ Inicializando banco de dados..."
 python init_db.py
+alembic upgrade head
 
 echo "✅ Build concluído com sucesso!"
 
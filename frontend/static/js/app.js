@@ -128,6 +128,15 @@ const utils = {
         return statusMap[status] || { class: 'status-available', text: status };
     },
 
+    // Foto do carro na variante pedida (thumb, card, full), com WebP quando disponível
+    getCarPhotoHTML: (car, variant, attrs = '') => {
+        const files = car.photo_variants && car.photo_variants[variant];
+        if (!files) {
+            return `<img src="${car.photo_url}" alt="${car.title}" loading="lazy" ${attrs}>`;
+        }
+        return `<picture><source srcset="${files.webp}" type="image/webp"><img src="${files.jpeg}" alt="${car.title}" loading="lazy" ${attrs}></picture>`;
+    },
+
     getNegotiationStatusBadge: (status) => {
         const statusMap = {
             interested: { class: 'status-available', text: 'Interessado' },
@@ -1,5 +1,9 @@
 // Service Worker para PWA
-const CACHE_NAME = 'vendavoa-v1';
+const CACHE_NAME = 'vendavoa-v2';
+// Uploads nunca mudam (nome único/hash), então o cache de mídia sobrevive a novas versões
+const MEDIA_CACHE_NAME = 'vendavoa-media-v2';
+// Máximo de arquivos no cache de mídia; ao passar, os mais antigos saem
+const MEDIA_CACHE_MAX_ENTRIES = 200;
 const STATIC_ASSETS = [
     '/',
     '/dashboard',
@@ -8,6 +12,14 @@ const STATIC_ASSETS = [
     '/static/manifest.json'
 ];
 
+// Remove as entradas mais antigas (ordem de inserção) acima do limite
+function trimCache(cache, maxEntries) {
+    return cache.keys().then(keys => {
+        const excess = keys.slice(0, Math.max(keys.length - maxEntries, 0));
+        return Promise.all(excess.map(key => cache.delete(key)));
+    });
+}
+
 // Instalação do Service Worker
 self.addEventListener('install', event => {
     console.log('Service Worker: Instalando...');
@@ -31,7 +43,7 @@ self.addEventListener('activate', event => {
         caches.keys().then(cacheNames => {
             return Promise.all(
                 cacheNames.map(cacheName => {
-                    if (cacheName !== CACHE_NAME) {
+                    if (cacheName !== CACHE_NAME && cacheName !== MEDIA_CACHE_NAME) {
                         console.log('Service Worker: Removendo cache antigo:', cacheName);
                         return caches.delete(cacheName);
                     }
@@ -53,6 +65,39 @@ self.addEventListener('fetch', event => {
         return;
     }
 
+    // Exportações são arquivos grandes e sempre atuais: não passam pelo cache
+    const url = new URL(request.url);
+    if (url.pathname.startsWith('/api/export/')) {
+        return;
+    }
+
+    // Uploads (fotos e documentos): imutáveis, sempre do cache quando possível.
+    // Requisições com Range (PDFs grandes) vão direto para a rede.
+    if (url.pathname.startsWith('/uploads/') && request.method === 'GET' && !request.headers.has('range')) {
+        event.respondWith(
+            caches.open(MEDIA_CACHE_NAME).then(cache =>
+                cache.match(request).then(cached => {
+                    if (cached) {
+                        return cached;
+                    }
+                    return fetch(request).then(response => {
+                        // Respostas opacas (redirecionamento para o S3) não
+                        // entram: o status é desconhecido e o navegador as
+                        // conta com tamanho inflado na cota
+                        if (response.ok) {
+                            event.waitUntil(
+                                cache.put(request, response.clone())
+                                    .then(() => trimCache(cache, MEDIA_CACHE_MAX_ENTRIES))
+                            );
+                        }
+                        return response;
+                    });
+                })
+            )
+        );
+        return;
+    }
+
     // Estratégia para APIs (sempre tentar rede primeiro)
     if (request.url.includes('/api/') || request.url.includes('/auth/') || 
         request.url.includes('/cars/') || request.url.includes('/clients/') || 
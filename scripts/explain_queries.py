@@ -0,0 +1,96 @@
+"""
+Mostra o plano de execução (EXPLAIN) das consultas usadas pelas rotas
+Execute: python scripts/explain_queries.py [--strict]
+
+Com --strict o script termina com erro se alguma consulta fizer varredura
+completa de uma tabela (SCAN no SQLite, Seq Scan no PostgreSQL).
+"""
+import sys
+import os
+from datetime import datetime
+
+# Adicionar o diretório pai ao path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select, text
+
+from app.db import engine, Base
+from app.models import *
+from app.utils.pagination import apply_cursor, encode_cursor
+
+TENANT_ID = 1
+CAR_ID = 1
+CURSOR = encode_cursor(datetime(2024, 1, 1), 1)
+
+def router_queries(dialect_name):
+    """Consultas no mesmo formato das usadas em app/api"""
+    cars = select(Car).where(Car.tenant_id == TENANT_ID)
+    clients = select(Client).where(Client.tenant_id == TENANT_ID)
+    docs = select(Document).join(Car).where(Car.tenant_id == TENANT_ID)
+
+    return {
+        "auth: usuário por email": select(User).where(User.email == "admin@example.com"),
+        "cars: listagem": apply_cursor(cars, Car, None, dialect_name).limit(100),
+        "cars: listagem por status": apply_cursor(
+            cars.where(Car.status == "available"), Car, None, dialect_name
+        ).limit(100),
+        "cars: listagem com cursor": apply_cursor(cars, Car, CURSOR, dialect_name).limit(100),
+        "cars: detalhe": select(Car).where(Car.id == CAR_ID, Car.tenant_id == TENANT_ID),
+        "clients: listagem": apply_cursor(clients, Client, None, dialect_name).limit(100),
+        "clients: listagem por status": apply_cursor(
+            clients.where(Client.negotiation_status == "interested"), Client, None, dialect_name
+        ).limit(100),
+        "clients: listagem por carro": apply_cursor(
+            clients.where(Client.car_id == CAR_ID), Client, None, dialect_name
+        ).limit(100),
+        "clients: listagem com cursor": apply_cursor(clients, Client, CURSOR, dialect_name).limit(100),
+        "docs: listagem": apply_cursor(docs, Document, None, dialect_name).limit(100),
+        "docs: listagem por carro": apply_cursor(
+            docs.where(Document.car_id == CAR_ID), Document, None, dialect_name
+        ).limit(100),
+        "docs: listagem por tipo": apply_cursor(
+            docs.where(Document.car_id == CAR_ID, Document.document_type == "contract"),
+            Document, None, dialect_name
+        ).limit(100),
+        "docs: detalhe": select(Document).join(Car).where(
+            Document.id == 1, Car.tenant_id == TENANT_ID
+        ),
+    }
+
+def explain(conn, statement):
+    """Retorna as linhas do plano de execução da consulta"""
+    sql = str(statement.compile(conn, compile_kwargs={"literal_binds": True}))
+    if conn.dialect.name == "sqlite":
+        rows = conn.execute(text(f"EXPLAIN QUERY PLAN {sql}")).fetchall()
+        return [row[-1] for row in rows]
+    rows = conn.execute(text(f"EXPLAIN {sql}")).fetchall()
+    return [row[0] for row in rows]
+
+def is_full_scan(line):
+    # "SCAN tabela" sem índice no SQLite; "Seq Scan" no PostgreSQL
+    if line.startswith("SCAN") and "USING" not in line:
+        return True
+    return "Seq Scan" in line
+
+def main(strict=False):
+    Base.metadata.create_all(bind=engine)
+    full_scans = []
+
+    with engine.connect() as conn:
+        for name, statement in router_queries(conn.dialect.name).items():
+            print(f"\n== {name}")
+            for line in explain(conn, statement):
+                marker = "  !!" if is_full_scan(line) else "    "
+                print(f"{marker} {line}")
+                if is_full_scan(line):
+                    full_scans.append(name)
+
+    if full_scans:
+        print(f"\n⚠️ Varredura completa em: {', '.join(sorted(set(full_scans)))}")
+        if strict:
+            sys.exit(1)
+    else:
+        print("\n✅ Todas as consultas usam índices")
+
+if __name__ == "__main__":
+    main(strict="--strict" in sys.argv)
@@ -0,0 +1,33 @@
+"""
+Recalcula os agregados do /api/stats a partir das tabelas
+Execute: python scripts/rebuild_stats.py [tenant_id ...]
+
+Sem argumentos, recalcula todos os tenants. Use quando os agregados
+divergirem dos dados (escritas feitas fora da API, restauração de backup).
+"""
+import sys
+import os
+import asyncio
+
+# Adicionar o diretório pai ao path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select
+
+from app.db import AsyncSessionLocal, async_engine
+from app.models import *
+from app.utils.stats import rebuild_stats
+
+async def main(tenant_ids):
+    async with AsyncSessionLocal(write_only=True) as db:
+        if not tenant_ids:
+            tenant_ids = (await db.execute(select(Tenant.id).order_by(Tenant.id))).scalars().all()
+        for tenant_id in tenant_ids:
+            # Uma transação por tenant
+            await rebuild_stats(db, tenant_id)
+            await db.commit()
+            print(f"Tenant {tenant_id}: agregados recalculados")
+    await async_engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(main([int(arg) for arg in sys.argv[1:]]))
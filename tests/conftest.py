@@ -0,0 +1,51 @@
+"""
+Fixtures dos testes: aplicação num banco SQLite temporário e um tenant por teste
+"""
+import os
+import tempfile
+import uuid
+
+# Antes de importar a aplicação: app.config lê o ambiente na importação
+TEST_DIR = tempfile.mkdtemp(prefix="vendavoa-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{TEST_DIR}/test.db"
+os.environ["UPLOAD_DIR"] = os.path.join(TEST_DIR, "uploads")
+os.environ.setdefault("ENVIRONMENT", "development")
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.utils.queries import query_budget
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as client:
+        yield client
+
+@pytest.fixture
+def auth_headers(client):
+    """Cabeçalho de autenticação de um usuário novo, num tenant só dele"""
+    suffix = uuid.uuid4().hex[:12]
+    response = client.post("/api/auth/register", json={
+        "email": f"user-{suffix}@example.com",
+        "password": "secret123",
+        "full_name": "Usuário de Teste",
+        "tenant_name": f"Loja {suffix}",
+    })
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+@pytest.fixture
+def create_car(client, auth_headers):
+    """Cria um carro no tenant do teste e devolve o JSON da resposta"""
+    def create(**fields):
+        data = {"title": "Uno Mille", "brand": "Fiat", "model": "Uno", "year": 2010, **fields}
+        response = client.post("/api/cars/", json=data, headers=auth_headers)
+        assert response.status_code == 200, response.text
+        return response.json()
+    return create
+
+@pytest.fixture
+def max_queries():
+    """Uso: with max_queries(3): client.get(...) (veja query_budget)"""
+    return query_budget
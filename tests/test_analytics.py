@@ -0,0 +1,73 @@
+"""
+Análise de preços do estoque
+"""
+import numpy as np
+
+from app.api import analytics as analytics_api
+from app.db import pools
+from app.utils.analytics import QUANTILES, PriceTable, grouped_quantiles
+
+def test_grouped_quantiles_match_numpy():
+    rng = np.random.default_rng(7)
+    # Grupos de tamanhos variados, incluindo grupos de uma linha só
+    sizes = [1, 2, 5, 1, 13, 4]
+    codes = np.repeat(np.arange(len(sizes)), sizes)
+    values = rng.uniform(10000, 90000, len(codes)).round()
+    shuffle = rng.permutation(len(codes))
+    counts, quantiles = grouped_quantiles(codes[shuffle], values[shuffle], len(sizes))
+
+    assert counts.tolist() == sizes
+    for group in range(len(sizes)):
+        expected = np.quantile(values[codes == group], QUANTILES)
+        np.testing.assert_allclose(quantiles[group], expected)
+
+def test_price_table_groups():
+    rows = [
+        (1, 30000.0, 2010, "Fiat", "Uno"),
+        (2, 34000.0, 2012, " fiat ", "UNO"),
+        (3, 41000.0, 2012, "FIAT", "uno"),
+        (4, 90000.0, 2020, "Toyota", "Corolla"),
+    ]
+    table = PriceTable(rows)
+    by_model = {(row["brand"].lower().strip(), row["model"].lower()): row for row in table.percentiles("model")}
+    assert by_model[("fiat", "uno")]["count"] == 3
+    assert by_model[("fiat", "uno")]["p50"] == np.quantile([30000, 34000, 41000], 0.5)
+    corolla = by_model[("toyota", "corolla")]
+    assert corolla["count"] == 1 and corolla["p10"] == corolla["p90"] == 90000
+
+    years = {(row["model"].lower(), row["year"]): row["count"] for row in table.percentiles("year")}
+    assert years == {("uno", 2010): 1, ("uno", 2012): 2, ("corolla", 2020): 1}
+
+def test_empty_price_table():
+    table = PriceTable([])
+    for level in ("brand", "model", "year"):
+        assert table.percentiles(level) == []
+    assert table.suggest("Fiat", "Uno", 2012) is None
+    assert table.outliers() == []
+
+def test_empty_tenant_endpoints(client, auth_headers):
+    assert client.get("/api/analytics/prices", headers=auth_headers).json() == []
+    assert client.get("/api/analytics/prices/outliers", headers=auth_headers).json() == []
+    response = client.post("/api/analytics/prices/suggest", json={
+        "title": "Uno", "brand": "Fiat", "model": "Uno", "year": 2012
+    }, headers=auth_headers)
+    assert response.json() == {"level": None, "count": 0, "low": None, "median": None, "high": None}
+
+def test_suggest_price_stays_off_the_writer(client, auth_headers, create_car, monkeypatch):
+    for price in (30000, 32000, 34000, 36000, 38000):
+        create_car(price=price)
+    writer_in_use = []
+
+    async def spy(db, tenant_id):
+        table = await get_price_table(db, tenant_id)
+        writer_in_use.append(pools["writer"][0].pool.checkedout())
+        return table
+
+    get_price_table = analytics_api.get_price_table
+    monkeypatch.setattr(analytics_api, "get_price_table", spy)
+    response = client.post("/api/analytics/prices/suggest", json={
+        "title": "Uno", "brand": "fiat", "model": "UNO", "year": 2012
+    }, headers=auth_headers)
+    assert response.status_code == 200, response.text
+    assert writer_in_use == [0]
+    assert response.json() == {"level": "model", "count": 5, "low": 32000, "median": 34000, "high": 36000}
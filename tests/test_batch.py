@@ -0,0 +1,99 @@
+"""
+Operações em lote (/api/batch): idempotência, falhas parciais e agregados
+"""
+from sqlalchemy import insert
+
+from app.api import batch as batch_api
+from app.models.idempotency_key import IdempotencyKey
+
+def run(client, headers, *operations):
+    return client.post("/api/batch", json={"operations": list(operations)}, headers=headers)
+
+def car_create(key=None, **fields):
+    data = {"title": "Gol", "brand": "VW", "model": "Gol", "year": 2015, "price": 30000, **fields}
+    return {"op": "create", "resource": "cars", "data": data, "idempotency_key": key}
+
+def test_idempotency_key_replays_result(client, auth_headers):
+    first = run(client, auth_headers, car_create("car-1"))
+    assert first.status_code == 200
+    [created] = first.json()["results"]
+    assert created["status"] == 201 and not created["replayed"]
+
+    # Reenvio (resposta perdida): mesmo resultado, sem outro carro
+    second = run(client, auth_headers, car_create("car-1"))
+    [replayed] = second.json()["results"]
+    assert replayed["replayed"]
+    assert replayed["id"] == created["id"]
+    assert len(client.get("/api/cars/", headers=auth_headers).json()) == 1
+
+def test_repeated_key_in_same_batch_runs_once(client, auth_headers):
+    response = run(client, auth_headers, car_create("dup"), car_create("dup"))
+    first, second = response.json()["results"]
+    assert second["replayed"] and second["id"] == first["id"]
+    assert len(client.get("/api/cars/", headers=auth_headers).json()) == 1
+
+def test_concurrent_key_conflicts(client, auth_headers, monkeypatch):
+    bump_data_version = batch_api.bump_data_version
+
+    async def concurrent_batch(db, tenant_id):
+        # Outra requisição grava a mesma chave antes deste lote confirmar
+        await db.execute(insert(IdempotencyKey), [{"tenant_id": tenant_id, "key": "race", "result": {"status": 201}}])
+        await bump_data_version(db, tenant_id)
+
+    monkeypatch.setattr(batch_api, "bump_data_version", concurrent_batch)
+    response = run(client, auth_headers, car_create("race"))
+    assert response.status_code == 409
+
+    # Nada do lote foi gravado
+    monkeypatch.undo()
+    assert client.get("/api/cars/", headers=auth_headers).json() == []
+    [result] = run(client, auth_headers, car_create("race")).json()["results"]
+    assert result["status"] == 201 and not result["replayed"]
+
+def test_partial_failure_keeps_other_operations(client, auth_headers, create_car):
+    car = create_car()
+    response = run(
+        client, auth_headers,
+        car_create(),
+        {"op": "create", "resource": "cars", "data": {"title": "sem marca"}},
+        {"op": "update", "resource": "cars", "id": 999999, "data": {"price": 1}},
+        {"op": "update", "resource": "cars", "id": car["id"], "data": {"price": 45000}},
+        {"op": "create", "resource": "clients", "data": {"name": "Ana", "phone": "1", "car_id": 999999}},
+        {"op": "delete", "resource": "cars"},
+    )
+    assert response.status_code == 200
+    assert [result["status"] for result in response.json()["results"]] == [201, 422, 404, 200, 404, 422]
+    assert client.get(f"/api/cars/{car['id']}", headers=auth_headers).json()["price"] == 45000
+    assert len(client.get("/api/cars/", headers=auth_headers).json()) == 2
+
+def test_rows_created_in_batch_are_not_visible_to_later_operations(client, auth_headers):
+    [created] = run(client, auth_headers, car_create()).json()["results"]
+    next_id = created["id"] + 1
+
+    # O id do carro criado abaixo ainda não existia quando o lote começou
+    response = run(
+        client, auth_headers,
+        car_create(),
+        {"op": "update", "resource": "cars", "id": next_id, "data": {"price": 1}},
+        {"op": "delete", "resource": "cars", "id": next_id},
+    )
+    results = response.json()["results"]
+    assert results[0]["status"] == 201 and results[0]["id"] == next_id
+    assert [result["status"] for result in results[1:]] == [404, 404]
+
+def test_stats_follow_batch_deltas(client, auth_headers, create_car):
+    sold = create_car(price=20000)
+    removed = create_car(price=10000)
+    run(
+        client, auth_headers,
+        car_create(price=30000),
+        {"op": "update", "resource": "cars", "id": sold["id"], "data": {"status": "sold"}},
+        {"op": "delete", "resource": "cars", "id": removed["id"]},
+        {"op": "create", "resource": "clients", "data": {"name": "Ana", "phone": "1", "negotiation_status": "negotiating"}},
+    )
+
+    stats = client.get("/api/stats", headers=auth_headers).json()
+    assert stats["inventory"]["available"] == {"count": 1, "value": 30000}
+    assert stats["inventory"]["sold"] == {"count": 1, "value": 20000}
+    assert stats["sold_count"] == 1
+    assert stats["funnel"] == {"negotiating": 1}
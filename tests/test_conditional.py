@@ -0,0 +1,55 @@
+"""
+Requisições condicionais (ETag, If-None-Match, If-Modified-Since)
+"""
+import uuid
+
+def test_unchanged_list_returns_304(client, auth_headers, create_car):
+    create_car()
+    first = client.get("/api/cars/", headers=auth_headers)
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"] == "private, no-cache"
+
+    second = client.get("/api/cars/", headers={**auth_headers, "If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.content == b""
+    assert second.headers["ETag"] == etag
+
+    # Lista de ETags e comparação fraca
+    listed = client.get("/api/cars/", headers={**auth_headers, "If-None-Match": f'"outro", {etag.removeprefix("W/")}'})
+    assert listed.status_code == 304
+
+def test_write_invalidates_etag(client, auth_headers, create_car):
+    car = create_car()
+    etag = client.get("/api/cars/", headers=auth_headers).headers["ETag"]
+
+    client.put(f"/api/cars/{car['id']}", json={"price": 50000}, headers=auth_headers)
+    response = client.get("/api/cars/", headers={**auth_headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert response.json()[0]["price"] == 50000
+
+def test_etag_depends_on_url_and_tenant(client, auth_headers, create_car):
+    create_car()
+    etag = client.get("/api/cars/", headers=auth_headers).headers["ETag"]
+    assert client.get("/api/cars/?limit=1", headers=auth_headers).headers["ETag"] != etag
+    assert client.get("/api/cars/", headers={**auth_headers, "If-None-Match": "*"}).status_code == 304
+
+    other = client.post("/api/auth/register", json={
+        "email": f"outro-{uuid.uuid4().hex[:12]}@example.com", "password": "secret123",
+        "full_name": "Outro", "tenant_name": f"Outra Loja {uuid.uuid4().hex[:12]}",
+    }).json()["access_token"]
+    other_headers = {"Authorization": f"Bearer {other}", "If-None-Match": etag}
+    assert client.get("/api/cars/", headers=other_headers).status_code == 200
+
+def test_if_modified_since(client, auth_headers, create_car):
+    create_car()
+    last_modified = client.get("/api/cars/", headers=auth_headers).headers["Last-Modified"]
+    response = client.get("/api/cars/", headers={**auth_headers, "If-Modified-Since": last_modified})
+    assert response.status_code == 304
+
+    old = client.get("/api/cars/", headers={**auth_headers, "If-Modified-Since": "Mon, 01 Jan 2001 00:00:00 GMT"})
+    assert old.status_code == 200
+
+    # If-None-Match tem precedência
+    mismatch = {**auth_headers, "If-Modified-Since": last_modified, "If-None-Match": '"outro"'}
+    assert client.get("/api/cars/", headers=mismatch).status_code == 200
@@ -0,0 +1,55 @@
+"""
+Paginação por cursor (keyset) das listagens
+"""
+from datetime import datetime
+
+from app.utils.pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
+
+def fetch_all(client, path, headers, limit):
+    """Percorre a listagem pelo X-Next-Cursor; devolve os ids de cada página"""
+    pages, params = [], {"limit": limit}
+    while True:
+        response = client.get(path, params=params, headers=headers)
+        assert response.status_code == 200
+        pages.append([row["id"] for row in response.json()])
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if cursor is None:
+            return pages
+        params = {"limit": limit, "cursor": cursor}
+
+def test_cursor_roundtrip():
+    moment = datetime(2026, 10, 17, 12, 30, 5, 123456)
+    assert decode_cursor(encode_cursor(moment, 42)) == (moment, 42)
+
+def test_cars_pages_cover_all_rows_once(client, auth_headers, create_car):
+    # Criados no mesmo segundo: o id desempata o created_at
+    ids = [create_car()["id"] for _ in range(5)]
+    pages = fetch_all(client, "/api/cars/", auth_headers, limit=2)
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert [row_id for page in pages for row_id in page] == ids
+
+def test_full_last_page_ends_with_empty_page(client, auth_headers):
+    for name in ("Ana", "Bia", "Caio", "Davi"):
+        client.post("/api/clients/", json={"name": name, "phone": "1"}, headers=auth_headers)
+    pages = fetch_all(client, "/api/clients/", auth_headers, limit=2)
+    assert [len(page) for page in pages] == [2, 2, 0]
+
+def test_rows_added_during_paging_are_not_skipped(client, auth_headers, create_car):
+    ids = [create_car()["id"] for _ in range(3)]
+    first = client.get("/api/cars/", params={"limit": 2}, headers=auth_headers)
+    ids.append(create_car()["id"])
+
+    cursor = first.headers[NEXT_CURSOR_HEADER]
+    rest = client.get("/api/cars/", params={"limit": 10, "cursor": cursor}, headers=auth_headers)
+    assert [row["id"] for row in first.json() + rest.json()] == ids
+
+def test_cursor_ignores_skip(client, auth_headers, create_car):
+    ids = [create_car()["id"] for _ in range(3)]
+    cursor = client.get("/api/cars/", params={"limit": 1}, headers=auth_headers).headers[NEXT_CURSOR_HEADER]
+    response = client.get("/api/cars/", params={"limit": 5, "skip": 1, "cursor": cursor}, headers=auth_headers)
+    assert [row["id"] for row in response.json()] == ids[1:]
+
+def test_invalid_cursor(client, auth_headers):
+    response = client.get("/api/cars/", params={"cursor": "not-a-cursor"}, headers=auth_headers)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
@@ -0,0 +1,37 @@
+"""
+Orçamento de consultas por requisição (app.utils.queries)
+"""
+import pytest
+
+def test_list_cars_within_budget(client, auth_headers, create_car, max_queries):
+    for _ in range(3):
+        car = create_car()
+        client.post("/api/clients/", json={"name": "Ana", "phone": "11999990000", "car_id": car["id"]}, headers=auth_headers)
+
+    # Consultas feitas pela engine assíncrona, na thread do TestClient,
+    # chegam ao bloco pelo QueryStatsMiddleware
+    with max_queries(3) as seen:
+        response = client.get("/api/cars/?include=client_counts", headers=auth_headers)
+    assert response.status_code == 200
+    assert len(response.json()) == 3
+    [(route, stats)] = seen
+    assert route == "/api/cars/"
+    assert stats.count > 0
+    assert "queries" in response.headers["Server-Timing"]
+
+def test_list_query_count_does_not_grow_with_rows(client, auth_headers, create_car, max_queries):
+    def count_queries():
+        with max_queries(10) as seen:
+            client.get("/api/cars/?include=client_counts", headers=auth_headers)
+        return seen[0][1].count
+
+    create_car()
+    few = count_queries()
+    for _ in range(5):
+        create_car()
+    assert count_queries() == few
+
+def test_budget_exceeded_fails(client, auth_headers, max_queries):
+    with pytest.raises(AssertionError, match="/api/cars/"):
+        with max_queries(0):
+            client.get("/api/cars/", headers=auth_headers)
@@ -0,0 +1,63 @@
+"""
+Busca textual (/api/search): FTS5 no SQLite, telefone e CPF
+"""
+import uuid
+
+from app.api.search import fts_match, search_terms
+
+def search(client, headers, q, **params):
+    response = client.get("/api/search", params={"q": q, **params}, headers=headers)
+    assert response.status_code == 200, response.text
+    body = response.json()
+    return [car["id"] for car in body["cars"]], [row["id"] for row in body["clients"]]
+
+def add_client(client, headers, **fields):
+    response = client.post("/api/clients/", json={"name": "Ana", "phone": "1", **fields}, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+def test_search_terms():
+    assert search_terms("Veículo  Usado!") == ["veiculo", "usado"]
+    assert search_terms("(11) 98765-4321") == ["11987654321"]
+    assert search_terms("123.456.789-00") == ["12345678900"]
+    assert fts_match(["civ", "2015"]) == '"civ"* "2015"*'
+
+def test_cars_by_prefix_without_accents(client, auth_headers, create_car):
+    civic = create_car(title="Civic Automático", brand="Honda", model="Civic", year=2015)["id"]
+    create_car(title="Gol", brand="VW", model="Gol", year=2015)
+
+    assert search(client, auth_headers, "civ")[0] == [civic]
+    assert search(client, auth_headers, "AUTOMATICO honda")[0] == [civic]
+    assert sorted(search(client, auth_headers, "2015", type="cars")[0]) == sorted(
+        car["id"] for car in client.get("/api/cars/", headers=auth_headers).json()
+    )
+    assert search(client, auth_headers, "c") == ([], [])
+
+def test_index_follows_updates_and_deletes(client, auth_headers, create_car):
+    car = create_car(title="Corolla", brand="Toyota", model="Corolla")["id"]
+    client.put(f"/api/cars/{car}", json={"title": "Etios", "model": "Etios"}, headers=auth_headers)
+    assert search(client, auth_headers, "corolla")[0] == []
+    assert search(client, auth_headers, "etios")[0] == [car]
+
+    client.delete(f"/api/cars/{car}", headers=auth_headers)
+    assert search(client, auth_headers, "etios")[0] == []
+
+def test_clients_by_phone_and_cpf(client, auth_headers):
+    ana = add_client(client, auth_headers, name="Ana Júlia", phone="(11) 98765-4321", cpf="123.456.789-00")
+    add_client(client, auth_headers, name="Bruno", phone="21 3333-0000")
+
+    for q in ("(11) 98765-4321", "11987654321", "98765-4321", "98765", "123.456.789-00", "12345678900", "julia"):
+        assert search(client, auth_headers, q, type="clients")[1] == [ana], q
+    assert search(client, auth_headers, "4321", type="clients")[1] == []
+
+    client.put(f"/api/clients/{ana}", json={"phone": "(11) 91111-2222"}, headers=auth_headers)
+    assert search(client, auth_headers, "98765", type="clients")[1] == []
+    assert search(client, auth_headers, "911112222", type="clients")[1] == [ana]
+
+def test_search_is_tenant_scoped(client, auth_headers, create_car):
+    create_car(title="Fusca", brand="VW", model="Fusca")
+    other = client.post("/api/auth/register", json={
+        "email": f"outro-{uuid.uuid4().hex[:12]}@example.com", "password": "secret123",
+        "full_name": "Outro", "tenant_name": f"Outra Loja {uuid.uuid4().hex[:12]}",
+    }).json()["access_token"]
+    assert search(client, {"Authorization": f"Bearer {other}"}, "fusca") == ([], [])
@@ -0,0 +1,58 @@
+"""
+Backends de armazenamento: disco local e S3 (via moto)
+"""
+import pytest
+
+from app.utils.storage import LocalStorage, S3Storage, StorageBackend, TEMP_DIR
+
+def test_backend_is_abstract():
+    with pytest.raises(TypeError):
+        StorageBackend()
+
+def test_local_rejects_temp_and_outside_keys():
+    storage = LocalStorage(str(TEMP_DIR.parent))
+    for key in ("tmp", "tmp/upload.part", "photos/../tmp/upload.part", "../etc/passwd"):
+        with pytest.raises(ValueError):
+            storage.path(key)
+    assert storage.path("photos/ab/cd/foto.jpg").name == "foto.jpg"
+
+@pytest.fixture
+def s3_storage():
+    moto = pytest.importorskip("moto")
+    with moto.mock_aws():
+        storage = S3Storage(
+            bucket="vendavoa-test",
+            prefix="media",
+            region="us-east-1",
+            access_key_id="test",
+            secret_access_key="test",
+        )
+        storage.client.create_bucket(Bucket="vendavoa-test")
+        yield storage
+
+@pytest.mark.anyio
+async def test_s3_roundtrip(s3_storage, tmp_path):
+    source = tmp_path / "foto.jpg"
+    content = b"\xff\xd8" + b"x" * (200 * 1024)
+    source.write_bytes(content)
+
+    await s3_storage.put_file("photos/foto.jpg", source)
+    assert not source.exists()
+
+    head = s3_storage.client.head_object(Bucket="vendavoa-test", Key="media/photos/foto.jpg")
+    assert head["ContentType"] == "image/jpeg"
+    assert await s3_storage.exists("photos/foto.jpg")
+
+    chunks = [chunk async for chunk in s3_storage.iter_chunks("photos/foto.jpg")]
+    assert len(chunks) > 1
+    assert b"".join(chunks) == content
+
+    async with s3_storage.local_copy("photos/foto.jpg") as path:
+        assert path.read_bytes() == content
+    assert not path.exists()
+
+    url = s3_storage.presigned_url("photos/foto.jpg", expires_in=60)
+    assert "/media/photos/foto.jpg?" in url
+
+    assert await s3_storage.delete("photos/foto.jpg")
+    assert not await s3_storage.exists("photos/foto.jpg")
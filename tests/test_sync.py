@@ -0,0 +1,117 @@
+"""
+Sincronização incremental (/api/sync): snapshot paginado, cursores e remoções
+"""
+from datetime import datetime
+
+from sqlalchemy import insert, select
+
+from app.db import AsyncSessionLocal
+from app.models.deleted_record import DeletedRecord
+from app.utils.sync import SyncCursor, encode_page_cursor, encode_sync_cursor
+
+def fetch_pages(client, headers, limit, since=None):
+    """Busca todas as páginas a partir de `since`; devolve as respostas e o cursor final"""
+    pages = []
+    while True:
+        params = {"limit": limit, "since": since} if since else {"limit": limit}
+        response = client.get("/api/sync", params=params, headers=headers)
+        assert response.status_code == 200, response.text
+        body = response.json()
+        rows = sum(len(body[entity]) for entity in ("cars", "clients", "documents"))
+        assert rows + sum(len(ids) for ids in body["deleted"].values()) <= limit
+        pages.append(body)
+        since = body["cursor"]
+        if not body["more"]:
+            return pages, since
+
+def full_snapshot(client, headers, limit):
+    """Busca todas as páginas do snapshot; devolve os ids por entidade e o cursor final"""
+    pages, cursor = fetch_pages(client, headers, limit)
+    assert all(page["full"] for page in pages)
+    ids = {entity: [row["id"] for page in pages for row in page[entity]] for entity in ("cars", "clients", "documents")}
+    return ids, cursor
+
+def test_snapshot_is_paged(client, auth_headers, create_car):
+    cars = [create_car()["id"] for _ in range(3)]
+    clients = [
+        client.post("/api/clients/", json={"name": name, "phone": "1"}, headers=auth_headers).json()["id"]
+        for name in ("Ana", "Bia")
+    ]
+    document = client.post("/api/docs/", json={"name": "CRLV", "document_type": "crlv", "car_id": cars[0]}, headers=auth_headers).json()["id"]
+
+    ids, _ = full_snapshot(client, auth_headers, limit=2)
+    assert ids == {"cars": cars, "clients": clients, "documents": [document]}
+
+def test_delta_after_snapshot(client, auth_headers, create_car):
+    kept, removed = create_car(), create_car()
+    document = client.post("/api/docs/", json={"name": "CRLV", "document_type": "crlv", "car_id": removed["id"]}, headers=auth_headers).json()["id"]
+    _, cursor = full_snapshot(client, auth_headers, limit=500)
+
+    client.put(f"/api/cars/{kept['id']}", json={"price": 25000}, headers=auth_headers)
+    client.delete(f"/api/cars/{removed['id']}", headers=auth_headers)
+
+    body = client.get("/api/sync", params={"since": cursor}, headers=auth_headers).json()
+    assert not body["full"] and not body["more"]
+    assert [car["price"] for car in body["cars"] if car["id"] == kept["id"]] == [25000]
+    assert body["deleted"]["cars"] == [removed["id"]]
+    assert body["deleted"]["documents"] == [document]
+
+def test_delta_is_paged(client, auth_headers, create_car):
+    cars = [create_car() for _ in range(4)]
+    _, cursor = full_snapshot(client, auth_headers, limit=500)
+
+    for car in cars[:3]:
+        client.put(f"/api/cars/{car['id']}", json={"price": 1000}, headers=auth_headers)
+    client.delete(f"/api/cars/{cars[3]['id']}", headers=auth_headers)
+    client.post("/api/clients/", json={"name": "Ana", "phone": "1"}, headers=auth_headers)
+
+    pages, final = fetch_pages(client, auth_headers, limit=2, since=cursor)
+    assert len(pages) >= 3
+    assert not any(page["full"] for page in pages)
+    assert [page["more"] for page in pages] == [True] * (len(pages) - 1) + [False]
+    changed = {car["id"] for page in pages for car in page["cars"] if car["price"] == 1000}
+    assert changed == {car["id"] for car in cars[:3]}
+    assert [car_id for page in pages for car_id in page["deleted"]["cars"]] == [cars[3]["id"]]
+    assert sum(len(page["clients"]) for page in pages) == 1
+
+    # O cursor final volta a ser um cursor de alterações
+    body = client.get("/api/sync", params={"since": final}, headers=auth_headers).json()
+    assert not body["full"]
+
+def test_expired_cursor_restarts_snapshot(client, auth_headers, create_car):
+    create_car()
+    old = {"since": encode_sync_cursor(datetime(2001, 1, 1))}
+    body = client.get("/api/sync", params=old, headers=auth_headers).json()
+    assert body["full"]
+    assert len(body["cars"]) == 1
+
+    old_snapshot = encode_page_cursor(SyncCursor(None, datetime(2001, 1, 1), "clients"))
+    body = client.get("/api/sync", params={"since": old_snapshot}, headers=auth_headers).json()
+    assert body["full"] and len(body["cars"]) == 1
+
+def test_invalid_cursor(client, auth_headers):
+    unknown_entity = encode_page_cursor(SyncCursor(None, datetime.now(), "users"))
+    deleted_in_snapshot = encode_page_cursor(SyncCursor(None, datetime.now(), "deleted"))
+    for since in ("not-a-cursor", unknown_entity, deleted_in_snapshot):
+        response = client.get("/api/sync", params={"since": since}, headers=auth_headers)
+        assert response.status_code == 400
+
+def test_deletion_prunes_expired_tombstones(client, auth_headers, create_car):
+    tenant_id = client.get("/api/auth/me", headers=auth_headers).json()["tenant_id"]
+
+    async def tombstones(*rows):
+        async with AsyncSessionLocal(write_only=True) as db:
+            if rows:
+                await db.execute(insert(DeletedRecord), list(rows))
+                await db.commit()
+            result = await db.execute(
+                select(DeletedRecord.entity_id).where(DeletedRecord.tenant_id == tenant_id).order_by(DeletedRecord.id)
+            )
+            return result.scalars().all()
+
+    client.portal.call(tombstones, {
+        "tenant_id": tenant_id, "entity": "cars", "entity_id": 123, "deleted_at": datetime(2001, 1, 1)
+    })
+    car = create_car()
+    client.delete(f"/api/cars/{car['id']}", headers=auth_headers)
+    assert client.portal.call(tombstones) == [car["id"]]
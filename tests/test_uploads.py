@@ -0,0 +1,170 @@
+"""
+Uploads de fotos e documentos
+"""
+import io
+import os
+from pathlib import Path
+
+from PIL import Image
+from sqlalchemy import select
+
+from app.api import cars as cars_api
+from app.config import settings
+from app.db import AsyncSessionLocal, pools
+from app.models.stored_file import StoredFile
+from app.utils.upload import CHUNK_SIZE, MAX_FILE_SIZE, MULTIPART_OVERHEAD
+
+def png_bytes(color=(200, 30, 30), size=(40, 20)) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", size, color).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+def upload_photo(client, headers, car_id, content: bytes) -> str:
+    response = client.post(
+        f"/api/cars/upload-photo/{car_id}",
+        files={"file": ("foto.png", content, "image/png")},
+        headers=headers,
+    )
+    assert response.status_code == 200, response.text
+    return response.json()["photo_url"]
+
+def ref_count(client, url: str):
+    """ref_count do arquivo em stored_files (None se a linha não existe)"""
+    async def query():
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(select(StoredFile.ref_count).where(StoredFile.path == url.removeprefix("/uploads/")))
+            return result.scalar_one_or_none()
+    return client.portal.call(query)
+
+def stored(url: str) -> bool:
+    return (Path(settings.UPLOAD_DIR) / url.removeprefix("/uploads/")).is_file()
+
+def checked_out_connections() -> int:
+    return sum(engine.pool.checkedout() for engine, _ in pools.values())
+
+def test_photo_processing_holds_no_connection(client, auth_headers, create_car, monkeypatch):
+    car = create_car()
+    seen = []
+
+    def spy(function):
+        async def wrapper(*args):
+            seen.append((function.__name__, checked_out_connections()))
+            return await function(*args)
+        return wrapper
+
+    monkeypatch.setattr(cars_api, "strip_metadata", spy(cars_api.strip_metadata))
+    monkeypatch.setattr(cars_api, "create_image_variants", spy(cars_api.create_image_variants))
+    response = client.post(
+        f"/api/cars/upload-photo/{car['id']}",
+        files={"file": ("foto.png", png_bytes(), "image/png")},
+        headers=auth_headers,
+    )
+    assert response.status_code == 200, response.text
+    assert seen == [("strip_metadata", 0), ("create_image_variants", 0)]
+
+    photo = client.get(f"/api/cars/{car['id']}", headers=auth_headers).json()
+    assert photo["photo_url"] == response.json()["photo_url"]
+
+def test_upload_to_missing_car(client, auth_headers):
+    response = client.post(
+        "/api/cars/upload-photo/999999",
+        files={"file": ("foto.png", png_bytes(), "image/png")},
+        headers=auth_headers,
+    )
+    assert response.status_code == 404
+
+def test_oversized_upload_rejected_before_parsing(client, auth_headers, create_car, monkeypatch):
+    car = create_car()
+    parsed = []
+    monkeypatch.setattr(cars_api, "store_upload", lambda *args, **kwargs: parsed.append(args))
+    too_large = b"x" * (MAX_FILE_SIZE + MULTIPART_OVERHEAD + 1)
+
+    # Com Content-Length: recusado sem ler o corpo
+    response = client.post(
+        f"/api/cars/upload-photo/{car['id']}",
+        files={"file": ("foto.png", too_large, "image/png")},
+        headers=auth_headers,
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Arquivo muito grande. Máximo: 10MB"
+
+    # Sem Content-Length (chunked): a leitura para ao passar do limite
+    boundary = "limite"
+    head = f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="foto.png"\r\n\r\n'.encode()
+
+    def chunks():
+        yield head
+        for start in range(0, len(too_large), CHUNK_SIZE):
+            yield too_large[start:start + CHUNK_SIZE]
+        yield f"\r\n--{boundary}--\r\n".encode()
+
+    response = client.post(
+        f"/api/cars/upload-photo/{car['id']}",
+        content=chunks(),
+        headers={**auth_headers, "Content-Type": f"multipart/form-data; boundary={boundary}"},
+    )
+    assert response.status_code == 400
+    assert parsed == []
+
+def test_only_photos_are_publicly_cacheable(client, auth_headers, create_car):
+    car = create_car()
+    photo_url = client.post(
+        f"/api/cars/upload-photo/{car['id']}",
+        files={"file": ("foto.png", png_bytes(), "image/png")},
+        headers=auth_headers,
+    ).json()["photo_url"]
+    response = client.post(
+        f"/api/docs/create-with-file/{car['id']}",
+        data={"name": "Contrato", "document_type": "contrato"},
+        files={"file": ("contrato.pdf", b"%PDF-1.4 CPF 123", "application/pdf")},
+        headers=auth_headers,
+    )
+    assert response.status_code == 200, response.text
+    document_url = response.json()["file_url"]
+
+    assert client.get(photo_url).headers["Cache-Control"] == "public, max-age=31536000, immutable"
+    assert client.get(document_url).headers["Cache-Control"] == "private, max-age=31536000, immutable"
+
+def test_same_photo_is_stored_once_and_counted(client, auth_headers, create_car):
+    # Cores aleatórias: outros testes da sessão não compartilham o arquivo
+    photo, other_photo = png_bytes(tuple(os.urandom(3))), png_bytes(tuple(os.urandom(3)))
+    first, second = create_car(), create_car()
+
+    url = upload_photo(client, auth_headers, first["id"], photo)
+    assert upload_photo(client, auth_headers, second["id"], photo) == url
+    assert ref_count(client, url) == 2
+
+    # Trocar a foto libera a referência antiga
+    other_url = upload_photo(client, auth_headers, first["id"], other_photo)
+    assert ref_count(client, url) == 1 and ref_count(client, other_url) == 1
+
+    # Sem referências, a linha e o arquivo são apagados
+    client.delete(f"/api/cars/{second['id']}", headers=auth_headers)
+    assert ref_count(client, url) is None
+    assert not stored(url)
+    assert stored(other_url)
+
+    client.delete(f"/api/cars/{first['id']}", headers=auth_headers)
+    assert ref_count(client, other_url) is None
+    assert not stored(other_url)
+
+def test_upload_urls_are_rejected_in_the_body(client, auth_headers, create_car):
+    car = create_car()
+    response = client.post("/api/cars/", json={
+        "title": "Gol", "brand": "VW", "model": "Gol", "year": 2015, "photo_url": "/uploads/photos/x.jpg"
+    }, headers=auth_headers)
+    assert response.status_code == 422
+    response = client.put(f"/api/cars/{car['id']}", json={"photo_url": None}, headers=auth_headers)
+    assert response.status_code == 422
+
+    response = client.post("/api/docs/", json={
+        "name": "CRLV", "document_type": "crlv", "car_id": car["id"], "file_url": "/uploads/documents/x.pdf"
+    }, headers=auth_headers)
+    assert response.status_code == 422
+
+    response = client.post("/api/batch", json={"operations": [
+        {"op": "update", "resource": "cars", "id": car["id"], "data": {"photo_url": "/uploads/photos/x.jpg"}}
+    ]}, headers=auth_headers)
+    [result] = response.json()["results"]
+    assert result["status"] == 422
+    assert client.get(f"/api/cars/{car['id']}", headers=auth_headers).json()["photo_url"] is None